@@ -0,0 +1,87 @@
+"""
+Gunicorn settings for production (loaded automatically from the working directory).
+
+The app is served through projects.asgi with uvicorn workers: the public
+pages and the read-only API are async views, so a slow client or an
+outbound SMTP send holds a coroutine, not a thread. The admin and the write
+API stay sync; Django runs each of those requests in a thread of its own.
+
+Page views and admin media uploads share the same processes. An upload holds
+its request for minutes (compressing and uploading the video), so
+projects.middleware.UploadSlotsMiddleware lets at most UPLOAD_REQUEST_SLOTS
+uploads per worker run at once; pages keep being served alongside them.
+
+Every value can be overridden from the environment (WEB_CONCURRENCY,
+UPLOAD_REQUEST_SLOTS, ...) or the command line.
+"""
+import os
+
+
+def _available_memory():
+    """Bytes this process may use: the container's cgroup limit if set, else physical memory."""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        # cgroup v1 reports "no limit" as a huge number
+        if value.isdigit() and int(value) < 1 << 50:
+            return int(value)
+    return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+
+
+def _cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# Peak memory of one upload being compressed with moviepy
+UPLOAD_MEMORY = int(os.getenv('GUNICORN_WORKER_MEMORY_MB', '300')) * 2**20
+# Uploads per worker that may run at once (read by settings.UPLOAD_REQUEST_SLOTS)
+UPLOAD_SLOTS = int(os.environ.setdefault('UPLOAD_REQUEST_SLOTS', '2'))
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# An event loop keeps one core busy, so one worker per core, but never more
+# than fit in memory with every upload slot compressing
+workers = int(os.getenv('WEB_CONCURRENCY') or max(1, min(
+    _cpu_count(),
+    _available_memory() // (UPLOAD_MEMORY * UPLOAD_SLOTS),
+)))
+worker_class = 'uvicorn.workers.UvicornWorker'
+
+# Import Django and the URLconf once in the master; workers fork with them loaded (see asgi.py)
+preload_app = True
+# Recycle workers to return memory fragmented by video processing
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = max_requests // 10
+
+# The worker heartbeats from its event loop and uploads run in threads, so this bounds a
+# blocked loop, not a long upload
+timeout = 60
+# Let in-flight uploads finish when a worker is recycled or the app restarts
+graceful_timeout = 300
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+# Trust X-Forwarded-Proto from these proxies (needed behind a TLS-terminating router)
+forwarded_allow_ips = os.getenv('FORWARDED_ALLOW_IPS', '127.0.0.1')
+
+
+def post_fork(server, worker):
+    # Never share a database connection opened in the master with a worker
+    from django.db import connections
+
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    # Send mail left queued by earlier workers now, not on this worker's first contact submission.
+    # Runs once the worker has the app loaded, preloaded or not; asgi.py leaves this to gunicorn.
+    from projects import outbox
+
+    outbox.start()
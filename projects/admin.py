@@ -1,9 +1,109 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Projects, ProjectPhoto, ProjectVideo, ProjectEmbed, ProjectCard, Category
+from .models import Projects, ProjectPhoto, ProjectVideo, ProjectEmbed, ProjectCard, Category, OutboxEmail, VideoProcessingRun
 from django import forms
 from django.forms.models import BaseInlineFormSet
 from django.db import transaction
+from django.contrib.admin.views.main import ORDER_VAR
+from django.db.models import Avg, Case, Count, F, IntegerField, Max, Q, Sum, Value, When
+from django.utils import timezone
+from django.contrib import messages
+from . import outbox, search
+from .write_queue import serialized_write, WriteQueueTimeout
+from .media_urls import resource_url
+from .media_staging import stage_uploads, discard_uncommitted
+from .video_utils import QUALITY_PRESETS
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RejectedPostMixin:
+    """
+    Show a posted change form again, with an error, when its save can't go
+    ahead. The posted values stay in the form (file inputs can't be refilled
+    by the browser, so the error asks for the files again) and nothing is written.
+    """
+
+    def rerender_with_error(self, request, object_id, form_url, extra_context, error):
+        request.rejected_post_error = error
+        # The change form without the save transaction: the form is invalid, so only reads happen
+        return self._changeform_view(request, object_id, form_url, extra_context)
+
+    def get_form(self, request, obj=None, change=False, **kwargs):
+        form = super().get_form(request, obj, change, **kwargs)
+        error = getattr(request, 'rejected_post_error', None)
+        if error is None:
+            return form
+
+        class RejectedPostForm(form):
+            def clean(self):
+                super().clean()
+                raise forms.ValidationError(error)
+
+        return RejectedPostForm
+
+class SerializedWriteMixin(RejectedPostMixin):
+    """
+    Run admin saves that include uploads through the single-writer queue (see
+    write_queue.py) so long upload saves wait their turn instead of hitting
+    "database is locked". Saves without files are short and skip the queue.
+    """
+
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        if request.method != 'POST' or not request.FILES:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        try:
+            with serialized_write():
+                return super().changeform_view(request, object_id, form_url, extra_context)
+        except WriteQueueTimeout as e:
+            return self.rerender_with_error(
+                request, object_id, form_url, extra_context,
+                f"{e}. Another save is still running: select the files again and resubmit.")
+
+class StagedMediaMixin(RejectedPostMixin):
+    """
+    Compress and upload media before the save transaction opens (see
+    media_staging.py), so the database is only locked for the row writes.
+    Uploads whose rows don't end up committed are destroyed afterwards.
+    """
+
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        if request.method != 'POST' or not request.FILES:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        try:
+            staged = stage_uploads(request, self)
+        except Exception as e:
+            logger.error(f"[ADMIN] Media upload failed before save: {e}", exc_info=True)
+            return self.rerender_with_error(
+                request, object_id, form_url, extra_context,
+                f"Media upload failed, nothing was saved: {e}. Select the files again and resubmit.")
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        finally:
+            discard_uncommitted(staged)
+
+def image_thumbnail(image, size):
+    """A lazily loaded, server-side resized thumbnail (not the full-size original)."""
+    return format_html(
+        '<img src="{}" width="{}" height="{}" loading="lazy" style="object-fit: cover; border-radius: 4px;" />',
+        resource_url(image, width=size * 2, height=size * 2, crop='fill', quality='auto'), size, size
+    )
+
+def video_preview(obj, width):
+    """
+    A poster frame that turns into a player on click (lazy_video_preview.js).
+
+    A <video> element per row makes the browser fetch metadata for every
+    video on the page; the poster is a single small image instead.
+    """
+    return format_html(
+        '<button type="button" class="lazy-video-preview" data-src="{}" title="Click to play" '
+        'style="padding: 0; border: 0; background: none; cursor: pointer;">'
+        '<img src="{}" width="{}" loading="lazy" alt="Video preview" style="border-radius: 4px;" /></button>',
+        resource_url(obj.video, 'video'),
+        obj.get_poster_url(width=width * 2, crop='limit'),
+        width
+    )
 
 class ProjectPhotoFormSet(BaseInlineFormSet):
     def __init__(self, *args, **kwargs):
@@ -24,14 +124,14 @@ class ProjectPhotoInline(admin.TabularInline):
 
     def thumbnail_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" style="max-width: 100px; max-height: 100px; border-radius: 4px;" />', obj.image.url)
+            return image_thumbnail(obj.image, 100)
         return "No image"
     thumbnail_preview.short_description = 'Preview'
 
     def markdown_snippet(self, obj):
         if obj.image:
             alt = obj.caption or 'image'
-            snippet = f'![{alt}]({obj.image.url})'
+            snippet = f'![{alt}]({resource_url(obj.image)})'
             return format_html(
                 '<code style="display:block;background:#1e1e1e;color:#d4d4d4;padding:6px 10px;'
                 'border-radius:4px;font-size:11px;cursor:pointer;white-space:nowrap;overflow:auto;" '
@@ -49,7 +149,8 @@ class ProjectPhotoInline(admin.TabularInline):
         return formset
 
     def get_queryset(self, request):
-        return super().get_queryset(request).order_by('order')
+        # __str__ (shown per inline row) reads project.name
+        return super().get_queryset(request).select_related('project').order_by('order')
 
 class ProjectVideoForm(forms.ModelForm):
     class Meta:
@@ -73,70 +174,12 @@ class ProjectVideoForm(forms.ModelForm):
                 <a href="/static/docs/VIDEO_UPLOAD_GUIDE.md" target="_blank">📖 Full Video Upload Guide</a>
             ''',
         }
-    
-    def __init__(self, *args, **kwargs):
-        """Override init to process video BEFORE field validation."""
-        super().__init__(*args, **kwargs)
-        
-        # Get the uploaded file from request data if available
-        if 'video' in self.files:
-            from .video_utils import process_video_upload, needs_compression
-            import logging
-            
-            logger = logging.getLogger(__name__)
-            video_file = self.files['video']
-            
-            if video_file:
-                file_size = getattr(video_file, 'size', 0)
-                logger.info(f"[INIT] Video upload detected: {video_file.name}, size: {file_size / (1024*1024):.2f}MB")
-                
-                # Check if compression is needed
-                if needs_compression(file_size):
-                    try:
-                        logger.info("[INIT] Starting automatic compression BEFORE validation...")
-                        compressed_file, was_compressed, orig_mb, final_mb = process_video_upload(video_file)
-                        
-                        if was_compressed:
-                            logger.info(f"[INIT] Compression successful: {orig_mb:.2f}MB → {final_mb:.2f}MB")
-                            
-                            # Replace the file in the form data
-                            self.files['video'] = compressed_file
-                            
-                            # Store compression info for later
-                            self._compression_info = {
-                                'was_compressed': True,
-                                'original_size_mb': orig_mb,
-                                'compressed_size_mb': final_mb
-                            }
-                    except Exception as e:
-                        logger.error(f"[INIT] Compression failed: {e}", exc_info=True)
-                        # Don't raise here - let validation handle it
-                        self._compression_error = str(e)
-    
-    def clean_video(self):
-        """Apply compression info to instance if compression happened in init."""
-        video = self.cleaned_data.get('video')
-        
-        # Check if we had a compression error
-        if hasattr(self, '_compression_error'):
-            raise forms.ValidationError(
-                f"Video compression failed: {self._compression_error}. "
-                "Please compress your video manually to under 100MB and try again."
-            )
-        
-        # Apply compression metadata if it exists
-        if hasattr(self, '_compression_info'):
-            self.instance.was_compressed = self._compression_info['was_compressed']
-            self.instance.original_size_mb = self._compression_info['original_size_mb']
-            self.instance.compressed_size_mb = self._compression_info['compressed_size_mb']
-        
-        return video
 
 class ProjectVideoInline(admin.TabularInline):
     model = ProjectVideo
     form = ProjectVideoForm
     extra = 0  # No empty forms - use batch upload button instead
-    fields = ('video_preview', 'video', 'compression_quality', 'caption', 'order')
+    fields = ('video_preview', 'video', 'compression_quality', 'poster_time', 'hls_enabled', 'caption', 'order')
     readonly_fields = ('created_at', 'video_preview')
     min_num = 0
     validate_min = False
@@ -145,15 +188,12 @@ class ProjectVideoInline(admin.TabularInline):
 
     def video_preview(self, obj):
         if obj.video:
-            return format_html(
-                '<video src="{}" style="max-width: 150px; max-height: 100px; border-radius: 4px;" controls></video>',
-                obj.video.url
-            )
+            return video_preview(obj, 150)
         return "No video"
     video_preview.short_description = 'Preview'
 
     def get_queryset(self, request):
-        return super().get_queryset(request).order_by('order')
+        return super().get_queryset(request).select_related('project').order_by('order')
 
 class ProjectPhotoForm(forms.ModelForm):
     class Meta:
@@ -167,6 +207,9 @@ class ProjectEmbedInline(admin.TabularInline):
     model = ProjectEmbed
     extra = 1
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('project')
+
 class ProjectCardInline(admin.StackedInline):
     model = ProjectCard
     extra = 0  # Use the "Add another Project card" link instead of blank rows
@@ -176,12 +219,12 @@ class ProjectCardInline(admin.StackedInline):
 
     def image_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" style="max-width: 150px; max-height: 100px; border-radius: 4px;" />', obj.image.url)
+            return image_thumbnail(obj.image, 100)
         return "No image"
     image_preview.short_description = 'Preview'
 
     def get_queryset(self, request):
-        return super().get_queryset(request).order_by('order')
+        return super().get_queryset(request).select_related('project').order_by('order')
 
 class ProjectsForm(forms.ModelForm):
     class Meta:
@@ -189,35 +232,34 @@ class ProjectsForm(forms.ModelForm):
         fields = '__all__'
 
 @admin.register(ProjectPhoto)
-class ProjectPhotoAdmin(admin.ModelAdmin):
+class ProjectPhotoAdmin(StagedMediaMixin, SerializedWriteMixin, admin.ModelAdmin):
     list_display = ('project', 'display_image', 'caption', 'order', 'created_at')
+    list_select_related = ('project',)
     list_filter = ('project',)
     search_fields = ('caption', 'project__name')
     form = ProjectPhotoForm
     
     def display_image(self, obj):
         if obj.image:
-            return format_html('<img src="{}" width="100" height="100" />', obj.image.url)
+            return image_thumbnail(obj.image, 100)
         return "No image"
     display_image.short_description = 'Image'
 
 @admin.register(ProjectVideo)
-class ProjectVideoAdmin(admin.ModelAdmin):
+class ProjectVideoAdmin(StagedMediaMixin, SerializedWriteMixin, admin.ModelAdmin):
     form = ProjectVideoForm
     list_display = ('project', 'display_video', 'caption', 'order', 'compression_info', 'created_at')
+    list_select_related = ('project',)
     list_filter = ('project', 'was_compressed', 'compression_quality')
     search_fields = ('caption', 'project__name')
     readonly_fields = ('was_compressed', 'original_size_mb', 'compressed_size_mb', 'created_at')
     
     # Show compression_quality field in the form
-    fields = ('project', 'video', 'compression_quality', 'caption', 'order', 'created_at', 'was_compressed', 'original_size_mb', 'compressed_size_mb')
+    fields = ('project', 'video', 'compression_quality', 'poster_time', 'hls_enabled', 'caption', 'order', 'created_at', 'was_compressed', 'original_size_mb', 'compressed_size_mb')
     
     def display_video(self, obj):
         if obj.video:
-            return format_html(
-                '<video width="150" height="100" controls preload="metadata"><source src="{}" type="video/mp4">Your browser does not support video.</video>', 
-                obj.video.url
-            )
+            return video_preview(obj, 150)
         return "No video"
     display_video.short_description = 'Video Preview'
     
@@ -235,14 +277,19 @@ class ProjectVideoAdmin(admin.ModelAdmin):
         return format_html('<span style="color: gray;">No compression needed</span>')
     compression_info.short_description = 'Compression'
 
+    class Media:
+        js = ('admin/js/lazy_video_preview.js',)
+
 @admin.register(ProjectEmbed)
 class ProjectEmbedAdmin(admin.ModelAdmin):
     pass
 
 @admin.register(Projects)
-class ProjectsAdmin(admin.ModelAdmin):
+class ProjectsAdmin(StagedMediaMixin, SerializedWriteMixin, admin.ModelAdmin):
     form = ProjectsForm
     list_display = ('name', 'category', 'year', 'created_at', 'featured')
+    # category is nullable, so the admin's automatic select_related() skips it
+    list_select_related = ('category',)
     list_editable = ('featured',)
     list_filter = ('category', 'year')
     search_fields = ('name', 'description')
@@ -267,6 +314,20 @@ class ProjectsAdmin(admin.ModelAdmin):
         }),
     )
 
+    # Full-text matches listed by the changelist search, best first; weaker ones are left out
+    SEARCH_LIMIT = 500
+
+    def get_search_results(self, request, queryset, search_term):
+        """Use the full-text index instead of icontains scans when available, ranked best match first."""
+        if not search_term or not search.is_supported():
+            return super().get_search_results(request, queryset, search_term)
+        ids = search.search_ids(search_term, limit=self.SEARCH_LIMIT)
+        rank = Case(*[When(pk=pk, then=Value(position)) for position, pk in enumerate(ids)],
+                    output_field=IntegerField()) if ids else Value(0)
+        # Best match first, unless the user sorted by a column; then it only breaks ties
+        ordering = [*queryset.query.order_by, 'search_rank'] if ORDER_VAR in request.GET else ['search_rank']
+        return queryset.filter(pk__in=ids).annotate(search_rank=rank).order_by(*ordering), False
+
     @transaction.atomic
     def save_model(self, request, obj, form, change):
         """Wrap save in atomic transaction to prevent partial saves on database locks."""
@@ -279,15 +340,105 @@ class ProjectsAdmin(admin.ModelAdmin):
 
     class Media:
         css = {
-            'all': ('admin/css/video_embed.css', 'admin/css/mode_toggle.css')
+            'all': ('admin/css/mode_toggle.css',)
         }
-        js = ('admin/js/video_embed.js', 'admin/js/mode_toggle.js')
+        js = ('admin/js/mode_toggle.js', 'admin/js/lazy_video_preview.js')
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ('name',)
     search_fields = ('name',)
 
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    """Queued contact emails (see outbox.py); read-only apart from retrying."""
+    list_display = ('subject', 'from_email', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'from_email', 'body')
+    readonly_fields = [field.name for field in OutboxEmail._meta.fields]
+    actions = ['retry_now']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Retry selected messages now')
+    def retry_now(self, request, queryset):
+        count = queryset.exclude(status=OutboxEmail.SENT).update(
+            status=OutboxEmail.PENDING, attempts=0, next_attempt_at=timezone.now(), locked_until=None)
+        outbox.wake()
+        messages.success(request, f"{count} message(s) queued for another attempt.")
+
+@admin.register(VideoProcessingRun)
+class VideoProcessingRunAdmin(admin.ModelAdmin):
+    """
+    Compression telemetry (see video_utils.process_video_upload), read-only.
+    The change list opens with a per-preset summary of the filtered runs.
+    """
+    list_display = ('started_at', 'file_name', 'video', 'quality', 'status', 'used_aggressive', 'resolution',
+                    'output_size_mb', 'total_seconds', 'realtime', 'cpu_seconds', 'peak_rss_mb')
+    list_select_related = ('video__project',)
+    list_filter = ('quality', 'status', 'used_aggressive', 'started_at')
+    search_fields = ('file_name', 'failure_reason', 'video__project__name')
+    readonly_fields = [field.name for field in VideoProcessingRun._meta.fields]
+    date_hierarchy = 'started_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Resolution')
+    def resolution(self, obj):
+        if not obj.input_width:
+            return '-'
+        output = f"{obj.output_width}x{obj.output_height}" if obj.output_width else '?'
+        return f"{obj.input_width}x{obj.input_height} → {output}"
+
+    @admin.display(description='× realtime')
+    def realtime(self, obj):
+        factor = obj.realtime_factor
+        return f"{factor:.2f}" if factor is not None else '-'
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        if hasattr(response, 'context_data') and 'cl' in response.context_data:
+            response.context_data['preset_report'] = self.preset_report(response.context_data['cl'].queryset)
+        return response
+
+    @staticmethod
+    def preset_report(queryset):
+        """Runs per preset: outcomes, average timings and resources, and the size and speed achieved."""
+        succeeded = Q(status=VideoProcessingRun.SUCCEEDED)
+        rows = (queryset.order_by().values('quality').annotate(
+            runs=Count('id'),
+            failures=Count('id', filter=Q(status=VideoProcessingRun.FAILED)),
+            aggressive=Count('id', filter=Q(used_aggressive=True)),
+            probe=Avg('probe_seconds'),
+            decode=Avg('decode_seconds'),
+            encode=Avg('encode_seconds'),
+            total=Avg('total_seconds', filter=succeeded),
+            cpu=Avg('cpu_seconds', filter=succeeded),
+            peak_rss=Max('peak_rss_mb'),
+            input_kbps=Avg('input_bitrate_kbps'),
+            output_kbps=Avg('output_bitrate_kbps', filter=succeeded),
+            video_seconds=Sum('duration_seconds', filter=succeeded),
+            wall_seconds=Sum('total_seconds', filter=succeeded),
+            input_mb=Sum('input_size_mb', filter=succeeded),
+            output_mb=Sum('output_size_mb', filter=succeeded),
+            frames=Sum('frames', filter=succeeded),
+            encode_seconds=Sum(F('decode_seconds') + F('encode_seconds'), filter=succeeded),
+        ).order_by('quality'))
+        report = []
+        for row in rows:
+            row['preset'] = QUALITY_PRESETS.get(row['quality'])
+            row['realtime'] = row['video_seconds'] / row['wall_seconds'] if row['wall_seconds'] else None
+            row['size_ratio'] = row['output_mb'] / row['input_mb'] if row['input_mb'] and row['output_mb'] else None
+            row['fps'] = row['frames'] / row['encode_seconds'] if row['encode_seconds'] else None
+            row['cpu_share'] = row['cpu'] / row['total'] if row['cpu'] and row['total'] else None
+            report.append(row)
+        return report
+
 # Technology Stack Manager
 class TechnologyStackAdmin(admin.ModelAdmin):
     """
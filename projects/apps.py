@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+
+
+class ProjectsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'projects'
+
+    def ready(self):
+        # Connect model signal handlers
+        from . import signals  # noqa: F401
+
+        from django.conf import settings
+        from django.db.backends.signals import connection_created
+
+        if settings.PERF_ENABLED:
+            from .perf import install_query_hook
+
+            connection_created.connect(install_query_hook)
@@ -14,3 +14,17 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'projects.settings')
 
 application = get_asgi_application()
+
+# Load the URLconf, and with it every view module, now instead of on each
+# worker's first request. Under `gunicorn --preload` this runs once in the
+# master, so forked workers boot instantly and share these pages copy-on-write.
+from django.urls import get_resolver  # noqa: E402
+
+get_resolver().url_patterns
+
+# Start this process's outbox sender (see outbox.py). Under gunicorn this may be
+# the master, which serves nothing; gunicorn.conf.py starts it in each worker.
+if 'gunicorn' not in os.environ.get('SERVER_SOFTWARE', ''):
+    from projects import outbox
+
+    outbox.start()
@@ -0,0 +1,410 @@
+"""
+Static asset pipeline for the public pages.
+
+`build_assets` (run automatically by collectstatic) writes everything the
+pages load into static/dist/, so collectstatic picks it up like any other
+static file and CompressedManifestStaticFilesStorage fingerprints it and
+writes the .br/.gz siblings WhiteNoise serves:
+
+- css/site.css: static/scss/main.scss compiled with Dart Sass, preceded by
+  @font-face rules for the self-hosted fonts
+- js/<page>.js: each page's scripts concatenated in load order and minified,
+  so a page makes one deferred request instead of three to seven blocking ones
+- fonts/*.woff2: only the Google Fonts weights the stylesheet uses, fetched
+  once into .asset-cache/ and subset to the Latin range
+- critical/<template>.css: the part of site.css each page needs for first
+  paint, inlined into <head> (see critical_css.py)
+- sprites/tech.png|webp: every tech-stack icon in one image, with its CSS
+  map appended to site.css (see tech_sprite.py)
+
+The {% asset_styles %} / {% asset_scripts %} tags read dist/assets.json to
+pick the bundles; without a build (local development) they link the source
+files instead.
+"""
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import posixpath
+import re
+import shutil
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+logger = logging.getLogger(__name__)
+
+ASSET_BUILD_DIR = Path(settings.BASE_DIR) / 'static' / 'dist'
+ASSET_CACHE_DIR = Path(settings.BASE_DIR) / '.asset-cache'
+MANIFEST_NAME = 'dist/assets.json'
+BUILD_SUBDIRS = ['css', 'js', 'fonts', 'critical', 'sprites']
+
+SCSS_ENTRY = 'scss/main.scss'
+# Where the stylesheet used to be served from; its relative url()s are written against it
+CSS_SOURCE = 'css/main.css'
+CSS_BUNDLE = 'dist/css/site.css'
+
+# Scripts each page loads, in execution order
+SITE_SCRIPTS = ['js/components/navbar.js', 'js/parallax.js', 'js/main.js']
+PAGE_SCRIPTS = {
+    # about, contact, projects and the error pages
+    'site': SITE_SCRIPTS,
+    'home': SITE_SCRIPTS + ['js/carousel.js'],
+    'project_detail': SITE_SCRIPTS + [
+        'js/components/lightbox.js',
+        'js/components/contentCards.js',
+        'js/components/videoScrub.js',
+        'js/components/hlsPlayer.js',
+    ],
+}
+
+# Families the site loads from Google Fonts, with the weight range each offers
+FONT_FAMILIES = {
+    'IBM Plex Sans': (100, 700),
+    'Montserrat': (100, 900),
+    'Raleway': (100, 900),
+}
+FONT_SUBSET = 'latin'
+GOOGLE_FONTS_CSS = 'https://fonts.googleapis.com/css2'
+# Google Fonts only returns woff2 URLs to browsers it knows support them
+GOOGLE_FONTS_USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+)
+
+CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+_WEIGHT_KEYWORDS = {'normal': 400, 'bold': 700}
+
+
+def google_fonts_url(weights_by_family):
+    """Google Fonts CSS2 URL for the given {family: weights}."""
+    families = '&'.join(
+        f"family={family.replace(' ', '+')}:wght@{';'.join(str(w) for w in sorted(weights))}"
+        for family, weights in sorted(weights_by_family.items()) if weights
+    )
+    return f'{GOOGLE_FONTS_CSS}?{families}&display=swap'
+
+
+def source_path(name):
+    """Absolute path of a static source file, via the staticfiles finders."""
+    path = finders.find(name)
+    if not path:
+        raise ValueError(f"Static source '{name}' not found")
+    return Path(path)
+
+
+def compile_scss():
+    """Compile the site stylesheet with Dart Sass (compressed)."""
+    import sass_embedded
+
+    entry = source_path(SCSS_ENTRY)
+    result = sass_embedded.compile_string(
+        entry.read_text(encoding='utf-8'), load_paths=[entry.parent], style='compressed',
+    )
+    if not result.ok:
+        raise RuntimeError(f'Sass compilation failed: {result.error}')
+    # Compressed output marks non-ASCII stylesheets with a BOM; build() declares @charset instead
+    return result.output.lstrip('\ufeff')
+
+
+def rewrite_urls(css, base_name, rewrite):
+    """
+    Rewrite the relative url()s in `css`, written for static file `base_name`.
+
+    `rewrite` gets each reference resolved to a static name and returns the new URL.
+    """
+    base_dir = posixpath.dirname(base_name)
+
+    def replace(match):
+        url = match.group(2).strip()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        path, _, suffix = url.partition('?')
+        new_url = rewrite(posixpath.normpath(posixpath.join(base_dir, path)))
+        return f'url("{new_url}{"?" + suffix if suffix else ""}")'
+
+    return CSS_URL_RE.sub(replace, css)
+
+
+def rebase_urls(css, source_name, target_name):
+    """Rewrite relative url()s in `css` written for `source_name` so they work from `target_name`."""
+    target_dir = posixpath.dirname(target_name)
+    return rewrite_urls(css, source_name, lambda name: posixpath.relpath(name, target_dir))
+
+
+def used_font_weights(css):
+    """
+    Return {family: weights} for the FONT_FAMILIES the stylesheet references.
+
+    Weights are collected across all rules (families and weights are usually
+    set on different selectors and inherited), clamped to what each family
+    offers; 400 is always included for body text.
+    """
+    import tinycss2
+
+    families, weights = set(), {400}
+
+    def walk(rules):
+        for rule in rules:
+            if rule.type == 'at-rule' and rule.content is not None:
+                walk(tinycss2.parse_rule_list(rule.content, skip_comments=True, skip_whitespace=True))
+            elif rule.type == 'qualified-rule':
+                for declaration in tinycss2.parse_blocks_contents(rule.content, skip_comments=True, skip_whitespace=True):
+                    if declaration.type != 'declaration':
+                        continue
+                    value = tinycss2.serialize(declaration.value).strip().lower()
+                    if declaration.lower_name == 'font-family':
+                        families.update(family for family in FONT_FAMILIES if family.lower() in value)
+                    elif declaration.lower_name == 'font-weight':
+                        weight = _WEIGHT_KEYWORDS.get(value) or (int(value) if value.isdigit() else None)
+                        if weight:
+                            weights.add(weight)
+
+    walk(tinycss2.parse_stylesheet(css, skip_comments=True, skip_whitespace=True))
+    return {
+        family: sorted(w for w in weights if FONT_FAMILIES[family][0] <= w <= FONT_FAMILIES[family][1])
+        for family in sorted(families)
+    }
+
+
+def _cached_fetch(url, headers=None):
+    """GET a URL through the on-disk asset cache (fonts never change under a URL)."""
+    import httpx
+
+    path = ASSET_CACHE_DIR / hashlib.sha1(url.encode()).hexdigest()
+    if path.exists():
+        return path.read_bytes()
+    response = httpx.get(url, headers=headers, follow_redirects=True, timeout=30)
+    response.raise_for_status()
+    ASSET_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(response.content)
+    return response.content
+
+
+def parse_unicode_range(value):
+    """Codepoints covered by a CSS unicode-range value (U+0000-00FF, U+0131, U+4??)."""
+    codepoints = set()
+    for part in value.replace(' ', '').split(','):
+        part = part.upper().removeprefix('U+')
+        if not part:
+            continue
+        if '?' in part:
+            start, end = int(part.replace('?', '0'), 16), int(part.replace('?', 'F'), 16)
+        elif '-' in part:
+            start, end = (int(bound, 16) for bound in part.split('-', 1))
+        else:
+            start = end = int(part, 16)
+        codepoints.update(range(start, end + 1))
+    return codepoints
+
+
+def google_font_faces(weights_by_family, subset=FONT_SUBSET):
+    """
+    Fetch the Google Fonts stylesheet and return the @font-face rules for one subset.
+
+    Returns:
+        list of dicts with family, style, weight, url and unicode_range
+    """
+    import tinycss2
+
+    css = _cached_fetch(google_fonts_url(weights_by_family), {'User-Agent': GOOGLE_FONTS_USER_AGENT}).decode()
+    faces, label = [], None
+    for rule in tinycss2.parse_stylesheet(css, skip_whitespace=True):
+        if rule.type == 'comment':
+            # Google labels each @font-face with its subset: /* latin */
+            label = rule.value.strip()
+            continue
+        if rule.type != 'at-rule' or rule.lower_at_keyword != 'font-face':
+            continue
+        descriptors = {
+            declaration.lower_name: tinycss2.serialize(declaration.value).strip()
+            for declaration in tinycss2.parse_blocks_contents(rule.content, skip_comments=True, skip_whitespace=True)
+            if declaration.type == 'declaration'
+        }
+        if label != subset:
+            continue
+        url = CSS_URL_RE.search(descriptors.get('src', ''))
+        if not url:
+            continue
+        faces.append({
+            'family': descriptors['font-family'].strip('\'"'),
+            'style': descriptors.get('font-style', 'normal'),
+            'weight': int(descriptors.get('font-weight', '400').split()[0]),
+            'url': url.group(2),
+            'unicode_range': descriptors.get('unicode-range', ''),
+        })
+    if not faces:
+        raise ValueError(f"Google Fonts returned no '{subset}' faces")
+    return faces
+
+
+def subset_font(data, unicode_range, weights=None):
+    """
+    Subset a font file to a unicode-range and return woff2 bytes.
+
+    Hinting is dropped (browsers on high-DPI screens ignore it) and, for
+    variable fonts, the weight axis is limited to the weights in use.
+    """
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+
+    font = TTFont(io.BytesIO(data))
+    if weights and 'fvar' in font and any(axis.axisTag == 'wght' for axis in font['fvar'].axes):
+        from fontTools.varLib import instancer
+
+        limit = weights[0] if len(weights) == 1 else (min(weights), max(weights))
+        font = instancer.instantiateVariableFont(font, {'wght': limit})
+
+    options = subset.Options()
+    options.flavor = 'woff2'
+    options.hinting = False
+    options.desubroutinize = True
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=parse_unicode_range(unicode_range) if unicode_range else [])
+    subsetter.subset(font)
+
+    output = io.BytesIO()
+    subset.save_font(font, output, options)
+    return output.getvalue()
+
+
+def build_fonts(weights_by_family, output_dir):
+    """
+    Self-host the used font weights under output_dir/fonts/.
+
+    Faces that share a file (variable fonts) are written once with a weight
+    range. Returns (font-face CSS for the stylesheet bundle, list of font names).
+    """
+    grouped = {}
+    for face in google_font_faces(weights_by_family):
+        grouped.setdefault((face['family'], face['style'], face['url']), []).append(face)
+
+    (output_dir / 'fonts').mkdir(parents=True, exist_ok=True)
+    rules, names = [], []
+    for (family, style, url), faces in grouped.items():
+        weights = sorted({face['weight'] for face in faces})
+        slug = re.sub(r'[^a-z0-9]+', '-', family.lower()).strip('-')
+        weight = str(weights[0]) if len(weights) == 1 else f'{weights[0]} {weights[-1]}'
+        italic = '-italic' if style == 'italic' else ''
+        name = f"dist/fonts/{slug}-{weight.replace(' ', '-')}{italic}-{FONT_SUBSET}.woff2"
+        data = subset_font(_cached_fetch(url), faces[0]['unicode_range'], weights)
+        (output_dir / 'fonts' / posixpath.basename(name)).write_bytes(data)
+        names.append(name)
+
+        src = posixpath.relpath(name, posixpath.dirname(CSS_BUNDLE))
+        rules.append(
+            f'@font-face{{font-family:"{family}";font-style:{style};font-weight:{weight};'
+            f'font-display:swap;src:url("{src}") format("woff2");unicode-range:{faces[0]["unicode_range"]}}}'
+        )
+    return ''.join(rules), names
+
+
+def bundle_scripts(names):
+    """Concatenate scripts in order (they share the global scope, as separate tags did) and minify."""
+    import rjsmin
+
+    sources = [source_path(name).read_text(encoding='utf-8') for name in names]
+    return rjsmin.jsmin('\n;\n'.join(sources))
+
+
+def compressed_sizes(data):
+    """Raw, gzip and brotli sizes, as WhiteNoise would serve them."""
+    import brotli
+
+    return {'raw': len(data), 'gzip': len(gzip.compress(data, 9)), 'brotli': len(brotli.compress(data))}
+
+
+def build(output_dir=ASSET_BUILD_DIR, self_host_fonts=True):
+    """
+    Build every bundle into output_dir and write the asset manifest.
+
+    If the fonts cannot be fetched (offline build with an empty cache), the
+    pages fall back to a Google Fonts stylesheet trimmed to the used weights.
+
+    Returns:
+        dict: the manifest plus a per-page size report
+    """
+    output_dir = Path(output_dir)
+    # Only this build's own output; dist/images/ is kept up to date by optimize_images
+    for subdir in BUILD_SUBDIRS:
+        if (output_dir / subdir).exists():
+            shutil.rmtree(output_dir / subdir)
+    (output_dir / 'css').mkdir(parents=True)
+    (output_dir / 'js').mkdir()
+
+    from . import tech_sprite
+    sprite_css, sprite_techs = tech_sprite.build(output_dir)
+    css = rebase_urls(compile_scss(), CSS_SOURCE, CSS_BUNDLE) + sprite_css
+    weights = used_font_weights(css)
+    font_css, fonts, font_stylesheet = '', [], None
+    if self_host_fonts:
+        try:
+            font_css, fonts = build_fonts(weights, output_dir)
+        except Exception as e:
+            logger.warning(f"[ASSETS] Could not self-host fonts, linking Google Fonts instead: {e}")
+    if not fonts:
+        font_stylesheet = google_fonts_url(weights)
+    (output_dir / 'css' / 'site.css').write_text('@charset "UTF-8";' + font_css + css, encoding='utf-8')
+
+    from . import critical_css
+    critical = critical_css.build(font_css + css, output_dir)
+
+    scripts = {}
+    for page, names in PAGE_SCRIPTS.items():
+        scripts[page] = f'dist/js/{page}.js'
+        (output_dir / 'js' / f'{page}.js').write_text(bundle_scripts(names), encoding='utf-8')
+
+    manifest = {
+        'css': CSS_BUNDLE,
+        'scripts': scripts,
+        'fonts': fonts,
+        'font_stylesheet': font_stylesheet,
+        'font_weights': weights,
+        'critical': {template: result['name'] for template, result in critical.items()},
+        'tech_sprite': sprite_techs,
+    }
+    tmp_path = output_dir / 'assets.json.tmp'
+    tmp_path.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    os.replace(tmp_path, output_dir / posixpath.basename(MANIFEST_NAME))
+
+    return {**manifest, 'report': size_report(output_dir, manifest), 'critical_report': critical}
+
+
+def size_report(output_dir, manifest):
+    """
+    Compare what each page downloaded before (main.css plus one request per
+    script) with its bundles. Font bytes are reported separately since the
+    Google-hosted sizes are not known at build time.
+    """
+    def built(name):
+        return (Path(output_dir) / name.removeprefix('dist/')).read_bytes()
+
+    source_css = source_path(CSS_SOURCE).read_bytes()
+    bundle_css = built(manifest['css'])
+    report = {}
+    for page, names in PAGE_SCRIPTS.items():
+        before = [source_css] + [source_path(name).read_bytes() for name in names]
+        after = [bundle_css, built(manifest['scripts'][page])]
+        report[page] = {
+            'requests': (len(before), len(after)),
+            'before': _sum_sizes(before),
+            'after': _sum_sizes(after),
+        }
+    google_faces = sum(len(range(low, high + 1, 100)) for low, high in FONT_FAMILIES.values())
+    report['fonts'] = {
+        'faces': (google_faces, sum(len(w) for w in manifest['font_weights'].values())),
+        'bytes': sum(len(built(name)) for name in manifest['fonts']),
+        'files': len(manifest['fonts']),
+    }
+    return report
+
+
+def _sum_sizes(files):
+    totals = {'raw': 0, 'gzip': 0, 'brotli': 0}
+    for data in files:
+        for key, value in compressed_sizes(data).items():
+            totals[key] += value
+    return totals
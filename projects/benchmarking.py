@@ -0,0 +1,116 @@
+"""
+Scratch environment for the benchmark commands (bench_suite, check_perf, check_profiling).
+
+Benchmarks seed data and clear caches, so they never run against the site's
+own database or CACHE_DIR. scratch() creates Django's test database, the one
+`manage.py test` uses (in memory on SQLite). It points every cache at a
+temporary directory, and drops both afterwards. The site keeps serving,
+and writing, while a benchmark runs. seed_catalog() fills the scratch
+database with a generated catalog.
+
+Pass/fail behaviour checks live in projects/tests/ instead, run by
+projects.test_runner, which uses the same scratch_settings().
+"""
+import copy
+import os
+import random
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from .models import Category, ProjectCard, ProjectPhoto, Projects
+
+SEED = 1234
+DETAIL_DESCRIPTION_SIZE = 50_000  # characters of markdown in the catalog's detail project
+
+
+def _scratch_caches(directory):
+    """settings.CACHES with every on-disk LOCATION (SQLite L2s, rate-limit counters) moved into `directory`."""
+    def move(value):
+        if isinstance(value, dict):
+            return {key: os.path.join(directory, os.path.basename(val))
+                    if key == 'LOCATION' and isinstance(val, str) and os.path.isabs(val) else move(val)
+                    for key, val in value.items()}
+        return value
+    return move(copy.deepcopy(settings.CACHES))
+
+
+def scratch_settings(directory):
+    """Settings that keep caches, profiles, rate-limit counters and the featured version stamp under `directory`."""
+    return {
+        'CACHES': _scratch_caches(directory),
+        'CACHE_DIR': directory,
+        'PROFILE_DIR': os.path.join(directory, 'profiles'),
+        'FEATURED_VERSION_FILE': os.path.join(directory, 'featured_version'),
+    }
+
+
+@contextmanager
+def scratch():
+    """Run the block against a fresh test database and empty caches; yields the temporary directory."""
+    with tempfile.TemporaryDirectory() as directory, override_settings(
+            **scratch_settings(directory), ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            RATELIMIT_ENABLE=False):
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            yield directory
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+
+def markdown_text(size, rng):
+    """A blog-post-like markdown body of about `size` characters: headings, prose, lists, tables, images."""
+    words = ('render', 'camera', 'design', 'layout', 'motion', 'frame', 'color', 'project', 'client', 'brand',
+             'video', 'sketch', 'type', 'grid', 'light', 'story', 'edit', 'print', 'scene', 'draft')
+    parts, length, section = [], 0, 0
+    while length < size:
+        section += 1
+        block = [f'## Section {section}', '']
+        for _ in range(3):
+            sentence = ' '.join(rng.choice(words) for _ in range(rng.randint(40, 80)))
+            block += [f'{sentence.capitalize()}, with **bold**, *emphasis* and a [link](https://example.com/{section}).', '']
+        block += [f'- {rng.choice(words)} `{rng.choice(words)}`' for _ in range(5)] + ['']
+        block += ['| Step | Tool | Hours |', '| --- | --- | --- |']
+        block += [f'| {i} | {rng.choice(words)} | {rng.randint(1, 40)} |' for i in range(4)] + ['']
+        block += [f'![{rng.choice(words)}](https://res.cloudinary.com/demo/image/upload/bench/{section}.jpg)', '']
+        block += ['> ' + ' '.join(rng.choice(words) for _ in range(20)), '']
+        text = '\n'.join(block)
+        parts.append(text)
+        length += len(text)
+    return '\n'.join(parts)[:size]
+
+
+def seed_catalog(projects, photos):
+    """
+    Fill the scratch database with `projects` projects of `photos` photos each, plus one long
+    blog-post project (DETAIL_DESCRIPTION_SIZE characters, 20 photos, 3 cards).
+
+    Returns:
+        The detail project
+    """
+    rng = random.Random(SEED)
+    categories = [Category.objects.get_or_create(name=name)[0]
+                  for name in ('Bench Design', 'Bench Video', 'Bench Web')]
+    Projects.objects.bulk_create(
+        Projects(name=f'Bench project {n:05d}', description=markdown_text(600, rng), year=2015 + n % 10,
+                 category=categories[n % len(categories)], featured=n % 25 == 0,
+                 technologies=['python', 'django'] if n % 2 else ['javascript'],
+                 thumbnail_image=f'image/upload/v1/bench/thumb{n}.jpg')
+        for n in range(projects)
+    )
+    ids = list(Projects.objects.values_list('pk', flat=True))
+    ProjectPhoto.objects.bulk_create(
+        ProjectPhoto(project_id=project_id, image=f'image/upload/v1/bench/photo{project_id}-{i}.jpg',
+                     caption=f'Photo {i}', order=i)
+        for project_id in ids for i in range(photos)
+    )
+    detail = Projects.objects.create(name='Bench detail project', year=2024, category=categories[0],
+                                     description=markdown_text(DETAIL_DESCRIPTION_SIZE, rng), display_mode='blogpost')
+    ProjectPhoto.objects.bulk_create(
+        ProjectPhoto(project=detail, image=f'image/upload/v1/bench/detail{i}.jpg', order=i) for i in range(20))
+    ProjectCard.objects.bulk_create(
+        ProjectCard(project=detail, title=f'Card {i}', teaser='Teaser', body=markdown_text(2000, rng), order=i)
+        for i in range(3))
+    return detail
@@ -0,0 +1,339 @@
+"""
+Cache backends.
+
+TieredCache puts a small in-process LocMem tier (L1) in front of a shared
+backend (L2, normally SQLiteCache); see its docstring.
+
+SQLiteCache keeps entries in a local SQLite file, so every process on the
+host (gunicorn or uvicorn workers, management commands) sees the same values
+without a cache server, and they survive restarts. It is meant for small, hot
+entries such as rate-limit counters:
+
+- every operation is one statement on the primary key; add() and incr() are
+  atomic across processes (INSERT ... ON CONFLICT, UPDATE ... RETURNING)
+- integers are stored as SQLite integers, so incr() never unpickles; other
+  values are pickled
+- expired entries read as missing. Every CULL_EVERY writes (per process)
+  they are deleted, and if the table is still over MAX_ENTRIES the entries
+  closest to expiry go too (1/CULL_FREQUENCY of the table), so the file
+  stays bounded
+
+    CACHES = {'ratelimit': {
+        'BACKEND': 'projects.cache_backends.SQLiteCache',
+        'LOCATION': '/tmp/ratelimit.sqlite3',
+        'OPTIONS': {'MAX_ENTRIES': 100000, 'CULL_EVERY': 1000},
+    }}
+"""
+import itertools
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.module_loading import import_string
+
+from . import perf
+
+# Stored as the expiry of entries that never expire
+NEVER = 2 ** 62
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = location
+        self._cull_every = int(options.get('CULL_EVERY', 1000))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+        self._writes = itertools.count(1)
+
+    def _connection(self):
+        # One connection per thread, reopened after a fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=self._busy_timeout, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS cache '
+                               '(key TEXT PRIMARY KEY, value, expires REAL NOT NULL) WITHOUT ROWID')
+            connection.execute('CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)')
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def _expires(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        return NEVER if expires is None else expires
+
+    @staticmethod
+    def _encode(value):
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _decode(value):
+        return value if isinstance(value, int) else pickle.loads(value)
+
+    def _write(self, sql, params):
+        """Run a write statement to completion; returns (RETURNING rows, changed row count)."""
+        connection = self._connection()
+        cursor = connection.execute(sql, params)
+        # Stepping to the end finishes the statement, releasing the write lock
+        rows = cursor.fetchall()
+        if next(self._writes) % self._cull_every == 0:
+            self._cull(connection)
+        return rows, cursor.rowcount
+
+    def _cull(self, connection):
+        connection.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        if self._max_entries:
+            (count,) = connection.execute('SELECT COUNT(*) FROM cache').fetchone()
+            if count > self._max_entries:
+                connection.execute('DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires LIMIT ?)',
+                                   (count // self._cull_frequency,))
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute('SELECT value FROM cache WHERE key = ? AND expires > ?',
+                                         (key, time.time())).fetchone()
+        return default if row is None else self._decode(row[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not keys:
+            return {}
+        rows = self._connection().execute(
+            f"SELECT key, value FROM cache WHERE key IN ({', '.join('?' * len(keys))}) AND expires > ?",
+            (*keys, time.time()))
+        return {keys[key]: self._decode(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._write('INSERT INTO cache VALUES (?, ?, ?) '
+                    'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires',
+                    (key, self._encode(value), self._expires(timeout)))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        # Replaces only an expired entry
+        _, changed = self._write('INSERT INTO cache VALUES (?, ?, ?) '
+                                 'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires '
+                                 'WHERE cache.expires <= ?',
+                                 (key, self._encode(value), self._expires(timeout), time.time()))
+        return changed == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        rows, _ = self._write("UPDATE cache SET value = value + ? WHERE key = ? AND expires > ? "
+                              "AND typeof(value) = 'integer' RETURNING value",
+                              (delta, key, time.time()))
+        if not rows:
+            raise ValueError(f"Key '{key}' not found")
+        return rows[0][0]
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        _, changed = self._write('UPDATE cache SET expires = ? WHERE key = ? AND expires > ?',
+                                 (self._expires(timeout), key, time.time()))
+        return changed == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        _, changed = self._write('DELETE FROM cache WHERE key = ?', (key,))
+        return changed == 1
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute('SELECT 1 FROM cache WHERE key = ? AND expires > ?',
+                                          (key, time.time())).fetchone() is not None
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Django closes caches after every request; the connections are cheap to keep
+        pass
+
+
+# Tiers store keys as the tiered cache made them (prefix and version applied once)
+def _raw_key(key, key_prefix, version):
+    return key
+
+
+# Per-process counters for each TieredCache, by LOCATION
+_stats = {}
+_stats_lock = threading.Lock()
+_MISSING = object()
+
+
+class TieredCache(BaseCache):
+    """
+    An in-process LocMem tier (L1) in front of a shared backend (L2).
+
+    Reads try L1, then L2; an L2 hit is copied into L1. Writes go to both.
+    L1 holds entries for at most L1_TIMEOUT seconds and L1_MAX_ENTRIES
+    entries, so a write or clear() in another process is seen here within
+    L1_TIMEOUT seconds. add() and incr() are decided by L2, which makes them
+    as atomic as L2 is. L1_MAX_ENTRIES = 0 turns L1 off.
+
+        CACHES = {'pages': {
+            'BACKEND': 'projects.cache_backends.TieredCache',
+            'LOCATION': 'pages',  # names the L1 tier and the hit counters
+            'TIMEOUT': 600,
+            'OPTIONS': {
+                'L1_MAX_ENTRIES': 300, 'L1_TIMEOUT': 5,
+                'L2': {'BACKEND': 'projects.cache_backends.SQLiteCache', 'LOCATION': '/tmp/pages.sqlite3'},
+            },
+        }}
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        l2 = options['L2']
+        self.name = location
+        self._l1_timeout = options.get('L1_TIMEOUT', 5)
+        l1_max_entries = options.get('L1_MAX_ENTRIES', 300)
+        self._l1 = LocMemCache(f'tiered-{location}', {
+            'TIMEOUT': self._l1_timeout, 'KEY_FUNCTION': _raw_key,
+            'OPTIONS': {'MAX_ENTRIES': l1_max_entries},
+        }) if l1_max_entries else None
+        self._l2 = import_string(l2['BACKEND'])(l2.get('LOCATION', ''), {
+            **l2, 'TIMEOUT': params.get('TIMEOUT', 300), 'KEY_FUNCTION': _raw_key,
+        })
+        with _stats_lock:
+            self._stats = _stats.setdefault(location, {'l1_hits': 0, 'l2_hits': 0, 'misses': 0, 'sets': 0})
+
+    def _count(self, name, n=1):
+        with _stats_lock:
+            self._stats[name] += n
+        if name == 'misses':
+            perf.record_cache(0, n)
+        elif name != 'sets':
+            perf.record_cache(n, 0)
+
+    def _timeouts(self, timeout):
+        """(L2 timeout, L1 timeout) in seconds, or None for no expiry."""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None, self._l1_timeout
+        return timeout, min(timeout, self._l1_timeout)
+
+    def _fill(self, key, value, timeout=None):
+        if self._l1 is not None:
+            self._l1.set(key, value, self._l1_timeout if timeout is None else timeout)
+
+    def stats(self):
+        """Hit counters for this process, plus the entries currently in its L1."""
+        with _stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['l1_hits'] + stats['l2_hits'] + stats['misses']
+        stats['hit_ratio'] = (stats['l1_hits'] + stats['l2_hits']) / lookups if lookups else 0.0
+        stats['l1_hit_ratio'] = stats['l1_hits'] / lookups if lookups else 0.0
+        stats['l1_entries'] = len(self._l1._cache) if self._l1 is not None else 0
+        return stats
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        if self._l1 is not None:
+            value = self._l1.get(key, _MISSING)
+            if value is not _MISSING:
+                self._count('l1_hits')
+                return value
+        value = self._l2.get(key, _MISSING)
+        if value is _MISSING:
+            self._count('misses')
+            return default
+        self._count('l2_hits')
+        self._fill(key, value)
+        return value
+
+    async def aget(self, key, default=None, version=None):
+        # An L1 hit never leaves the event loop
+        key = self.make_and_validate_key(key, version=version)
+        if self._l1 is not None:
+            value = self._l1.get(key, _MISSING)
+            if value is not _MISSING:
+                self._count('l1_hits')
+                return value
+        value = await self._l2.aget(key, _MISSING)
+        if value is _MISSING:
+            self._count('misses')
+            return default
+        self._count('l2_hits')
+        self._fill(key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_and_validate_key(key, version=version): key for key in keys}
+        found = self._l1.get_many(keys) if self._l1 is not None else {}
+        missing = [key for key in keys if key not in found]
+        from_l2 = self._l2.get_many(missing) if missing else {}
+        for key, value in from_l2.items():
+            self._fill(key, value)
+        self._count('l1_hits', len(found))
+        self._count('l2_hits', len(from_l2))
+        self._count('misses', len(missing) - len(from_l2))
+        return {keys[key]: value for key, value in {**found, **from_l2}.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        l2_timeout, l1_timeout = self._timeouts(timeout)
+        self._l2.set(key, value, l2_timeout)
+        self._fill(key, value, l1_timeout)
+        self._count('sets')
+
+    async def aset(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        l2_timeout, l1_timeout = self._timeouts(timeout)
+        await self._l2.aset(key, value, l2_timeout)
+        self._fill(key, value, l1_timeout)
+        self._count('sets')
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        l2_timeout, l1_timeout = self._timeouts(timeout)
+        if self._l2.add(key, value, l2_timeout):
+            self._fill(key, value, l1_timeout)
+            return True
+        if self._l1 is not None:
+            self._l1.delete(key)
+        return False
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        if self._l1 is not None:
+            self._l1.delete(key)
+        return self._l2.incr(key, delta)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        l2_timeout, l1_timeout = self._timeouts(timeout)
+        if self._l1 is not None:
+            self._l1.touch(key, l1_timeout)
+        return self._l2.touch(key, l2_timeout)
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        if self._l1 is not None:
+            self._l1.delete(key)
+        return self._l2.delete(key)
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return (self._l1 is not None and self._l1.has_key(key)) or self._l2.has_key(key)
+
+    def clear(self):
+        if self._l1 is not None:
+            self._l1.clear()
+        self._l2.clear()
+
+    def close(self, **kwargs):
+        self._l2.close(**kwargs)
@@ -0,0 +1,19 @@
+"""
+Cache instrumentation.
+"""
+import os
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+
+from .caching import cache_stats
+
+
+@staff_member_required
+def cache_stats_view(request):
+    """
+    Return hit ratios for every cache in this worker process. The shared tier
+    is common to all workers, but the counters and L1 are per process, so
+    repeated requests may report different workers (see `pid`).
+    """
+    return JsonResponse({'pid': os.getpid(), 'caches': cache_stats()})
@@ -0,0 +1,211 @@
+"""
+Caching helpers on top of the CACHES aliases (see settings.py):
+
+- 'pages': whole public HTML pages, via @cache_response
+- 'urls': JSON API responses keyed by URL, via @cache_response('urls')
+- 'fragments': template fragments, via {% cache ... using="fragments" %}
+- 'ratelimit': rate-limit counters (projects/ratelimit.py)
+
+get_or_compute() / aget_or_compute() rebuild a missing entry once: the first
+caller takes a short lock in the shared tier and computes, the rest wait for
+its result instead of all recomputing at once (a cache stampede).
+
+Pages and API responses are cleared when project content changes (see
+signals.py); other processes keep serving their L1 copy for at most
+CACHE_L1_TIMEOUT seconds.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from functools import lru_cache, wraps
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+# Aliases holding rendered content, cleared by invalidate_content()
+CONTENT_ALIASES = ('pages', 'urls')
+
+# Response headers kept with a cached response
+CACHED_HEADERS = ('Content-Type', 'Content-Language', 'Cache-Control', 'Vary', 'Location')
+
+_MISSING = object()
+
+
+def _lock_key(key):
+    return f'{key}:computing'
+
+
+def get_or_compute(cache, key, compute, timeout=DEFAULT_TIMEOUT, lock_timeout=30, poll=0.05):
+    """
+    Return cache[key], calling compute() to fill it on a miss. Of concurrent
+    callers missing the same key, in any process sharing the cache, one
+    computes and the others wait up to `lock_timeout` seconds for its result.
+    A None result is returned but not stored.
+    """
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+    if cache.add(_lock_key(key), os.getpid(), lock_timeout):
+        try:
+            value = compute()
+            if value is not None:
+                cache.set(key, value, timeout)
+            return value
+        finally:
+            cache.delete(_lock_key(key))
+
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(poll)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if not cache.has_key(_lock_key(key)):
+            break  # the computing caller gave up without a result
+    return compute()
+
+
+async def aget_or_compute(cache, key, compute, timeout=DEFAULT_TIMEOUT, lock_timeout=30, poll=0.05):
+    """get_or_compute() for async callers; `compute` is a coroutine function."""
+    value = await cache.aget(key, _MISSING)
+    if value is not _MISSING:
+        return value
+    if await cache.aadd(_lock_key(key), os.getpid(), lock_timeout):
+        try:
+            value = await compute()
+            if value is not None:
+                await cache.aset(key, value, timeout)
+            return value
+        finally:
+            await cache.adelete(_lock_key(key))
+
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(poll)
+        value = await cache.aget(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if not await cache.ahas_key(_lock_key(key)):
+            break
+    return await compute()
+
+
+@lru_cache(maxsize=1)
+def _build_id():
+    # Pages link hashed static files; a new collectstatic must not serve pages linking the old ones
+    try:
+        return (Path(settings.STATIC_ROOT) / 'staticfiles.json').stat().st_mtime_ns
+    except (OSError, TypeError):
+        return 0
+
+
+def _response_key(request):
+    url = f'{_build_id()}:{request.get_host()}{request.get_full_path()}'
+    return f'response:{hashlib.md5(url.encode()).hexdigest()}'
+
+
+def _per_visitor(request):
+    """
+    Whether the view used the CSRF token or the session. CsrfViewMiddleware and
+    SessionMiddleware only add their cookie and Vary: Cookie after the view
+    returns, so the response alone does not show it yet.
+    """
+    session = getattr(request, 'session', None)
+    return bool(request.META.get('CSRF_COOKIE_NEEDS_UPDATE') or getattr(session, 'accessed', False))
+
+
+def _freeze(request, response):
+    """A cacheable (status, headers, body) for a response, or None if it is per-visitor or streamed."""
+    if (_per_visitor(request) or response.streaming or response.status_code not in (200, 301, 404) or response.cookies
+            or 'Cookie' in response.get('Vary', '') or 'private' in response.get('Cache-Control', '')
+            or 'no-store' in response.get('Cache-Control', '')):
+        return None
+    headers = [(name, response[name]) for name in CACHED_HEADERS if response.has_header(name)]
+    return response.status_code, headers, response.content
+
+
+def _thaw(entry):
+    status, headers, content = entry
+    response = HttpResponse(content, status=status)
+    for name, value in headers:
+        response[name] = value
+    return response
+
+
+def cache_response(alias='pages', timeout=DEFAULT_TIMEOUT):
+    """
+    Cache a view's GET/HEAD responses by URL in `alias`, for the alias's TIMEOUT
+    unless `timeout` is given. A TIMEOUT of 0 turns the cache off. Responses
+    that set cookies, vary on them or are private are never stored, nor are
+    those of a view that read the CSRF token or the session; the views it
+    wraps must not otherwise depend on who is asking.
+    """
+    def decorator(view):
+        def lookup(request):
+            if request.method not in ('GET', 'HEAD'):
+                return None
+            cache = caches[alias]
+            seconds = cache.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+            return (cache, seconds) if seconds != 0 else None
+
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def _wrapped(request, *args, **kwargs):
+                if (cached := lookup(request)) is None:
+                    return await view(request, *args, **kwargs)
+                cache, seconds = cached
+                response = None
+
+                async def compute():
+                    nonlocal response
+                    response = await view(request, *args, **kwargs)
+                    return _freeze(request, response)
+
+                entry = await aget_or_compute(cache, _response_key(request), compute, seconds)
+                return response if response is not None else _thaw(entry)
+        else:
+            @wraps(view)
+            def _wrapped(request, *args, **kwargs):
+                if (cached := lookup(request)) is None:
+                    return view(request, *args, **kwargs)
+                cache, seconds = cached
+                response = None
+
+                def compute():
+                    nonlocal response
+                    response = view(request, *args, **kwargs)
+                    return _freeze(request, response)
+
+                entry = get_or_compute(cache, _response_key(request), compute, seconds)
+                return response if response is not None else _thaw(entry)
+        return _wrapped
+    return decorator
+
+
+def invalidate_content():
+    """Drop cached pages and API responses (fragments are keyed on updated_at and expire alone)."""
+    for alias in CONTENT_ALIASES:
+        try:
+            caches[alias].clear()
+        except Exception as e:
+            logger.error(f"[CACHE] Failed to clear '{alias}': {e}")
+
+
+def cache_stats():
+    """Hit counters for this process: every tiered alias, plus the in-process media URL and featured caches."""
+    from .featured_cache import featured_projects_cache
+    from .media_urls import cache_stats as media_url_stats
+
+    stats = {alias: caches[alias].stats() for alias in settings.CACHES
+             if hasattr(caches[alias], 'stats')}
+    stats['media_urls'] = media_url_stats()
+    stats['featured_projects'] = featured_projects_cache.stats()
+    return stats
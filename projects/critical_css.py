@@ -0,0 +1,179 @@
+"""
+Critical (above-the-fold) CSS for the page templates.
+
+For each template in CRITICAL_TEMPLATES the template source is expanded
+(following literal {% include %}s) up to a {# critical-css: fold #} marker,
+and the tag names, classes and ids it contains are collected. Every rule of
+the built stylesheet whose selectors could match those elements is kept:
+@font-face and @keyframes they use, and @media blocks with at least one
+matching rule. This is a static approximation - it never renders a page, so
+it needs no database at build time - and errs on the side of keeping rules.
+
+{% asset_styles %} inlines the result into <head> and loads the full
+stylesheet asynchronously. Results are cached in .asset-cache/critical/ by
+template and stylesheet hash, so rebuilding only redoes changed pages.
+"""
+import hashlib
+import posixpath
+import re
+
+from django.template.loader import get_template
+
+from .assets import ASSET_CACHE_DIR
+
+CRITICAL_TEMPLATES = ['index.html', 'about.html', 'contact.html', 'projects.html', 'project_detail.html']
+FOLD_MARKER = '{# critical-css: fold #}'
+
+# Always treated as present: the document and flow content rendered from
+# Markdown/CKEditor fields, which never appears literally in the templates
+SAFELIST_TAGS = {
+    'html', 'body', 'p', 'a', 'span', 'div', 'img', 'strong', 'em', 'b', 'i', 'br',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'li', 'blockquote', 'code', 'pre',
+}
+# Classes scripts add during load (main.js's iOS background fallback, carousel state)
+SAFELIST_CLASSES = {'ios-blend-fallback', 'active'}
+
+CACHE_DIR = ASSET_CACHE_DIR / 'critical'
+
+_INCLUDE_RE = re.compile(r'{%\s*include\s+[\'"]([^\'"]+)[\'"][^%]*%}')
+_TEMPLATE_SYNTAX_RE = re.compile(r'{%.*?%}|{{.*?}}|{#.*?#}', re.S)
+_ATTRIBUTE_RE = re.compile(r'\s(class|id)\s*=\s*"([^"]*)"', re.S)
+_TAG_RE = re.compile(r'<([a-zA-Z][a-zA-Z0-9-]*)')
+# Elements rendered by the asset template tags: (tags, classes); class/id arguments are added too
+TAG_OUTPUT = {
+    'picture': ({'picture', 'source', 'img'}, set()),
+    'tech_icon': ({'span', 'picture', 'source', 'img'}, {'tech-icon', 'tech-sprite'}),
+}
+_OUTPUT_TAG_RE = re.compile(rf'{{%\s*({"|".join(TAG_OUTPUT)})\s(.*?)%}}', re.S)
+_TAG_ARGUMENT_RE = re.compile(r'\s(class|id)=([\'"])(.*?)\2')
+
+
+def above_the_fold(template_name):
+    """Template source with literal includes expanded, cut at the first fold marker."""
+    parts = []
+
+    def expand(name):
+        source = get_template(name).template.source
+        position = 0
+        for match in re.finditer(f'{re.escape(FOLD_MARKER)}|{_INCLUDE_RE.pattern}', source):
+            parts.append(source[position:match.start()])
+            position = match.end()
+            if match.group(0) == FOLD_MARKER or not expand(match.group(1)):
+                return False
+        parts.append(source[position:])
+        return True
+
+    expand(template_name)
+    return ''.join(parts)
+
+
+def fold_tokens(html):
+    """Tag names, classes and ids in template HTML (template syntax stripped, both branches of ifs kept)."""
+    tags, classes, ids = set(SAFELIST_TAGS), set(SAFELIST_CLASSES), set()
+    tags.update(tag.lower() for tag in _TAG_RE.findall(html))
+    for attribute, value in _ATTRIBUTE_RE.findall(html):
+        words = _TEMPLATE_SYNTAX_RE.sub(' ', value).split()
+        (classes if attribute == 'class' else ids).update(words)
+    for tag, arguments in _OUTPUT_TAG_RE.findall(html):
+        tags.update(TAG_OUTPUT[tag][0])
+        classes.update(TAG_OUTPUT[tag][1])
+        for attribute, _, value in _TAG_ARGUMENT_RE.findall(arguments):
+            (classes if attribute == 'class' else ids).update(value.split())
+    return tags, classes, ids
+
+
+def split_selectors(prelude):
+    """Split a selector list on top-level commas (not those inside :is(...) etc.)."""
+    selectors, depth, current = [], 0, ''
+    for char in prelude:
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            selectors.append(current)
+            current = ''
+            continue
+        current += char
+    selectors.append(current)
+    return [selector.strip() for selector in selectors if selector.strip()]
+
+
+def selector_matches(selector, tags, classes, ids):
+    """Whether every tag, class and id a selector requires is in the fold (pseudo-classes are ignored)."""
+    # :not(...) can only exclude elements, so its contents never make a selector required
+    selector = re.sub(r':not\([^)]*\)', '', selector)
+    selector = re.sub(r'\[[^\]]*\]', '', selector)
+    selector = re.sub(r'::?[a-zA-Z-]+(\([^)]*\))?', '', selector)
+    if not all(name in classes for name in re.findall(r'\.([\w-]+)', selector)):
+        return False
+    if not all(name in ids for name in re.findall(r'#([\w-]+)', selector)):
+        return False
+    return all(
+        name.lower() in tags
+        for name in re.findall(r'(?:^|[\s>+~(])([a-zA-Z][\w-]*)', selector)
+    )
+
+
+def extract(css, tags, classes, ids):
+    """The rules of `css` needed to render elements with the given tags/classes/ids."""
+    import tinycss2
+
+    keyframes = {}
+
+    def filter_rules(rules):
+        kept = []
+        for rule in rules:
+            if rule.type == 'qualified-rule':
+                selectors = [
+                    selector for selector in split_selectors(tinycss2.serialize(rule.prelude))
+                    if selector_matches(selector, tags, classes, ids)
+                ]
+                if selectors:
+                    kept.append(f'{",".join(selectors)}{{{tinycss2.serialize(rule.content)}}}')
+            elif rule.type == 'at-rule':
+                keyword = rule.lower_at_keyword
+                if keyword == 'font-face' or rule.content is None:
+                    kept.append(tinycss2.serialize([rule]))
+                elif keyword.endswith('keyframes'):
+                    keyframes[tinycss2.serialize(rule.prelude).strip()] = tinycss2.serialize([rule])
+                elif keyword in ('media', 'supports', 'layer', 'container'):
+                    inner = filter_rules(tinycss2.parse_rule_list(rule.content))
+                    if inner:
+                        kept.append(f'@{rule.at_keyword}{tinycss2.serialize(rule.prelude)}{{{"".join(inner)}}}')
+        return kept
+
+    critical = ''.join(filter_rules(tinycss2.parse_stylesheet(css, skip_comments=True, skip_whitespace=True)))
+    used = [rule for name, rule in keyframes.items() if re.search(rf'(?<![\w-]){re.escape(name)}(?![\w-])', critical)]
+    return critical + ''.join(used)
+
+
+def build(css, output_dir):
+    """
+    Write critical/<template>.css for every CRITICAL_TEMPLATES page.
+
+    Returns:
+        dict: {template name: {'name': static name, 'bytes': size, 'cached': bool}}
+    """
+    stylesheet_hash = hashlib.sha256(css.encode()).hexdigest()
+    (output_dir / 'critical').mkdir(parents=True, exist_ok=True)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    results = {}
+    for template_name in CRITICAL_TEMPLATES:
+        fold = above_the_fold(template_name)
+        template_hash = hashlib.sha256(fold.encode()).hexdigest()
+        stem = posixpath.splitext(template_name)[0]
+        cache_path = CACHE_DIR / f'{stem}-{template_hash[:16]}-{stylesheet_hash[:16]}.css'
+
+        cached = cache_path.exists()
+        if cached:
+            critical = cache_path.read_text(encoding='utf-8')
+        else:
+            critical = extract(css, *fold_tokens(fold))
+            cache_path.write_text(critical, encoding='utf-8')
+
+        (output_dir / 'critical' / f'{stem}.css').write_text(critical, encoding='utf-8')
+        results[template_name] = {'name': f'dist/critical/{stem}.css', 'bytes': len(critical.encode()), 'cached': cached}
+    return results
+
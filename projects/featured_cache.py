@@ -0,0 +1,140 @@
+"""
+In-process cache of the featured-project payloads rendered on the homepage.
+
+The payloads are rebuilt only when the version stamp changes. The stamp lives
+in a small file, settings.FEATURED_VERSION_FILE (under CACHE_DIR by default),
+so a save in one gunicorn worker invalidates the cache in every worker without
+a database query on the read path.
+"""
+import os
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .media_urls import resource_url
+
+# Widths offered in the carousel srcset (the stored thumbnail is 600px wide)
+SRCSET_WIDTHS = (300, 600)
+
+def read_version():
+    """Return the current version stamp, or 0 if it has never been bumped."""
+    try:
+        with open(settings.FEATURED_VERSION_FILE, 'r') as f:
+            return int(f.read() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def bump_version():
+    """Invalidate the featured-project cache in every process."""
+    path = settings.FEATURED_VERSION_FILE
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}"
+    with open(tmp_path, 'w') as f:
+        f.write(str(time.time_ns()))
+    os.replace(tmp_path, path)
+
+
+def build_payload(project):
+    """Build the template payload for one featured project."""
+    thumbnail_url = None
+    srcset = ''
+    if project.thumbnail_image:
+        thumbnail_url = resource_url(project.thumbnail_image)
+        srcset = ', '.join(
+            f"{resource_url(project.thumbnail_image, width=width, crop='scale')} {width}w"
+            for width in SRCSET_WIDTHS
+        )
+    return {
+        'id': project.id,
+        'name': project.name,
+        'thumbnail_url': thumbnail_url,
+        'srcset': srcset,
+    }
+
+
+class FeaturedProjectsCache:
+    """
+    Thread-safe holder for the featured-project payloads.
+
+    `_lock` guards the payloads, version and counters and is only held for a
+    few assignments, so a hit never waits on a database query. A rebuild takes
+    `_rebuild_lock` instead, so concurrent requests after an invalidation only
+    query once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._version = None
+        self._payloads = ()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, version):
+        """Return the payloads if they are at `version` (counting a hit), else None."""
+        with self._lock:
+            if version != self._version:
+                return None
+            self.hits += 1
+            return self._payloads
+
+    def get(self):
+        """Return a tuple of payload dicts for the featured projects."""
+        version = read_version()
+        payloads = self._cached(version)
+        if payloads is not None:
+            return payloads
+
+        with self._rebuild_lock:
+            # Another thread may have rebuilt while we waited
+            payloads = self._cached(version)
+            if payloads is not None:
+                return payloads
+
+            from .models import Projects
+
+            projects = Projects.objects.filter(featured=True).only('id', 'name', 'thumbnail_image')
+            payloads = tuple(build_payload(project) for project in projects)
+            with self._lock:
+                self.misses += 1
+                self._payloads = payloads
+                self._version = version
+            return payloads
+
+    async def aget(self):
+        """get() for async views: a hit stays on the event loop, a rebuild runs in a thread."""
+        payloads = self._cached(read_version())
+        if payloads is not None:
+            return payloads
+        return await sync_to_async(self.get)()
+
+    def clear(self):
+        """Drop this process's cached payloads."""
+        with self._lock:
+            self._version = None
+            self._payloads = ()
+
+    def stats(self):
+        """Return hit/miss counters for this process."""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+            entries, version = len(self._payloads), self._version
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / total if total else 0.0,
+            'entries': entries,
+            'version': version,
+        }
+
+
+featured_projects_cache = FeaturedProjectsCache()
+
+
+def get_featured_projects():
+    """Return the cached featured-project payloads."""
+    return featured_projects_cache.get()
@@ -2,13 +2,61 @@
 Custom field implementations for the projects app.
 """
 from cloudinary.models import CloudinaryField
-from cloudinary import uploader
+from django.core.files.uploadedfile import UploadedFile
+from django.db import models
 import logging
+import uuid
+
+from .media_staging import StagedUpload
+from .media_storage import get_backend
 
 logger = logging.getLogger(__name__)
 
 
-class CompressedVideoField(CloudinaryField):
+class MediaField(CloudinaryField):
+    """
+    A CloudinaryField that uploads through the configured media backend.
+
+    Stored values and URLs are identical to CloudinaryField; only the upload
+    goes through media_storage.get_backend(), so MEDIA_BACKEND='local' keeps
+    everything on disk for offline development and benchmarking.
+    """
+
+    def upload_options(self, model_instance):
+        """Build the upload options for this field (same as CloudinaryField)."""
+        options = {"type": self.type, "resource_type": self.resource_type}
+        options.update({key: val(model_instance) if callable(val) else val for key, val in self.options.items()})
+        return options
+
+    def pre_save(self, model_instance, add):
+        value = models.Field.pre_save(self, model_instance, add)
+        if isinstance(value, StagedUpload) and value.resource is not None:
+            # Already compressed and uploaded by the admin before the transaction opened
+            for name, metadata_value in value.metadata.items():
+                if isinstance(metadata_value, StagedUpload):
+                    # A derived asset staged alongside this one (e.g. a video's poster)
+                    metadata_value.mark_saved()
+                    metadata_value = metadata_value.resource
+                setattr(model_instance, name, metadata_value)
+            value.mark_saved()
+            return self._store(model_instance, value.resource)
+        if isinstance(value, UploadedFile):
+            options = self.upload_options(model_instance)
+            if hasattr(value, 'seekable') and value.seekable():
+                value.seek(0)
+            return self._store(model_instance, get_backend().upload(value, **options))
+        return value
+
+    def _store(self, model_instance, resource):
+        setattr(model_instance, self.attname, resource)
+        if self.width_field:
+            setattr(model_instance, self.width_field, resource.metadata.get('width'))
+        if self.height_field:
+            setattr(model_instance, self.height_field, resource.metadata.get('height'))
+        return self.get_prep_value(resource)
+
+
+class CompressedVideoField(MediaField):
     """
     A CloudinaryField that automatically compresses videos before upload.
     
@@ -16,15 +64,83 @@ class CompressedVideoField(CloudinaryField):
     than 100MB before sending them to Cloudinary.
     """
     
-    def __init__(self, *args, **kwargs):
-        """Initialize field without eager transformations."""
+    def __init__(self, *args, poster_field=None, sprite_field=None, hls_field=None, **kwargs):
+        """
+        Initialize field without eager transformations.
+        
+        Args:
+            poster_field: Name of a MediaField on the model to receive the extracted poster frame
+            sprite_field: Name of a MediaField on the model to receive the scrubbing sprite sheet
+            hls_field: Name of a raw MediaField to receive the HLS master playlist, built when
+                the instance's `hls_enabled` is set
+        """
         # Remove transformation and eager settings to avoid Cloudinary processing
         kwargs.pop('transformation', None)
         kwargs.pop('eager', None)
         kwargs.pop('eager_async', None)
         
+        self.poster_field = poster_field
+        self.sprite_field = sprite_field
+        self.hls_field = hls_field
         super().__init__(*args, **kwargs)
     
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.poster_field:
+            kwargs['poster_field'] = self.poster_field
+        if self.sprite_field:
+            kwargs['sprite_field'] = self.sprite_field
+        if self.hls_field:
+            kwargs['hls_field'] = self.hls_field
+        return name, path, args, kwargs
+    
+    def preview_collector(self, poster_time=None):
+        """Return a VideoPreviewCollector if this field stores previews, else None."""
+        from .video_utils import DEFAULT_POSTER_TIME, VideoPreviewCollector
+        
+        if not (self.poster_field or self.sprite_field):
+            return None
+        return VideoPreviewCollector(poster_time=DEFAULT_POSTER_TIME if poster_time is None else poster_time)
+    
+    def preview_files(self, previews):
+        """
+        Split collected previews into uploads and plain metadata.
+        
+        Returns:
+            Tuple of ({field_name: UploadedFile}, {attribute: value})
+        """
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        
+        result = previews.build() if previews is not None else None
+        if not result:
+            return {}, {}
+        files = {}
+        if self.poster_field:
+            files[self.poster_field] = SimpleUploadedFile('poster.jpg', result.pop('poster'), 'image/jpeg')
+        if self.sprite_field:
+            files[self.sprite_field] = SimpleUploadedFile('sprite.jpg', result.pop('sprite'), 'image/jpeg')
+        metadata = {key: value for key, value in result.items() if key not in ('poster', 'sprite')}
+        return files, metadata
+    
+    def hls_prefix(self):
+        """Unique raw public_id prefix for one video's HLS ladder."""
+        folder = self.options.get('folder') or 'videos'
+        return f"{folder}/hls/{uuid.uuid4().hex}"
+    
+    def upload_hls_ladder(self, file):
+        """Build and upload an HLS ladder for a video file; returns the master playlist resource."""
+        from .video_utils import hls_ladder_for, hls_upload_items
+        
+        with hls_ladder_for(file) as (output_dir, ladder):
+            items = hls_upload_items(output_dir, ladder, self.hls_prefix())
+            try:
+                resources = get_backend().upload_many(items)
+            finally:
+                for upload, _ in items:
+                    upload.close()
+        logger.info(f"[CUSTOM FIELD] Uploaded HLS ladder ({len(ladder['variants'])} renditions, {len(items)} files)")
+        return resources[-1]
+    
     def upload_options(self, model_instance):
         """
         Override upload options to disable eager transformations.
@@ -55,11 +171,20 @@ class CompressedVideoField(CloudinaryField):
         
         logger.info(f"[CUSTOM FIELD] pre_save called, file type: {type(file)}")
         
-        # Check if there's a file to upload
-        if file:
-            from .video_utils import process_video_upload, needs_compression
+        # Check if there's a file to upload (staged uploads were compressed before the transaction)
+        if file and isinstance(file, UploadedFile) and not isinstance(file, StagedUpload):
+            if self.hls_field and getattr(model_instance, 'hls_enabled', False):
+                try:
+                    # Built from the original upload, before compression replaces it
+                    setattr(model_instance, self.hls_field, self.upload_hls_ladder(file))
+                except Exception as e:
+                    logger.error(f"[CUSTOM FIELD] HLS ladder failed, keeping the MP4 only: {e}", exc_info=True)
+            
+            from .video_utils import process_video_upload, needs_compression, extract_previews
             from .progress_tracker import CompressionProgressTracker
             
+            previews = self.preview_collector(getattr(model_instance, 'poster_time', None))
+            
             # Try to get size from different possible locations
             file_size = None
             if hasattr(file, 'size'):
@@ -85,10 +210,16 @@ class CompressedVideoField(CloudinaryField):
                         # Get quality preference from model instance (defaults to 'high')
                         quality = getattr(model_instance, 'compression_quality', 'high')
                         
+                        # Linked to the video once it is saved (see signals.py)
+                        from .models import VideoProcessingRun
+                        model_instance._processing_run = VideoProcessingRun()
+                        
                         compressed_file, was_compressed, orig_mb, final_mb, _ = process_video_upload(
                             file, 
                             progress_tracker=progress_tracker,
-                            quality=quality
+                            quality=quality,
+                            previews=previews,
+                            run=model_instance._processing_run
                         )
                         
                         if was_compressed:
@@ -109,6 +240,16 @@ class CompressedVideoField(CloudinaryField):
                         logger.error(f"[CUSTOM FIELD] Compression failed: {e}", exc_info=True)
                         from django.core.exceptions import ValidationError
                         raise ValidationError(f"Video compression failed: {str(e)}")
+                elif previews is not None:
+                    try:
+                        extract_previews(file, previews)
+                    except Exception as e:
+                        logger.warning(f"[CUSTOM FIELD] Could not extract previews: {e}")
+                
+                # Poster/sprite fields come after this one, so their own pre_save uploads them
+                files, metadata = self.preview_files(previews)
+                for name, value in {**files, **metadata}.items():
+                    setattr(model_instance, name, value)
             else:
                 logger.warning("[CUSTOM FIELD] Could not determine file size!")
         
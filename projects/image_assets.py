@@ -0,0 +1,234 @@
+"""
+Optimized variants of the site's static images.
+
+`optimize_images` (also run by collectstatic) writes into static/dist/images/,
+next to the other build output, for every PNG/JPEG under IMAGE_DIRS:
+
+- a losslessly re-compressed copy of the original (the <img> fallback): PNGs
+  are re-encoded with zlib optimization and, when they use 256 colors or fewer,
+  as an exact palette image; every candidate is verified pixel-for-pixel
+- WebP and AVIF versions at the original size and at each RESPONSIVE_WIDTHS
+  width below it (AVIF needs pillow-avif-plugin on Pillow < 11.3)
+
+Sources are processed in parallel across cores. dist/images.json records each
+source's content hash, so reruns skip unchanged images; the {% picture %} tag
+reads it to emit <picture> with the right sources and intrinsic sizes.
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import posixpath
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+IMAGE_DIRS = ['assets/images', 'assets/tech-stack-used']
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+IMAGE_OUTPUT_DIR = Path(settings.BASE_DIR) / 'static' / 'dist' / 'images'
+IMAGE_MANIFEST_NAME = 'dist/images.json'
+
+RESPONSIVE_WIDTHS = (320, 640, 960, 1280, 1920)
+WEBP_QUALITY = 82
+AVIF_QUALITY = 60
+# Images with at most this many colors (icons, flat graphics) get lossless WebP
+GRAPHIC_MAX_COLORS = 4096
+
+# Part of every content hash (with AVIF availability), so changing the settings above regenerates everything
+ENCODER_VERSION = f'1:{RESPONSIVE_WIDTHS}:{WEBP_QUALITY}:{AVIF_QUALITY}:{GRAPHIC_MAX_COLORS}'
+
+
+def avif_supported():
+    """Whether Pillow can write AVIF (natively from 11.3, or via pillow-avif-plugin)."""
+    from PIL import Image, features
+
+    if features.check('avif'):
+        return True
+    try:
+        import pillow_avif  # noqa: F401 - registers the AVIF plugin
+    except ImportError:
+        return False
+    return 'AVIF' in Image.SAVE
+
+
+def find_sources():
+    """{static name: absolute path} for every image under IMAGE_DIRS in the static source dirs."""
+    from django.contrib.staticfiles import finders
+
+    sources = {}
+    for directory in IMAGE_DIRS:
+        root = finders.find(directory)
+        if not root:
+            continue
+        for path in sorted(Path(root).rglob('*')):
+            if path.suffix.lower() in IMAGE_EXTENSIONS and path.is_file():
+                sources[posixpath.join(directory, path.relative_to(root).as_posix())] = str(path)
+    return sources
+
+
+def content_hash(path, with_avif):
+    digest = hashlib.sha256(f'{ENCODER_VERSION}:{with_avif}'.encode())
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _encode(image, format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format, **options)
+    return buffer.getvalue()
+
+
+def optimize_lossless(image, original):
+    """
+    The smallest lossless encoding of a PNG/JPEG among the original bytes and
+    the re-encoded candidates; a PNG candidate only counts if it decodes to
+    exactly the same pixels.
+    """
+    from PIL import Image
+
+    if image.format == 'JPEG':
+        # Re-encodes Huffman tables only; quantization tables (and so pixels) are kept
+        candidates = [_encode(image, 'JPEG', quality='keep', optimize=True, progressive=True,
+                              icc_profile=image.info.get('icc_profile'))]
+    else:
+        icc_profile = image.info.get('icc_profile')
+        candidates = [_encode(image, 'PNG', optimize=True, icc_profile=icc_profile)]
+        if image.mode in ('RGB', 'RGBA') and image.getcolors(256) is not None:
+            method = Image.Quantize.FASTOCTREE if image.mode == 'RGBA' else Image.Quantize.MEDIANCUT
+            candidates.append(_encode(image.quantize(colors=256, method=method), 'PNG', optimize=True,
+                                      icc_profile=icc_profile))
+
+        reference = image.tobytes()
+        def exact(data):
+            with Image.open(io.BytesIO(data)) as decoded:
+                return decoded.convert(image.mode).tobytes() == reference
+        candidates = [data for data in candidates if exact(data)]
+    return min([original, *candidates], key=len)
+
+
+def process_image(name, path, output_dir, with_avif):
+    """
+    Write every variant of one source image (runs in a worker process).
+
+    Returns:
+        dict: manifest entry with width, height, the fallback name and {format: {width: name}}
+    """
+    from PIL import Image
+
+    if with_avif:
+        avif_supported()  # registers the plugin in this worker
+    output_dir = Path(output_dir)
+    stem = posixpath.splitext(name)[0]
+    original = Path(path).read_bytes()
+
+    with Image.open(io.BytesIO(original)) as image:
+        image.load()
+        width, height = image.size
+        fallback = f'dist/images/{name}'
+        fallback_path = output_dir / name
+        fallback_path.parent.mkdir(parents=True, exist_ok=True)
+        fallback_bytes = optimize_lossless(image, original)
+        fallback_path.write_bytes(fallback_bytes)
+
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        encoders = {
+            'webp': {'lossless': True, 'method': 6} if image.getcolors(GRAPHIC_MAX_COLORS) is not None
+            else {'quality': WEBP_QUALITY, 'method': 6},
+        }
+        if with_avif:
+            encoders['avif'] = {'quality': AVIF_QUALITY, 'speed': 6}
+
+        # Width keys are strings so the entry is the same before and after a JSON round trip
+        formats = {format: {} for format in encoders}
+        for target in [width] + [w for w in reversed(RESPONSIVE_WIDTHS) if w < width]:
+            resized = image if target == width else image.resize(
+                (target, max(1, round(height * target / width))), Image.Resampling.LANCZOS)
+            for format, options in list(encoders.items()):
+                data = _encode(resized, format.upper(), **options)
+                if target == width and len(data) >= len(fallback_bytes):
+                    # Container overhead outweighs the gains on tiny icons; serve the PNG alone
+                    del encoders[format], formats[format]
+                    continue
+                variant_name = f'{stem}.{target}.{format}'
+                (output_dir / variant_name).write_bytes(data)
+                formats[format][str(target)] = f'dist/images/{variant_name}'
+
+    return {'width': width, 'height': height, 'fallback': fallback, 'formats': formats, 'bytes': len(original)}
+
+
+def _manifest_path(output_dir):
+    return Path(output_dir).parent / posixpath.basename(IMAGE_MANIFEST_NAME)
+
+
+def load_manifest(output_dir=IMAGE_OUTPUT_DIR):
+    try:
+        with open(_manifest_path(output_dir), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _outputs(entry):
+    names = [entry['fallback']] + [name for variants in entry['formats'].values() for name in variants.values()]
+    return [name.removeprefix('dist/images/') for name in names]
+
+
+def optimize(output_dir=IMAGE_OUTPUT_DIR, force=False, workers=None):
+    """
+    Bring static/dist/images/ up to date with the source images.
+
+    Unchanged sources (same content hash, all outputs present) are skipped,
+    and the variants of deleted sources are removed.
+
+    Returns:
+        dict: {'processed': [...], 'skipped': [...], 'removed': [...], 'manifest': {...}}
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with_avif = avif_supported()
+    if not with_avif:
+        logger.warning("[IMAGES] AVIF encoding unavailable (install pillow-avif-plugin); writing WebP only")
+
+    previous = load_manifest(output_dir)
+    manifest, pending = {}, {}
+    for name, path in find_sources().items():
+        digest = content_hash(path, with_avif)
+        entry = previous.get(name)
+        if (not force and entry and entry['hash'] == digest
+                and all((output_dir / output).exists() for output in _outputs(entry))):
+            manifest[name] = entry
+        else:
+            pending[name] = (path, digest)
+
+    removed = sorted(set(previous) - set(manifest) - set(pending))
+    for name in removed:
+        for output in _outputs(previous[name]):
+            (output_dir / output).unlink(missing_ok=True)
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = {
+            name: executor.submit(process_image, name, path, str(output_dir), with_avif)
+            for name, (path, digest) in pending.items()
+        }
+        for name, future in futures.items():
+            manifest[name] = {**future.result(), 'hash': pending[name][1]}
+
+    manifest = dict(sorted(manifest.items()))
+    tmp_path = output_dir / 'images.json.tmp'
+    tmp_path.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    os.replace(tmp_path, _manifest_path(output_dir))
+    return {'processed': sorted(pending), 'skipped': sorted(set(manifest) - set(pending)),
+            'removed': removed, 'manifest': manifest}
+
+
+def output_size(entry, format=None, output_dir=IMAGE_OUTPUT_DIR):
+    """Bytes of an entry's fallback, or of its full-size variant in `format`."""
+    name = entry['fallback'] if format is None else entry['formats'][format][str(entry['width'])]
+    return (Path(output_dir) / name.removeprefix('dist/images/')).stat().st_size
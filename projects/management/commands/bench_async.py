@@ -0,0 +1,222 @@
+import http.client
+import itertools
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from projects.models import OutboxEmail, Projects
+from projects.smtp_standin import LocalSMTPServer
+
+from .loadtest import percentile
+
+# One worker process each: the question is how many requests a worker can carry at once
+SERVERS = {
+    'wsgi-sync': [sys.executable, '-m', 'gunicorn', 'projects.wsgi', '--config', os.devnull, '--workers', '1'],
+    'wsgi-gthread': [sys.executable, '-m', 'gunicorn', 'projects.wsgi', '--config', os.devnull,
+                     '--worker-class', 'gthread', '--threads', '4', '--workers', '1'],
+    # As deployed: gunicorn.conf.py's uvicorn worker
+    'asgi': [sys.executable, '-m', 'gunicorn', 'projects.asgi:application', '--config', 'gunicorn.conf.py',
+             '--workers', '1'],
+}
+
+_CSRF_INPUT_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class Command(BaseCommand):
+    help = ('Compare one sync WSGI worker, one gthread WSGI worker and one ASGI worker under concurrent '
+            'page views (with slow clients holding connections) and contact-form posts with a slow SMTP server.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=[*SERVERS, 'all'], default='all', help='Server to start (default: all)')
+        parser.add_argument('--concurrency', default='10,50',
+                            help='Comma-separated numbers of concurrent clients (default: 10,50)')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per measurement')
+        parser.add_argument('--slow-clients', type=int, default=10,
+                            help='Clients trickling their request headers during the page runs')
+        parser.add_argument('--smtp-delay', type=float, default=0.5,
+                            help='Seconds the SMTP stand-in takes to accept each message')
+
+    def handle(self, *args, **options):
+        pages = [reverse('home'), reverse('projects_page')]
+        project = Projects.objects.order_by('pk').first()
+        if project:
+            pages += [reverse('project_detail', args=[project.pk]), f"{reverse('search')}?q={project.name.split()[0]}"]
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError('--concurrency must be comma-separated integers')
+
+        self.stdout.write(
+            f"{options['duration']}s per run; page runs over {len(pages)} URLs with {options['slow_clients']} slow "
+            f"clients; contact posts against an SMTP server taking {options['smtp_delay']}s per message"
+        )
+        names = list(SERVERS) if options['server'] == 'all' else [options['server']]
+        with LocalSMTPServer(delay=options['smtp_delay']) as smtp:
+            for name in names:
+                with self.server(name, smtp.port) as port:
+                    self.stdout.write(self.style.MIGRATE_HEADING(name))
+                    for level in levels:
+                        self.report('pages', level, self.run_pages(port, pages, level, options))
+                        self.report('contact', level, self.run_contact(port, level, options))
+        queued = OutboxEmail.objects.filter(from_email='bench@example.com')
+        self.stdout.write(f'SMTP stand-in received {len(smtp.messages)} messages; removing {queued.count()} '
+                          f'benchmark rows from the outbox')
+        queued.delete()
+
+    def server(self, name, smtp_port):
+        command = self
+
+        class Server:
+            def __enter__(self):
+                with socket.socket() as sock:
+                    sock.bind(('127.0.0.1', 0))
+                    self.port = sock.getsockname()[1]
+                env = {
+                    **os.environ,
+                    'GUNICORN_CMD_ARGS': '--access-logfile=/dev/null',
+                    'EMAIL_HOST': '127.0.0.1', 'EMAIL_PORT': str(smtp_port), 'EMAIL_USE_TLS': 'False',
+                    'EMAIL_HOST_USER': 'bench@example.com', 'EMAIL_HOST_PASSWORD': '',
+                    # Every post comes from one IP
+                    'RATELIMIT_ENABLE': 'False',
+                }
+                bind = ['--bind', f'127.0.0.1:{self.port}', '--log-level', 'warning']
+                self.process = subprocess.Popen(
+                    SERVERS[name] + bind, cwd=settings.BASE_DIR, env=env,
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                )
+                deadline = time.monotonic() + 60
+                while True:
+                    if self.process.poll() is not None:
+                        raise CommandError(f'{name} server exited with {self.process.returncode}')
+                    try:
+                        socket.create_connection(('127.0.0.1', self.port), timeout=1).close()
+                        break
+                    except OSError:
+                        if time.monotonic() > deadline:
+                            raise CommandError(f'{name} server did not start listening within 60s')
+                        time.sleep(0.1)
+                return self.port
+
+            def __exit__(self, *exc_info):
+                self.process.terminate()
+                try:
+                    self.process.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+                command.stdout.flush()
+
+        return Server()
+
+    def measure(self, clients, duration):
+        """Run client(stop, record) in `clients` threads for `duration` seconds; returns (results, seconds)."""
+        stop = threading.Event()
+        lock = threading.Lock()
+        results = []
+
+        def record(started, status):
+            # Requests still in flight when the run ends count towards latency, not throughput
+            with lock:
+                results.append((time.perf_counter() - started, status, not stop.is_set()))
+
+        threads = [threading.Thread(target=client, args=(stop, record)) for client in clients]
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return results, duration
+
+    def run_pages(self, port, pages, level, options):
+        # Look like HTTPS behind the proxy, so SECURE_SSL_REDIRECT doesn't turn every page into a redirect
+        headers = {'X-Forwarded-Proto': 'https'}
+
+        def page_client(offset):
+            def client(stop, record):
+                for path in itertools.islice(itertools.cycle(pages), offset, None):
+                    if stop.is_set():
+                        return
+                    started = time.perf_counter()
+                    try:
+                        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+                        conn.request('GET', path, headers=headers)
+                        response = conn.getresponse()
+                        response.read()
+                        conn.close()
+                        record(started, response.status)
+                    except OSError:
+                        record(started, None)
+            return client
+
+        def slow_client(stop, record):
+            # A phone on a bad connection: the request line and headers arrive over several seconds
+            while not stop.is_set():
+                try:
+                    with socket.create_connection(('127.0.0.1', port), timeout=120) as sock:
+                        for part in (f'GET {pages[0]} HTTP/1.1\r\n', 'Host: 127.0.0.1\r\n',
+                                     'X-Forwarded-Proto: https\r\n', 'Connection: close\r\n', '\r\n'):
+                            sock.sendall(part.encode())
+                            if stop.wait(1.0):
+                                break
+                        else:
+                            sock.recv(65536)
+                except OSError:
+                    pass
+
+        clients = [page_client(i) for i in range(level)] + [slow_client] * options['slow_clients']
+        return self.measure(clients, options['duration'])
+
+    def run_contact(self, port, level, options):
+        path = reverse('contact')
+        origin = {'X-Forwarded-Proto': 'https', 'Referer': f'https://127.0.0.1:{port}{path}'}
+        sequence = itertools.count()
+
+        def client(stop, record):
+            # The form's CSRF token and cookie, once per client
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+                conn.request('GET', path, headers=origin)
+                response = conn.getresponse()
+                token = _CSRF_INPUT_RE.search(response.read().decode()).group(1)
+                cookie = response.getheader('Set-Cookie').split(';', 1)[0]
+                conn.close()
+            except (OSError, AttributeError):
+                return
+            form = {'csrfmiddlewaretoken': token, 'name': 'Bench', 'email': 'bench@example.com', 'subject': 'Benchmark'}
+            post_headers = {**origin, 'Cookie': cookie, 'Content-Type': 'application/x-www-form-urlencoded'}
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+                    # Distinct messages, so the outbox doesn't collapse them as repeats
+                    body = urlencode({**form, 'message': f'Hello from bench_async #{next(sequence)}'})
+                    conn.request('POST', path, body=body, headers=post_headers)
+                    response = conn.getresponse()
+                    response.read()
+                    conn.close()
+                    # A successful send redirects back to the form
+                    record(started, response.status if response.status == 302 else None)
+                except OSError:
+                    record(started, None)
+
+        return self.measure([client] * level, options['duration'])
+
+    def report(self, label, level, result):
+        results, seconds = result
+        served = [(latency, in_time) for latency, status, in_time in results if status and status < 500]
+        latencies = [latency for latency, _ in served]
+        failed = len(results) - len(served)
+        self.stdout.write(
+            f"  {label:<8} {level:>3} clients: {sum(in_time for _, in_time in served) / seconds:7.1f} req/s, "
+            f"p50 {percentile(latencies, 50) * 1000:6.0f} ms, p95 {percentile(latencies, 95) * 1000:6.0f} ms, "
+            f"max {max(latencies, default=0) * 1000:6.0f} ms, {failed} failed"
+        )
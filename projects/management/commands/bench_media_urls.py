@@ -0,0 +1,63 @@
+import time
+
+from cloudinary import CloudinaryResource
+from django.core.management.base import BaseCommand
+
+from projects import media_urls
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark the per-page cost of building Cloudinary URLs (SDK vs memoized).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--photos', type=int, default=40, help='Media items per simulated gallery page')
+        parser.add_argument('--pages', type=int, default=500, help='Number of page renders to simulate')
+        parser.add_argument('--accesses', type=int, default=2,
+                            help='URL accesses per item per page (e.g. preview + markdown snippet)')
+
+    def handle(self, *args, **options):
+        photos = options['photos']
+        pages = options['pages']
+        accesses = options['accesses']
+
+        resources = [
+            CloudinaryResource(
+                public_id=f'project_photos/benchmark_{i:04d}',
+                format='jpg',
+                version='1745826975',
+                type='upload',
+                resource_type='image',
+            )
+            for i in range(photos)
+        ]
+
+        def sdk_page():
+            for resource in resources:
+                for _ in range(accesses):
+                    resource.url
+
+        def memoized_page():
+            for resource in resources:
+                for _ in range(accesses):
+                    media_urls.resource_url(resource)
+
+        # Sanity check: both paths must produce identical URLs
+        for resource in resources:
+            assert media_urls.resource_url(resource) == resource.url
+
+        media_urls.clear_cache()
+        results = {}
+        for label, page in (('cloudinary SDK', sdk_page), ('memoized', memoized_page)):
+            started = time.perf_counter()
+            for _ in range(pages):
+                page()
+            elapsed = time.perf_counter() - started
+            results[label] = elapsed / pages
+            self.stdout.write(
+                f'{label:>15}: {results[label] * 1000:.3f} ms/page '
+                f'({photos * accesses} URLs/page, {pages} pages)'
+            )
+
+        speedup = results['cloudinary SDK'] / results['memoized'] if results['memoized'] else float('inf')
+        self.stdout.write(self.style.SUCCESS(f'Speedup: {speedup:.1f}x'))
+        self.stdout.write(f'URL cache: {media_urls.cache_stats()}')
@@ -0,0 +1,153 @@
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from projects.write_queue import WriteQueue
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark mixed readers and admin-style writers on SQLite: legacy settings vs the production profile.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help='Reader threads (page views)')
+        parser.add_argument('--writers', type=int, default=3, help='Writer threads (admin saves)')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per profile')
+        parser.add_argument('--write-hold', type=float, default=0.05,
+                            help='Seconds a write transaction stays open (simulated slow save)')
+        parser.add_argument('--rows-per-write', type=int, default=20, help='Rows touched per admin save')
+        parser.add_argument('--timeout', type=float, default=2.0,
+                            help='Busy timeout in seconds for both profiles (kept short to surface lock errors)')
+
+    def handle(self, *args, **options):
+        tuned_pragmas = dict(settings.SQLITE_PRAGMAS, busy_timeout=int(options['timeout'] * 1000))
+        profiles = [
+            ('legacy (rollback journal, deferred)', {}, 'BEGIN', False),
+            ('WAL + pragmas + BEGIN IMMEDIATE', tuned_pragmas, 'BEGIN IMMEDIATE', False),
+            ('WAL + BEGIN IMMEDIATE + write queue', tuned_pragmas, 'BEGIN IMMEDIATE', True),
+        ]
+        self.stdout.write(
+            f"{options['readers']} readers, {options['writers']} writers, {options['duration']}s per profile, "
+            f"write hold {options['write_hold'] * 1000:.0f}ms, busy timeout {options['timeout']}s"
+        )
+        for label, pragmas, begin, use_queue in profiles:
+            result = self.run_profile(pragmas, begin, use_queue, options)
+            self.report(label, result)
+
+    def run_profile(self, pragmas, begin, use_queue, options):
+        directory = tempfile.mkdtemp(prefix='bench_sqlite_')
+        path = os.path.join(directory, 'bench.sqlite3')
+        lock_file = os.path.join(directory, 'write.lock')
+
+        def connect():
+            conn = sqlite3.connect(path, timeout=options['timeout'], isolation_level=None, check_same_thread=False)
+            for name, value in pragmas.items():
+                conn.execute(f'PRAGMA {name}={value}')
+            return conn
+
+        setup = connect()
+        setup.execute('CREATE TABLE projects (id INTEGER PRIMARY KEY, name TEXT, description TEXT, featured INTEGER)')
+        setup.execute('CREATE TABLE photos (id INTEGER PRIMARY KEY, project_id INTEGER, caption TEXT, ord INTEGER)')
+        setup.executemany(
+            'INSERT INTO projects (name, description, featured) VALUES (?, ?, ?)',
+            [(f'Project {i}', 'x' * 500, i % 5 == 0) for i in range(200)]
+        )
+        setup.close()
+
+        queue = WriteQueue(lock_file, timeout=60) if use_queue else None
+        stop = threading.Event()
+        lock = threading.Lock()
+        stats = {'read': [], 'write': [], 'read_errors': 0, 'write_errors': 0}
+
+        def reader():
+            conn = connect()
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    conn.execute('SELECT id, name FROM projects WHERE featured = 1').fetchall()
+                    conn.execute('SELECT COUNT(*) FROM photos').fetchone()
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        stats['read'].append(elapsed)
+                except sqlite3.OperationalError:
+                    with lock:
+                        stats['read_errors'] += 1
+            conn.close()
+
+        def write_once(conn, writer_id):
+            conn.execute(begin)
+            try:
+                # Deferred transactions read first and upgrade to a write lock later,
+                # which is where "database is locked" errors come from
+                conn.execute('SELECT COUNT(*) FROM photos WHERE project_id = ?', (writer_id,)).fetchone()
+                time.sleep(options['write_hold'])
+                conn.executemany(
+                    'INSERT INTO photos (project_id, caption, ord) VALUES (?, ?, ?)',
+                    [(writer_id, 'caption', n) for n in range(options['rows_per_write'])]
+                )
+                conn.execute('UPDATE projects SET name = name WHERE id = ?', (writer_id,))
+                conn.execute('COMMIT')
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                raise
+
+        def writer(writer_id):
+            conn = connect()
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    if queue:
+                        with queue.writer():
+                            write_once(conn, writer_id)
+                    else:
+                        write_once(conn, writer_id)
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        stats['write'].append(elapsed)
+                except sqlite3.OperationalError:
+                    with lock:
+                        stats['write_errors'] += 1
+            conn.close()
+
+        threads = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        threads += [threading.Thread(target=writer, args=(n + 1,)) for n in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        shutil.rmtree(directory, ignore_errors=True)
+        stats['duration'] = options['duration']
+        return stats
+
+    def report(self, label, stats):
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        for kind in ('read', 'write'):
+            latencies = stats[kind]
+            errors = stats[f'{kind}_errors']
+            attempts = len(latencies) + errors
+            error_rate = errors / attempts if attempts else 0.0
+            self.stdout.write(
+                f'  {kind:>5}s: {len(latencies) / stats["duration"]:8.1f}/s  '
+                f'lock errors {errors:4d} ({error_rate:6.2%})  '
+                f'p50 {percentile(latencies, 50) * 1000:7.1f}ms  '
+                f'p99 {percentile(latencies, 99) * 1000:7.1f}ms  '
+                f'mean {(statistics.fmean(latencies) if latencies else 0) * 1000:7.1f}ms'
+            )
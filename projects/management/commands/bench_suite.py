@@ -0,0 +1,357 @@
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import JsonResponse
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from projects.benchmarking import DETAIL_DESCRIPTION_SIZE, SEED, markdown_text, scratch, seed_catalog
+from projects.models import Projects
+
+GROUPS = ('video_info', 'compress', 'progress', 'pages', 'serialize', 'markdown')
+
+# Synthetic videos: (width, height, seconds, video bitrate), roughly what a phone or camera hands over
+VIDEO_FIXTURES = [
+    (854, 480, 2, '2500k'),
+    (1280, 720, 2, '5000k'),
+    (1920, 1080, 2, '8000k'),
+    (1920, 1080, 6, '8000k'),
+]
+COMPRESS_FIXTURE = (1920, 1080, 2, '8000k')
+
+MARKDOWN_SIZES = (2_000, 20_000, 100_000)  # characters
+
+# project_rows must stay at least this many times faster than ProjectsSerializer
+MIN_SERIALIZER_SPEEDUP = 5
+
+# Keys whose values are timings (compared with --tolerance); 'queries' must not grow at all
+TIME_METRIC = 'median_s'
+
+
+def _measure(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return {'median_s': statistics.median(samples), 'min_s': min(samples), 'runs': repeat}
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the hot paths on generated fixtures (synthetic videos, a large project catalog, long '
+            'markdown) and compare against a stored baseline: compress_video per preset, get_video_info, '
+            'CompressionProgressTracker, projects_page and project_detail_page (time and queries, and served from the '
+            'L1 and L2 page caches), '
+            'projects_list serialization (DRF and the project_rows fast path) and markdownify. Writes machine-readable JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', default=','.join(GROUPS), help=f"Comma-separated groups: {', '.join(GROUPS)}")
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per benchmark (after one warm-up)')
+        parser.add_argument('--video-repeat', type=int, default=1, help='Timed runs per compress_video preset')
+        parser.add_argument('--projects', type=int, default=1000, help='Projects in the generated catalog')
+        parser.add_argument('--photos', type=int, default=3, help='Photos per catalog project')
+        parser.add_argument('--fixtures', default=os.path.join(settings.CACHE_DIR, 'bench-fixtures'),
+                            help='Directory for the generated videos (reused between runs)')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', default=os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json'),
+                            help='Baseline JSON to compare against, if it exists')
+        parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed slowdown against the baseline before a timing counts as a regression')
+
+    def handle(self, *args, **options):
+        groups = [group.strip() for group in options['only'].split(',') if group.strip()]
+        unknown = set(groups) - set(GROUPS)
+        if unknown:
+            raise CommandError(f"Unknown group(s): {', '.join(sorted(unknown))}")
+
+        # A throwaway database and CACHE_DIR: the catalog is seeded there, and caches cleared there
+        results = {}
+        self.detail = None
+        self.failures = []
+        with scratch():
+            for group in GROUPS:
+                if group in groups:
+                    self.stdout.write(self.style.MIGRATE_HEADING(f'{group}:'))
+                    results.update(getattr(self, f'bench_{group}')(options))
+            report = {'meta': self.meta(options), 'results': results}
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+        if self.failures:
+            raise CommandError(f"{len(self.failures)} check(s) failed: {'; '.join(self.failures)}")
+
+        baseline_path = options['baseline']
+        if options['save_baseline']:
+            os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+            with open(baseline_path, 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {baseline_path}'))
+        elif os.path.exists(baseline_path):
+            with open(baseline_path) as f:
+                regressions = self.compare(json.load(f), report, options['tolerance'])
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s) against {baseline_path}: "
+                                   f"{'; '.join(regressions)}")
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+        else:
+            self.stdout.write(f'No baseline at {baseline_path}; record one with --save-baseline.')
+
+    # Results
+
+    def record(self, results, name, result):
+        results[name] = result
+        if 'error' in result:
+            self.stdout.write(self.style.ERROR(f"  {name}: {result['error']}"))
+            return
+        extra = ', '.join(f'{key} {value:.3g}' if isinstance(value, float) else f'{key} {value}'
+                          for key, value in result.items() if key not in ('median_s', 'min_s', 'runs'))
+        self.stdout.write(f"  {name}: {result['median_s'] * 1000:.2f} ms median, {result['min_s'] * 1000:.2f} ms "
+                          f"min{f' ({extra})' if extra else ''}")
+
+    def meta(self, options):
+        try:
+            commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                    cwd=settings.BASE_DIR, timeout=10).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            commit = None
+        return {
+            'at': datetime.now(timezone.utc).isoformat(),
+            'commit': commit,
+            'python': sys.version.split()[0],
+            'django': django.get_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'projects': options['projects'],
+            'photos': options['photos'],
+        }
+
+    def compare(self, baseline, report, tolerance):
+        for key in ('machine', 'cpus', 'python', 'database'):
+            if baseline['meta'].get(key) != report['meta'].get(key):
+                self.stdout.write(self.style.WARNING(
+                    f"Baseline {key} was {baseline['meta'].get(key)}, now {report['meta'].get(key)}: "
+                    f"timings may not be comparable"))
+
+        regressions = []
+        self.stdout.write(self.style.MIGRATE_HEADING('against the baseline:'))
+        for name, result in report['results'].items():
+            before = baseline['results'].get(name)
+            if before is None or 'error' in before:
+                continue
+            if 'error' in result:
+                regressions.append(f"{name} now fails: {result['error']}")
+                continue
+            change = result[TIME_METRIC] / before[TIME_METRIC] - 1
+            line = f"  {name}: {before[TIME_METRIC] * 1000:.2f} -> {result[TIME_METRIC] * 1000:.2f} ms ({change:+.0%})"
+            regressed = change > tolerance
+            if 'queries' in result and result['queries'] > before.get('queries', result['queries']):
+                line += f", queries {before['queries']} -> {result['queries']}"
+                regressions.append(f"{name} makes {result['queries']} queries (was {before['queries']})")
+            if regressed:
+                regressions.append(f'{name} is {change:.0%} slower')
+            style = self.style.ERROR if regressed else self.style.SUCCESS if change < -tolerance else str
+            self.stdout.write(style(line))
+        return regressions
+
+    # Fixtures
+
+    def videos(self, options):
+        """Generate (once) and return {(width, height, seconds, bitrate): path}."""
+        from imageio_ffmpeg import get_ffmpeg_exe
+
+        directory = options['fixtures']
+        os.makedirs(directory, exist_ok=True)
+        paths = {}
+        for width, height, seconds, bitrate in VIDEO_FIXTURES:
+            path = os.path.join(directory, f'{width}x{height}-{seconds}s-{bitrate}.mp4')
+            if not os.path.exists(path):
+                self.stdout.write(f'  generating {os.path.basename(path)}')
+                subprocess.run([
+                    get_ffmpeg_exe(), '-loglevel', 'error', '-y',
+                    '-f', 'lavfi', '-i', f'testsrc2=size={width}x{height}:rate=30',
+                    '-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=44100',
+                    '-t', str(seconds), '-c:v', 'libx264', '-b:v', bitrate, '-pix_fmt', 'yuv420p',
+                    '-c:a', 'aac', '-shortest', f'{path}.tmp.mp4',
+                ], check=True)
+                os.replace(f'{path}.tmp.mp4', path)
+            paths[(width, height, seconds, bitrate)] = path
+        return paths
+
+    # Benchmarks
+
+    def bench_video_info(self, options):
+        from projects.video_utils import get_video_info
+
+        results = {}
+        for (width, height, seconds, bitrate), path in self.videos(options).items():
+            info = get_video_info(path)
+            result = _measure(lambda: get_video_info(path), options['repeat'])
+            result['size_mb'] = info['file_size'] / (1024 * 1024) if info else None
+            self.record(results, f'get_video_info[{width}x{height},{seconds}s]', result)
+        return results
+
+    def bench_compress(self, options):
+        from projects.models import VideoProcessingRun
+        from projects.video_utils import QUALITY_PRESETS, compress_video
+
+        width, height, seconds, bitrate = COMPRESS_FIXTURE
+        source = self.videos(options)[COMPRESS_FIXTURE]
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for quality in QUALITY_PRESETS:
+                output = os.path.join(directory, f'{quality}.mp4')
+                runs = []
+
+                def compress():
+                    run = VideoProcessingRun()
+                    compress_video(source, output_path=output, quality=quality, run=run)
+                    runs.append(run)
+
+                # Encodes are seconds long; no warm-up run
+                result = _measure(compress, options['video_repeat'], warmup=0)
+                run = runs[-1]
+                result.update({
+                    'realtime': seconds / result['median_s'],
+                    'output_mb': run.output_size_mb,
+                    'output_kbps': run.output_bitrate_kbps,
+                    'decode_s': run.decode_seconds,
+                    'encode_s': run.encode_seconds,
+                })
+                self.record(results, f'compress_video[{quality},{width}x{height},{seconds}s]', result)
+        return results
+
+    def bench_progress(self, options):
+        from projects.progress_tracker import CompressionProgressTracker
+
+        results = {}
+        operations = 500
+        tracker = CompressionProgressTracker()
+        try:
+            def writes():
+                for i in range(operations):
+                    tracker.update(i % 100, 'Encoding video', 'Compressing with H.264 codec...')
+
+            def reads():
+                for _ in range(operations):
+                    tracker.get_progress()
+                    tracker.is_cancelled()
+
+            for name, fn in (('write', writes), ('read', reads)):
+                result = _measure(fn, options['repeat'])
+                result['ops_per_s'] = operations / result['median_s']
+                self.record(results, f'CompressionProgressTracker.{name}[{operations}]', result)
+        finally:
+            tracker.cleanup()
+        return results
+
+    def bench_markdown(self, options):
+        from markdownify.templatetags.markdownify import markdownify
+
+        rng = random.Random(SEED)
+        results = {}
+        for size in MARKDOWN_SIZES:
+            text = markdown_text(size, rng)
+            result = _measure(lambda: markdownify(text), options['repeat'])
+            result['chars_per_ms'] = size / (result['median_s'] * 1000)
+            self.record(results, f'markdownify[{size // 1000}k chars]', result)
+        return results
+
+    def bench_pages(self, options):
+        results = {}
+        self.measure_pages(results, Client(), self.catalog(options), options)
+        return results
+
+    def bench_serialize(self, options):
+        results = {}
+        self.measure_serialize(results, Client(), self.catalog(options), options)
+        return results
+
+    def catalog(self, options):
+        """Seed the scratch database on first use; returns the detail project."""
+        if self.detail is None:
+            self.detail = seed_catalog(options['projects'], options['photos'])
+        return self.detail
+
+    def get(self, client, url, options):
+        """Time a GET with the response caches cleared before each run; returns the result with its query count."""
+        def fetch():
+            for alias in ('pages', 'urls', 'fragments'):
+                caches[alias].clear()
+            response = client.get(url, secure=True)  # SECURE_SSL_REDIRECT would answer plain HTTP with a redirect
+            if response.status_code != 200:
+                raise CommandError(f'{url} answered {response.status_code}')
+
+        try:
+            result = _measure(fetch, options['repeat'])
+            with CaptureQueriesContext(connection) as queries:
+                fetch()
+        except Exception as e:
+            return {'error': f'{type(e).__name__}: {e}'}
+        result['queries'] = len(queries)
+        return result
+
+    def get_cached(self, client, url, tier, options):
+        """Time a GET served by the page cache: from L1, or from L2 as in a worker that has not served it yet."""
+        pages = caches['pages']
+
+        def fetch():
+            if tier == 'L2':
+                pages._l1.clear()
+            response = client.get(url, secure=True)
+            if response.status_code != 200:
+                raise CommandError(f'{url} answered {response.status_code}')
+
+        try:
+            return _measure(fetch, options['repeat'])
+        except Exception as e:
+            return {'error': f'{type(e).__name__}: {e}'}
+
+    def measure_pages(self, results, client, detail, options):
+        catalog = options['projects']
+        self.record(results, f'projects_page[{catalog} projects]', self.get(client, reverse('projects_page'), options))
+        detail_name = f'project_detail_page[{DETAIL_DESCRIPTION_SIZE // 1000}k chars, 20 photos]'
+        detail_url = reverse('project_detail', args=[detail.pk])
+        self.record(results, detail_name, self.get(client, detail_url, options))
+        for tier in ('L2', 'L1'):
+            self.record(results, f'{detail_name}[{tier} cache]', self.get_cached(client, detail_url, tier, options))
+
+    def measure_serialize(self, results, client, detail, options):
+        from projects.serializer import ProjectsSerializer, project_rows, render_json
+
+        size = f"{options['projects']} projects, {options['photos']} photos each"
+        self.record(results, f'projects_list[{size}]', self.get(client, '/api/projects/', options))
+
+        # Query to JSON bytes, through DRF and through the .values() fast path the API serves
+        request = RequestFactory().get('/api/projects/')
+        drf = _measure(lambda: JsonResponse({'projects': ProjectsSerializer(
+            Projects.objects.prefetch_related('photos'), many=True, context={'request': request}).data}),
+            options['repeat'])
+        rows = _measure(lambda: render_json({'projects': project_rows(Projects.objects.all(), request)}),
+                        options['repeat'])
+        rows['speedup'] = drf['median_s'] / rows['median_s']
+        if rows['speedup'] < MIN_SERIALIZER_SPEEDUP:
+            self.failures.append(f"project_rows is only {rows['speedup']:.1f}x faster than ProjectsSerializer "
+                                 f"(needs {MIN_SERIALIZER_SPEEDUP}x)")
+        self.record(results, f'ProjectsSerializer[{size}]', drf)
+        self.record(results, f'project_rows[{size}]', rows)
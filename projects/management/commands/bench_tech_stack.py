@@ -0,0 +1,93 @@
+import time
+from pathlib import Path
+
+from django import template
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand
+from django.template import Context, Engine
+
+from projects.assets import ASSET_BUILD_DIR
+from projects.models import TECH_DISPLAY, TECH_STACK_CHOICES
+from projects.tech_sprite import ICON_DIR, SPRITE_DIR
+from projects.templatetags.assets import asset_manifest
+
+# Loaded by the benchmark's own template engine as {% load legacy %}
+register = template.Library()
+
+
+@register.filter
+def legacy_tech_display(value):
+    """tech_display as it was: flattens TECH_STACK_CHOICES into a new dict on every call."""
+    flat_choices = []
+    for group in TECH_STACK_CHOICES:
+        flat_choices.extend(group[1])
+    return dict(flat_choices).get(value, value)
+
+
+BEFORE = """{% load static legacy %}{% for tech in project.technologies %}<div class="tech-item">
+<img src="{% static 'assets/tech-stack-used/'|add:tech|add:'.png' %}" alt="{{ tech|legacy_tech_display }}" class="tech-icon">
+<span class="tech-name">{{ tech|legacy_tech_display }}</span></div>{% endfor %}"""
+
+AFTER = """{% load assets custom_filters %}{% for tech in project.technologies %}<div class="tech-item">
+{% tech_icon tech %}
+<span class="tech-name">{{ tech|tech_display }}</span></div>{% endfor %}"""
+
+
+class Command(BaseCommand):
+    help = "Benchmark rendering project_detail's technology stack: per-icon <img>s vs the sprite and lookup table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--technologies', type=int, default=25, help='Technologies on the simulated project')
+        parser.add_argument('--renders', type=int, default=2000, help='Renders per variant')
+
+    def handle(self, *args, **options):
+        engine = Engine(libraries={
+            'static': 'django.templatetags.static',
+            'assets': 'projects.templatetags.assets',
+            'custom_filters': 'projects.templatetags.custom_filters',
+            'legacy': __name__,
+        })
+        techs = list(TECH_DISPLAY)[:options['technologies']]
+        context = {'project': {'technologies': techs}}
+        manifest = asset_manifest()
+        sprite = manifest.get('tech_sprite', []) if manifest else []
+        self.stdout.write(
+            f"{len(techs)} technologies, {options['renders']} renders; sprite "
+            + (f'built ({len(sprite)} icons)' if sprite else 'not built (run build_assets with ASSET_BUNDLES=True)')
+        )
+
+        results = {}
+        for label, source in (('per-icon <img>', BEFORE), ('sprite + lookup', AFTER)):
+            compiled = engine.from_string(source)
+            html = compiled.render(Context(context))
+            started = time.perf_counter()
+            for _ in range(options['renders']):
+                compiled.render(Context(context))
+            results[label] = (time.perf_counter() - started) / options['renders']
+            requests = html.count('<img ') + (1 if 'tech-sprite' in html else 0)
+            self.stdout.write(f'{label:>16}: {results[label] * 1000:.3f} ms/render, {requests} image requests')
+
+        started = time.perf_counter()
+        for _ in range(options['renders']):
+            for tech in techs:
+                legacy_tech_display(tech)
+        legacy = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(options['renders']):
+            for tech in techs:
+                TECH_DISPLAY.get(tech, tech)
+        lookup = time.perf_counter() - started
+        self.stdout.write(f'tech_display: {legacy / lookup:.0f}x faster ({lookup / legacy:.1%} of the old cost)')
+
+        speedup = results['per-icon <img>'] / results['sprite + lookup']
+        self.stdout.write(self.style.SUCCESS(f'Render speedup: {speedup:.1f}x'))
+        if sprite:
+            icons = sum(Path(finders.find(f'{ICON_DIR}/{tech}.png')).stat().st_size for tech in techs if tech in sprite)
+            sprites = {
+                path.suffix[1:]: path.stat().st_size
+                for path in sorted((ASSET_BUILD_DIR / SPRITE_DIR).glob('tech.*'))
+            }
+            self.stdout.write(
+                f'Image bytes: {icons / 1024:.1f}K of icons -> sprite '
+                + ', '.join(f'{size / 1024:.1f}K {format}' for format, size in sprites.items())
+            )
@@ -0,0 +1,148 @@
+import asyncio
+import io
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cloudinary
+import httpx
+from django.core.management.base import BaseCommand
+
+from projects.upload_client import MediaUploadClient
+
+
+class StandInUploadHandler(BaseHTTPRequestHandler):
+    """Minimal Upload API stand-in: accepts multipart POSTs and returns a fake result."""
+
+    protocol_version = 'HTTP/1.1'
+    connect_latency = 0.0
+    request_latency = 0.0
+    failure_rate = 0.0
+    connections = 0
+    requests = 0
+    counter_lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with self.counter_lock:
+            type(self).connections += 1
+        # Stands in for the TCP + TLS handshake a fresh HTTPS connection costs
+        time.sleep(self.connect_latency)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        with self.counter_lock:
+            type(self).requests += 1
+        time.sleep(self.request_latency)
+
+        if random.random() < self.failure_rate:
+            body = json.dumps({'error': {'message': 'stand-in transient failure'}}).encode()
+            self.send_response(503)
+        else:
+            resource_type = self.path.rstrip('/').split('/')[-2]
+            body = json.dumps({
+                'public_id': f'bench/{random.getrandbits(48):012x}',
+                'version': int(time.time()),
+                'format': 'jpg',
+                'type': 'upload',
+                'resource_type': resource_type,
+                'bytes': length,
+            }).encode()
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark media uploads against a local Upload API stand-in (fresh connections vs pooled vs async).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=12, help='Files uploaded per run')
+        parser.add_argument('--size-kb', type=int, default=512, help='Size of each file')
+        parser.add_argument('--connect-latency', type=float, default=0.05,
+                            help='Seconds added per new connection (simulated TLS handshake)')
+        parser.add_argument('--request-latency', type=float, default=0.05,
+                            help='Seconds the stand-in spends per request')
+        parser.add_argument('--failure-rate', type=float, default=0.0,
+                            help='Fraction of requests answered with 503 (exercises retries)')
+        parser.add_argument('--concurrency', type=int, default=4, help='Async uploads in flight')
+
+    def handle(self, *args, **options):
+        StandInUploadHandler.connect_latency = options['connect_latency']
+        StandInUploadHandler.request_latency = options['request_latency']
+        StandInUploadHandler.failure_rate = options['failure_rate']
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StandInUploadHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        prefix = f'http://127.0.0.1:{server.server_address[1]}'
+
+        # Signing needs credentials; the stand-in ignores them
+        cloudinary.config(cloud_name=cloudinary.config().cloud_name or 'bench',
+                          api_key=cloudinary.config().api_key or 'bench',
+                          api_secret=cloudinary.config().api_secret or 'bench')
+
+        payload = os.urandom(options['size_kb'] * 1024)
+        count = options['files']
+
+        def files():
+            return [io.BytesIO(payload) for _ in range(count)]
+
+        def fresh_connections():
+            # One new client (and connection) per file, like the per-call SDK path
+            for file in files():
+                client = MediaUploadClient(upload_prefix=prefix, max_attempts=5)
+                client.upload(file, folder='bench', filename='bench.jpg')
+                client.close()
+
+        def pooled_sequential():
+            client = MediaUploadClient(upload_prefix=prefix)
+            for file in files():
+                client.upload(file, folder='bench', filename='bench.jpg')
+            client.close()
+
+        def pooled_async():
+            async def run():
+                async with MediaUploadClient(upload_prefix=prefix) as client:
+                    await client.aupload_many(
+                        [(file, {'folder': 'bench', 'filename': 'bench.jpg'}) for file in files()],
+                        concurrency=options['concurrency']
+                    )
+            asyncio.run(run())
+
+        self.stdout.write(
+            f"{count} files x {options['size_kb']}KB, connect latency {options['connect_latency'] * 1000:.0f}ms, "
+            f"request latency {options['request_latency'] * 1000:.0f}ms, failure rate {options['failure_rate']:.0%}"
+        )
+        baseline = None
+        for label, run in (
+            ('fresh connection per file', fresh_connections),
+            ('pooled, sequential', pooled_sequential),
+            (f"pooled, async x{options['concurrency']}", pooled_async),
+        ):
+            StandInUploadHandler.connections = 0
+            StandInUploadHandler.requests = 0
+            started = time.perf_counter()
+            try:
+                run()
+            except httpx.HTTPError as e:
+                self.stdout.write(self.style.ERROR(f'{label}: failed ({e})'))
+                continue
+            elapsed = time.perf_counter() - started
+            baseline = baseline or elapsed
+            self.stdout.write(
+                f'{label:>28}: {elapsed:6.2f}s  {count / elapsed:6.1f} files/s  '
+                f'{StandInUploadHandler.connections:3d} connections  {StandInUploadHandler.requests:3d} requests  '
+                f'({baseline / elapsed:.1f}x)'
+            )
+
+        server.shutdown()
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from projects import assets
+
+
+class Command(BaseCommand):
+    help = 'Compile SCSS, bundle and minify page scripts and self-host the used fonts into static/dist/.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-fonts', action='store_true',
+                            help='Link Google Fonts (trimmed to the used weights) instead of self-hosting them')
+
+    def handle(self, *args, **options):
+        try:
+            result = assets.build(self_host_fonts=not options['no_fonts'])
+        except (RuntimeError, ValueError, ImportError) as e:
+            raise CommandError(f'Asset build failed: {e}')
+
+        if options['verbosity'] < 1:
+            return
+        report = result['report']
+        fonts = report.pop('fonts')
+        self.stdout.write(f"Built {result['css']}, {len(result['scripts'])} script bundles, {len(result['fonts'])} font files")
+        self.stdout.write(f"{'page':>16}  {'requests':>8}  {'raw':>17}  {'gzip':>15}  {'brotli':>15}  saved (br)")
+        for page, sizes in report.items():
+            before, after = sizes['before'], sizes['after']
+            saved = 1 - after['brotli'] / before['brotli'] if before['brotli'] else 0
+            self.stdout.write(
+                f"{page:>16}  {sizes['requests'][0]:>3} -> {sizes['requests'][1]:<2}"
+                + ''.join(f"  {before[key] / 1024:6.1f}K -> {after[key] / 1024:5.1f}K" for key in ('raw', 'gzip', 'brotli'))
+                + f"  {saved:6.1%}"
+            )
+
+        css_size = (assets.ASSET_BUILD_DIR / 'css' / 'site.css').stat().st_size
+        for template, critical in result['critical_report'].items():
+            self.stdout.write(
+                f"{'critical':>16}  {template:<20} {critical['bytes'] / 1024:5.1f}K inlined, "
+                f"{css_size / 1024:.1f}K deferred{' (cached)' if critical['cached'] else ''}"
+            )
+
+        faces_before, faces_after = fonts['faces']
+        if result['font_stylesheet']:
+            self.stdout.write(self.style.WARNING(
+                f'Fonts: not self-hosted; Google Fonts link trimmed from {faces_before} to {faces_after} faces'
+            ))
+        else:
+            self.stdout.write(
+                f"{'fonts':>16}  {faces_before} Google faces (2 extra origins) -> {faces_after} self-hosted "
+                f"in {fonts['files']} files, {fonts['bytes'] / 1024:.1f}K woff2"
+            )
@@ -0,0 +1,57 @@
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.video_utils import HLS_LADDER, HLS_SEGMENT_SECONDS, build_hls_ladder
+
+
+class Command(BaseCommand):
+    help = 'Build and validate an HLS ladder offline (from a file, or a generated test clip).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', nargs='?', help='Source video (default: a generated 1080p test clip)')
+        parser.add_argument('--output', help='Output directory (default: a temp directory)')
+        parser.add_argument('--duration', type=float, default=12.0, help='Length of the generated test clip')
+        parser.add_argument('--segment-seconds', type=int, default=HLS_SEGMENT_SECONDS)
+
+    def handle(self, *args, **options):
+        output_dir = Path(options['output'] or tempfile.mkdtemp(prefix='hls_ladder_'))
+        input_path = options['input'] or self.generate_clip(output_dir.parent / f'{output_dir.name}_source.mp4',
+                                                            options['duration'])
+
+        started = time.perf_counter()
+        try:
+            ladder = build_hls_ladder(input_path, output_dir, segment_seconds=options['segment_seconds'])
+        except (RuntimeError, ValueError) as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f'Built {len(ladder["variants"])} renditions in {elapsed:.1f}s -> {output_dir}')
+        durations = set()
+        for variant in ladder['variants']:
+            durations.add(round(variant['duration']))
+            self.stdout.write(
+                f"  {variant['resolution']:>10}  {variant['bandwidth'] / 1000:7.0f} kbps  "
+                f"{variant['segments']:3d} segments  {variant['duration']:6.1f}s  {variant['codecs']}  {variant['playlist']}"
+            )
+
+        if len(durations) > 1:
+            raise CommandError('Renditions have different durations; segments would not line up')
+        if len(ladder['variants']) > len(HLS_LADDER):
+            raise CommandError('More renditions than ladder rungs')
+        self.stdout.write(self.style.SUCCESS(f'Ladder OK: {len(ladder["files"])} files, master {ladder["master"]}'))
+
+    def generate_clip(self, path, duration):
+        """Render a 1080p test pattern with a tone, so the ladder can be built with no input file."""
+        from imageio_ffmpeg import get_ffmpeg_exe
+
+        subprocess.run([
+            get_ffmpeg_exe(), '-hide_banner', '-loglevel', 'error', '-y',
+            '-f', 'lavfi', '-i', f'testsrc2=size=1920x1080:rate=30:duration={duration}',
+            '-f', 'lavfi', '-i', f'sine=frequency=440:duration={duration}',
+            '-c:v', 'libx264', '-preset', 'ultrafast', '-c:a', 'aac', '-shortest', str(path),
+        ], check=True)
+        return str(path)
@@ -0,0 +1,127 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.template import engines
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from projects import perf
+from projects.benchmarking import scratch, seed_catalog
+from projects.caching import CONTENT_ALIASES
+
+BUDGET = 0.01  # instrumentation cost as a share of the request
+
+
+def _per_call(fn, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations
+
+
+class Command(BaseCommand):
+    help = ('Check that the /perf instrumentation costs under 1% of a request: times each hook on its own, '
+            'prices every page by the queries, renders and cache lookups it makes, and compares end-to-end '
+            'latency with PerfMiddleware in and out.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=50, help='Alternating rounds with and without the middleware')
+        parser.add_argument('--iterations', type=int, default=20000, help='Calls per hook timing')
+        parser.add_argument('--projects', type=int, default=30, help='Projects in the generated catalog')
+
+    def handle(self, *args, **options):
+        costs = self.hook_costs(options['iterations'])
+        self.stdout.write('hook cost: ' + ', '.join(f'{name} {seconds * 1e6:.2f} us' for name, seconds in costs.items()))
+
+        with_perf = settings.MIDDLEWARE
+        without_perf = [name for name in with_perf if name != 'projects.middleware.PerfMiddleware']
+        failures = []
+        # A throwaway database and CACHE_DIR: the page caches are cleared between rounds
+        with scratch():
+            project = seed_catalog(options['projects'], 3)
+            urls = [reverse('home'), reverse('about'), reverse('projects_page'), f"{reverse('search')}?q=a",
+                    reverse('project_detail', args=[project.pk])]
+            clients = {}
+            for label, middleware in (('off', without_perf), ('on', with_perf)):
+                with override_settings(MIDDLEWARE=middleware):
+                    clients[label] = Client()
+                    for url in urls:
+                        clients[label].get(url)  # loads the middleware chain; warms connections
+            for cached in (True, False):
+                self.stdout.write('cached pages:' if cached else 'rendered pages (page caches cleared):')
+                failures += self.compare(clients, urls, costs, options['rounds'], cached)
+
+        if failures:
+            raise CommandError(f"{len(failures)} page(s) over the {BUDGET:.0%} budget: {'; '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS(f'Instrumentation under {BUDGET:.0%} on every page.'))
+
+    def compare(self, clients, urls, costs, rounds, cached):
+        failures = []
+        perf.reset()
+        timings = {url: {'off': [], 'on': []} for url in urls}
+        for _ in range(rounds):
+            for url in urls:
+                for label in ('off', 'on'):
+                    if not cached:
+                        for alias in CONTENT_ALIASES:
+                            caches[alias].clear()
+                    started = time.perf_counter()
+                    clients[label].get(url)
+                    timings[url][label].append(time.perf_counter() - started)
+        # What each page does, as recorded by the instrumentation itself
+        records = {path: record for _, _, _, _, path, _, record in perf._recent}
+        perf.reset()
+
+        for url in urls:
+            off = statistics.median(timings[url]['off'])
+            on = statistics.median(timings[url]['on'])
+            record = records[url.split('?')[0]]
+            lookups = record.cache_hits + record.cache_misses
+            renders = 1 if record.template_time else 0
+            cost = (costs['request'] + record.queries * costs['query'] + renders * costs['template']
+                    + lookups * costs['cache lookup'])
+            self.stdout.write(
+                f"  {url}: {off * 1000:.2f} ms without, {on * 1000:.2f} ms with ({on / off - 1:+.1%} measured); "
+                f"{record.queries} queries, {renders} render(s), {lookups} cache lookup(s) -> "
+                f"{cost * 1e6:.1f} us ({cost / off:.2%})"
+            )
+            if cost / off >= BUDGET:
+                failures.append(f'{url}: instrumentation costs {cost / off:.2%} of the request')
+        return failures
+
+    def hook_costs(self, iterations):
+        costs = {}
+
+        def request():
+            perf.finish(perf.start(), '/check', 'GET', '/check', 200, 0.001)
+        costs['request'] = _per_call(request, iterations)
+        perf.reset()
+
+        # Each hook against the same work without it, with a request open
+        token = perf.start()
+        try:
+            with connection.cursor() as cursor:
+                hooked = _per_call(lambda: cursor.execute('SELECT 1'), iterations)
+                wrappers = connection.execute_wrappers
+                connection.execute_wrappers = [w for w in wrappers if w is not perf.record_query]
+                try:
+                    bare = _per_call(lambda: cursor.execute('SELECT 1'), iterations)
+                finally:
+                    connection.execute_wrappers = wrappers
+            costs['query'] = max(hooked - bare, 0)
+
+            backend = engines['django']
+            timed = backend.from_string('{{ value }}')
+            plain = super(perf.InstrumentedDjangoTemplates, backend).from_string('{{ value }}')
+            context = {'value': 1}
+            costs['template'] = max(_per_call(lambda: timed.render(context), iterations)
+                                    - _per_call(lambda: plain.render(context), iterations), 0)
+            costs['cache lookup'] = _per_call(lambda: perf.record_cache(1, 0), iterations)
+        finally:
+            perf._current.reset(token)
+        return costs
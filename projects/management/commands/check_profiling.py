@@ -0,0 +1,155 @@
+import statistics
+import subprocess
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from projects import profiling, video_utils
+from projects.benchmarking import scratch, seed_catalog
+from projects.caching import CONTENT_ALIASES
+from projects.middleware import ProfilingMiddleware
+
+BUDGET = 0.02  # sampling cost as a share of request time, with every request registered
+
+
+def _video_upload_view(path):
+    """A view doing what a video save does: compress through process_video_upload."""
+    def view(request):
+        with open(path, 'rb') as f:
+            upload = SimpleUploadedFile('check.mp4', f.read(), 'video/mp4')
+        with mock.patch.object(video_utils, 'MAX_FILE_SIZE', 0), mock.patch.object(video_utils, '_save_run'):
+            video_utils.process_video_upload(upload, quality='low')
+        return HttpResponse('ok')
+    return view
+
+
+class Command(BaseCommand):
+    help = ('Check the sampling profiler: a staff request sent with the profile header is captured down to '
+            'process_video_upload, other requests are not, only the newest PROFILE_KEEP profiles are kept, '
+            'and sampling every request costs under 2% of request time.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=30, help='Alternating rounds with and without the profiler')
+        parser.add_argument('--projects', type=int, default=30, help='Projects in the generated catalog')
+
+    def handle(self, *args, **options):
+        failures = []
+        # A throwaway database and CACHE_DIR (profiles included): the page caches are cleared between rounds
+        with scratch() as directory, override_settings(PROFILE_ENABLED=True, PROFILE_KEEP=5):
+            project = seed_catalog(options['projects'], 3)
+            failures += self.check_capture(directory)
+            failures += self.check_keep()
+            failures += self.check_overhead(project, options['rounds'])
+
+        if failures:
+            raise CommandError(f"{len(failures)} profiling check(s) failed: {'; '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('Profiling checks passed.'))
+
+    def check_capture(self, directory):
+        failures = []
+        from imageio_ffmpeg import get_ffmpeg_exe
+
+        clip = f'{directory}/input.mp4'
+        subprocess.run([get_ffmpeg_exe(), '-loglevel', 'error', '-y', '-f', 'lavfi', '-i',
+                        'testsrc=size=1280x720:rate=30', '-t', '3', '-c:v', 'libx264', clip], check=True)
+        middleware = ProfilingMiddleware(_video_upload_view(clip))
+        staff = User(username='profile-check', is_staff=True, is_active=True)
+
+        with override_settings(PROFILE_SLOW_MS=0):
+            for user, expected in ((AnonymousUser(), False), (staff, True)):
+                request = RequestFactory().post('/admin/video/', HTTP_X_PROFILE='1')
+                request.user = user
+                name = middleware(request).get('X-Profile-Id')
+                self.stdout.write(f"header from {'staff' if user.is_staff else 'anonymous'}: "
+                                  f"{'profiled as ' + name if name else 'not profiled'}")
+                if bool(name) != expected:
+                    failures.append(f"a {'staff' if user.is_staff else 'anonymous'} request with the header was "
+                                    f"{'not ' if expected else ''}profiled")
+
+        if name:
+            profile = profiling.load(name)
+            frames = {frame for stack, _ in profile['stacks'] for frame in stack.split(';')}
+            for function in ('projects.video_utils.process_video_upload', 'projects.video_utils.compress_video'):
+                if function not in frames:
+                    failures.append(f'{function} is missing from the profile')
+            hottest = profiling.hot_functions(profile, limit=1)[0]
+            self.stdout.write(f"video save: {profile['samples']} samples over {profile['ms']:.0f} ms, "
+                              f"{len(frames)} functions; hottest {hottest['function']} "
+                              f"({hottest['self_share']:.0%} self)")
+        return failures
+
+    def check_keep(self):
+        collector = profiling.start(threading.get_ident())
+        profiling.stop(collector)
+        for _ in range(settings.PROFILE_KEEP + 5):
+            profiling.save(collector, profiling.SLOW, '/check', 'GET', '/check', 200, 1.0)
+        kept = len(profiling.saved())
+        self.stdout.write(f"keep: {settings.PROFILE_KEEP + 5} saved with PROFILE_KEEP={settings.PROFILE_KEEP} "
+                          f"-> {kept} kept")
+        if kept != settings.PROFILE_KEEP:
+            return [f'{kept} profiles kept with PROFILE_KEEP={settings.PROFILE_KEEP}']
+        return []
+
+    def check_overhead(self, project, rounds):
+        urls = [reverse('home'), reverse('projects_page'), reverse('admin:login'),
+                reverse('project_detail', args=[project.pk])]
+
+        # Every request registered with the sampler, none slow enough to keep
+        with override_settings(PROFILE_SLOW_MS=60_000):
+            clients = {}
+            without = [name for name in settings.MIDDLEWARE if name != 'projects.middleware.ProfilingMiddleware']
+            for label, middleware in (('off', without), ('on', settings.MIDDLEWARE)):
+                with override_settings(MIDDLEWARE=middleware):
+                    clients[label] = Client()
+                    for url in urls:
+                        clients[label].get(url)
+
+            timings = {url: {'off': [], 'on': []} for url in urls}
+            for _ in range(rounds):
+                for url in urls:
+                    for label in ('off', 'on'):
+                        for alias in CONTENT_ALIASES:
+                            caches[alias].clear()
+                        started = time.perf_counter()
+                        clients[label].get(url)
+                        timings[url][label].append(time.perf_counter() - started)
+
+            # The cost itself: registering a request, and one sampling pass every interval
+            register = self.per_call(lambda: profiling.stop(profiling.start(threading.get_ident())), 2000)
+            collector = profiling.start(threading.get_ident())
+            try:
+                tick = self.per_call(lambda: profiling._sample([collector], None), 2000)
+            finally:
+                profiling.stop(collector)
+
+        failures = []
+        share = tick / (settings.PROFILE_INTERVAL_MS / 1000)
+        self.stdout.write(f"cost: {register * 1e6:.1f} us to register a request, {tick * 1e6:.1f} us per "
+                          f"sampling pass every {settings.PROFILE_INTERVAL_MS} ms ({share:.2%} of a CPU while "
+                          f"requests run)")
+        for url in urls:
+            off = statistics.median(timings[url]['off'])
+            on = statistics.median(timings[url]['on'])
+            cost = register / off + share
+            self.stdout.write(f"  {url}: {off * 1000:.2f} ms without, {on * 1000:.2f} ms with "
+                              f"({on / off - 1:+.1%} measured); estimated cost {cost:.2%}")
+            if cost >= BUDGET:
+                failures.append(f'{url}: sampling costs {cost:.2%} of the request')
+        return failures
+
+    @staticmethod
+    def per_call(fn, iterations):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        return (time.perf_counter() - started) / iterations
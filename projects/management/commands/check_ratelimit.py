@@ -0,0 +1,132 @@
+import multiprocessing
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django_ratelimit import core
+
+from projects.ratelimit import is_ratelimited
+
+ALGORITHMS = ('fixed', 'sliding')
+
+
+def _allowed(args):
+    """Worker process: make `attempts` checks as one client; returns how many were let through."""
+    attempts, rate = args
+    request = RequestFactory().post('/', REMOTE_ADDR='203.0.113.7')
+    return sum(not is_ratelimited(request, group='check', key='ip', rate=rate, method='POST', increment=True)
+               for _ in range(attempts))
+
+
+class Command(BaseCommand):
+    help = ('Check the rate limiter on its SQLite cache: the limit holds exactly across processes, entries '
+            'expire and the table stays bounded, a check costs the same at any table size, and how much of a '
+            'burst across a window boundary each algorithm lets through.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8, help='Worker processes sharing one client key')
+        parser.add_argument('--limit', type=int, default=100, help='Requests allowed per window')
+
+    def handle(self, *args, **options):
+        failures = []
+        with tempfile.TemporaryDirectory() as directory:
+            for algorithm in ALGORITHMS:
+                caches_setting = {'ratelimit': {
+                    'BACKEND': 'projects.cache_backends.SQLiteCache',
+                    'LOCATION': os.path.join(directory, f'{algorithm}.sqlite3'),
+                    'OPTIONS': {'MAX_ENTRIES': 1000, 'CULL_EVERY': 100},
+                }}
+                with override_settings(CACHES=caches_setting, RATELIMIT_USE_CACHE='ratelimit',
+                                       RATELIMIT_ENABLE=True, RATELIMIT_ALGORITHM=algorithm):
+                    caches['ratelimit'].clear()
+                    failures += self.check_shared(algorithm, options)
+                    failures += self.check_burst(algorithm)
+                    if algorithm == 'fixed':
+                        failures += self.check_bounds(caches['ratelimit'])
+                        failures += self.check_cost(caches['ratelimit'])
+
+        if failures:
+            raise CommandError(f"{len(failures)} rate-limit check(s) failed: {'; '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('Rate-limit checks passed.'))
+
+    def check_shared(self, algorithm, options):
+        processes, limit = options['processes'], options['limit']
+        attempts = limit // processes + limit  # together, several times the limit
+        with multiprocessing.get_context('fork').Pool(processes) as pool:
+            allowed = sum(pool.map(_allowed, [(attempts, f'{limit}/h')] * processes))
+        self.stdout.write(f"{algorithm}: {processes} processes x {attempts} requests on one key, "
+                          f"limit {limit}: {allowed} allowed")
+        if allowed != limit:
+            return [f'{algorithm}: {allowed} requests allowed against a shared limit of {limit}']
+        return []
+
+    def check_burst(self, algorithm):
+        # A client sends a full limit just before a window ends and another just after, at 10/m
+        limit, period, address = 10, 60, '198.51.100.1'
+        request = RequestFactory().post('/', REMOTE_ADDR=address)
+        if algorithm == 'fixed':
+            boundary = core._get_window(address, period)  # windows end at a per-key offset
+        else:
+            boundary = (time.time() // period + 1) * period
+        clock = [0]
+        allowed = 0
+        with mock.patch('time.time', lambda: clock[0]):
+            for at in (boundary - 1, boundary + 1):
+                clock[0] = at
+                allowed += sum(not is_ratelimited(request, group='burst', key='ip', rate=f'{limit}/m',
+                                                  method='POST', increment=True) for _ in range(limit))
+        self.stdout.write(f"{algorithm}: {limit} requests either side of a window boundary at {limit}/m: "
+                          f"{allowed} allowed within 2s")
+        if algorithm == 'sliding' and allowed > limit:
+            return [f'sliding window let {allowed} requests through in 2s at {limit}/m']
+        return []
+
+    def check_bounds(self, cache):
+        failures = []
+        cache.set('short-lived', 1, 1)
+        time.sleep(1.1)
+        if cache.get('short-lived') is not None or cache.add('short-lived', 2, 1) is not True:
+            failures.append('an expired entry was still readable')
+
+        # Distinct clients with a long window: only culling keeps the table down
+        for i in range(20000):
+            cache.add(f'client-{i}', 1, 3600)
+        rows = self.rows(cache)
+        self.stdout.write(f"bounds: 20000 keys written with MAX_ENTRIES=1000 -> {rows} rows")
+        if rows > 1000 + 100:
+            failures.append(f'table grew to {rows} rows with MAX_ENTRIES=1000')
+        return failures
+
+    def check_cost(self, cache):
+        request = RequestFactory().post('/', REMOTE_ADDR='192.0.2.1')
+        cache._max_entries = 0  # no culling while the table is grown
+        timings = {}
+        for size in (1000, 200000):
+            with sqlite3.connect(cache.path) as connection:
+                connection.execute('DELETE FROM cache')
+                connection.executemany('INSERT INTO cache VALUES (?, 1, ?)',
+                                       ((f'filler-{i}', time.time() + 3600) for i in range(size)))
+            samples = []
+            for _ in range(2000):
+                started = time.perf_counter()
+                is_ratelimited(request, group='cost', key='ip', rate='1000000/h', method='POST', increment=True)
+                samples.append(time.perf_counter() - started)
+            timings[size] = statistics.median(samples)
+        small, large = timings.values()
+        self.stdout.write(f"cost per check: {small * 1e6:.0f} us at 1000 rows, {large * 1e6:.0f} us at 200000 rows")
+        cache.clear()
+        if large > 3 * small:
+            return [f'a check took {large / small:.1f}x longer on a 200x larger table']
+        return []
+
+    @staticmethod
+    def rows(cache):
+        with sqlite3.connect(cache.path) as connection:
+            return connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
@@ -0,0 +1,179 @@
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Heavy modules only upload/compression paths may import (see video_utils.py)
+LAZY_MODULES = ['moviepy', 'numpy', 'imageio', 'imageio_ffmpeg']
+# Only imported when SENTRY_DSN is set
+OPTIONAL_MODULES = {'sentry_sdk': 'SENTRY_DSN'}
+
+# Run in a fresh interpreter: what a worker (or manage.py) does before serving anything
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({'seconds': time.perf_counter() - started, 'modules': sorted(sys.modules)}))
+"""
+
+
+def private_memory(pid):
+    """Memory only this process uses (private clean + dirty pages), in bytes; None off Linux."""
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            rollup = f.read()
+    except OSError:
+        return None
+    return sum(int(kb) * 1024 for kb in re.findall(r'^Private_(?:Clean|Dirty):\s+(\d+) kB', rollup, re.M))
+
+
+def child_pids(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    # The command name may contain spaces; the parent pid follows it
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        children.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    return children
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Fail if startup imports the media stack, goes over its import-time budget, '
+            'or gunicorn --preload workers go over their boot-time or memory budget.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--import-budget', type=float, default=1.5,
+                            help='Seconds allowed for django.setup() plus loading the URLconf')
+        parser.add_argument('--boot-budget', type=float, default=10.0,
+                            help='Seconds allowed from starting gunicorn to serving the first page')
+        parser.add_argument('--worker-memory-budget', type=float, default=40,
+                            help='MB of private (unshared) memory allowed per preloaded worker')
+        parser.add_argument('--workers', type=int, default=2, help='gunicorn workers to start')
+        parser.add_argument('--skip-gunicorn', action='store_true', help='Only check imports')
+        parser.add_argument('--importtime', action='store_true',
+                            help='Also print the slowest imports (python -X importtime)')
+
+    def handle(self, *args, **options):
+        failures = self.check_imports(options)
+        if not options['skip_gunicorn']:
+            failures += self.check_gunicorn(options)
+        if failures:
+            raise CommandError(f"{len(failures)} startup check(s) failed: {'; '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('Startup is within its budgets.'))
+
+    def check_imports(self, options):
+        import json
+
+        result = subprocess.run(
+            [sys.executable, *(['-X', 'importtime'] if options['importtime'] else []), '-c', STARTUP_SCRIPT],
+            capture_output=True, text=True, cwd=settings.BASE_DIR, check=True,
+        )
+        startup = json.loads(result.stdout.strip().splitlines()[-1])
+        modules = set(startup['modules'])
+        failures = []
+
+        self.stdout.write(f"setup + URLconf: {startup['seconds'] * 1000:.0f} ms, {len(modules)} modules")
+        if startup['seconds'] > options['import_budget']:
+            failures.append(f"startup took {startup['seconds']:.2f}s (budget {options['import_budget']}s)")
+        eager = [name for name in LAZY_MODULES if name in modules]
+        eager += [name for name, setting in OPTIONAL_MODULES.items() if name in modules and not os.getenv(setting)]
+        for name in eager:
+            failures.append(f'{name} imported at startup')
+        self.stdout.write(f"lazy modules: {', '.join(LAZY_MODULES + list(OPTIONAL_MODULES))} "
+                          + (f"-- eagerly imported: {', '.join(eager)}" if eager else '-- none imported'))
+
+        if options['importtime']:
+            # "import time: self [us] | cumulative | imported package"
+            timings = []
+            for line in result.stderr.splitlines():
+                match = re.match(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)', line)
+                if match and not match.group(3):
+                    timings.append((int(match.group(2)), match.group(4)))
+            for cumulative, name in sorted(timings, reverse=True)[:15]:
+                self.stdout.write(f'{cumulative / 1000:10.1f} ms  {name}')
+        return failures
+
+    def check_gunicorn(self, options):
+        failures = []
+        results = {}
+        for preload in (True, False):
+            results[preload] = self.run_gunicorn(preload, options['workers'])
+            boot, memory = results[preload]
+            label = 'preload' if preload else 'no preload'
+            worker_mb = ', '.join(f'{m / 2**20:.1f}' for m in memory) if memory and None not in memory else 'n/a'
+            self.stdout.write(f'gunicorn ({label}): first page after {boot:.2f}s; private MB per worker: {worker_mb}')
+
+        boot, memory = results[True]
+        if boot > options['boot_budget']:
+            failures.append(f"preloaded gunicorn served its first page after {boot:.2f}s (budget {options['boot_budget']}s)")
+        budget = options['worker_memory_budget'] * 2**20
+        if memory and None not in memory and max(memory) > budget:
+            failures.append(f"a preloaded worker uses {max(memory) / 2**20:.1f} MB private memory "
+                            f"(budget {options['worker_memory_budget']} MB)")
+        return failures
+
+    def run_gunicorn(self, preload, workers):
+        """Start gunicorn, time the first page, serve a few more, then measure each worker."""
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        # The app and worker class the Procfile serves (see gunicorn.conf.py)
+        command = [sys.executable, '-m', 'gunicorn', 'projects.asgi:application', '--bind', f'127.0.0.1:{port}',
+                   '--worker-class', 'uvicorn.workers.UvicornWorker', '--workers', str(workers),
+                   '--log-level', 'warning', *(['--preload'] if preload else [])]
+        started = time.perf_counter()
+        server = subprocess.Popen(command, cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        url = f'http://127.0.0.1:{port}/about/'
+
+        # Redirects (SECURE_SSL_REDIRECT) aren't followed: any HTTP response counts as served
+        opener = urllib.request.build_opener(NoRedirect)
+
+        def get():
+            try:
+                return opener.open(url, timeout=5).status
+            except urllib.error.HTTPError as e:
+                return e.code
+
+        try:
+            while True:
+                if server.poll() is not None:
+                    raise CommandError(f'gunicorn exited: {server.stderr.read().decode()[-2000:]}')
+                if time.perf_counter() - started > 60:
+                    raise CommandError('gunicorn did not serve a page within 60s')
+                try:
+                    status = get()
+                    break
+                except OSError:
+                    time.sleep(0.05)
+            boot = time.perf_counter() - started
+            if status != 200:
+                self.stdout.write(self.style.WARNING(f'{url} returned {status}'))
+            for _ in range(10 * workers):
+                get()
+            # Workers may still be forking when the first one answers
+            deadline = time.perf_counter() + 10
+            while len(child_pids(server.pid)) < workers and time.perf_counter() < deadline:
+                time.sleep(0.1)
+            return boot, [private_memory(pid) for pid in child_pids(server.pid)]
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
@@ -0,0 +1,17 @@
+from django.contrib.staticfiles.management.commands.collectstatic import Command as CollectStaticCommand
+from django.core.management import call_command
+
+
+class Command(CollectStaticCommand):
+    """collectstatic that builds static/dist/ first, so the bundles are fingerprinted and compressed with the rest."""
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--skip-assets', action='store_true',
+                            help='Collect the existing static/dist/ without rebuilding it or the images')
+
+    def handle(self, **options):
+        if not options['skip_assets'] and not options['dry_run']:
+            call_command('build_assets', verbosity=options['verbosity'], stdout=self.stdout)
+            call_command('optimize_images', verbosity=options['verbosity'], stdout=self.stdout)
+        return super().handle(**options)
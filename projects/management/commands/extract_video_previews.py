@@ -0,0 +1,59 @@
+import os
+import tempfile
+
+import httpx
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from projects.media_storage import get_backend
+from projects.media_urls import resource_url
+from projects.models import ProjectVideo
+from projects.video_utils import extract_previews
+
+
+class Command(BaseCommand):
+    help = 'Extract poster frames and scrubbing sprite sheets for videos uploaded before they existed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-extract videos that already have a poster')
+        parser.add_argument('--poster-time', type=float, default=None,
+                            help="Poster timestamp in seconds (defaults to each video's poster_time)")
+
+    def handle(self, *args, **options):
+        videos = ProjectVideo.objects.select_related('project').order_by('pk')
+        if not options['force']:
+            videos = videos.filter(Q(poster__isnull=True) | Q(poster=''))
+        field = ProjectVideo._meta.get_field('video')
+        backend = get_backend()
+
+        done = 0
+        for video in videos:
+            url = resource_url(video.video, 'video')
+            if not url:
+                continue
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp:
+                path = tmp.name
+            try:
+                with httpx.stream('GET', url, follow_redirects=True, timeout=120) as response:
+                    response.raise_for_status()
+                    with open(path, 'wb') as file:
+                        for chunk in response.iter_bytes():
+                            file.write(chunk)
+
+                poster_time = options['poster_time'] if options['poster_time'] is not None else video.poster_time
+                previews = field.preview_collector(poster_time)
+                extract_previews(path, previews)
+                files, metadata = field.preview_files(previews)
+                for name, upload in files.items():
+                    setattr(video, name, backend.upload(upload, **ProjectVideo._meta.get_field(name).upload_options(video)))
+                for name, value in metadata.items():
+                    setattr(video, name, value)
+                video.save(update_fields=[*files, *metadata])
+                done += 1
+                self.stdout.write(f'{video}: poster {video.poster_width}x{video.poster_height}, {video.sprite_frames} sprite frames')
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'{video}: {e}'))
+            finally:
+                os.remove(path)
+
+        self.stdout.write(self.style.SUCCESS(f'Extracted previews for {done} video(s).'))
@@ -0,0 +1,203 @@
+import http.client
+import itertools
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from projects.models import Projects
+
+# The previous Procfile (gunicorn defaults: sync workers, no config file) and the current one
+SERVER_PROFILES = {
+    'sync': ['projects.wsgi', '--config', os.devnull],
+    'gunicorn.conf.py': ['projects.asgi:application', '--config', 'gunicorn.conf.py'],
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = ('Replay mixed traffic (page views plus slow multipart media uploads) against a local gunicorn '
+            'and report page throughput and tail latency.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Test a running instance instead of starting gunicorn')
+        parser.add_argument('--profile', choices=[*SERVER_PROFILES, 'both'], default='both',
+                            help='Server configuration to start (default: compare both)')
+        parser.add_argument('--workers', type=int, default=2, help='Worker processes for every profile')
+        parser.add_argument('--duration', type=float, default=20.0, help='Seconds of traffic per run')
+        parser.add_argument('--page-clients', type=int, default=8, help='Concurrent page-view clients')
+        parser.add_argument('--upload-clients', type=int, default=3, help='Concurrent upload clients')
+        parser.add_argument('--upload-mb', type=float, default=4.0, help='Size of each upload')
+        parser.add_argument('--upload-kbps', type=float, default=512.0,
+                            help='Upload client send rate in KB/s (a slow connection holds its request open)')
+
+    def handle(self, *args, **options):
+        pages = [reverse('home'), reverse('about'), reverse('contact'), reverse('projects_page')]
+        project = Projects.objects.order_by('pk').first()
+        if project:
+            pages.append(reverse('project_detail', args=[project.pk]))
+        # Any multipart POST takes an upload slot; the admin add form is the real upload path
+        upload_path = reverse('admin:projects_projectvideo_add')
+
+        self.stdout.write(
+            f"{options['page_clients']} page clients over {len(pages)} pages, {options['upload_clients']} upload "
+            f"clients ({options['upload_mb']} MB at {options['upload_kbps']:.0f} KB/s), {options['duration']}s per run"
+        )
+        if options['url']:
+            self.report(options['url'], self.run(options['url'], pages, upload_path, options))
+            return
+        profiles = list(SERVER_PROFILES) if options['profile'] == 'both' else [options['profile']]
+        for profile in profiles:
+            with self.server(profile, options['workers']) as url:
+                self.report(f"{profile} ({options['workers']} workers)", self.run(url, pages, upload_path, options))
+
+    def server(self, profile, workers):
+        command = self
+
+        class Server:
+            def __enter__(self):
+                with socket.socket() as sock:
+                    sock.bind(('127.0.0.1', 0))
+                    self.port = sock.getsockname()[1]
+                self.process = subprocess.Popen(
+                    [sys.executable, '-m', 'gunicorn', *SERVER_PROFILES[profile],
+                     '--bind', f'127.0.0.1:{self.port}', '--workers', str(workers), '--log-level', 'warning'],
+                    cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                    # Access logs to stdout would dominate a load test
+                    env={**os.environ, 'GUNICORN_CMD_ARGS': '--access-logfile=/dev/null'},
+                )
+                deadline = time.monotonic() + 60
+                while True:
+                    if self.process.poll() is not None:
+                        raise CommandError(f'gunicorn ({profile}) exited with {self.process.returncode}')
+                    try:
+                        socket.create_connection(('127.0.0.1', self.port), timeout=1).close()
+                        break
+                    except OSError:
+                        if time.monotonic() > deadline:
+                            raise CommandError(f'gunicorn ({profile}) did not start listening within 60s')
+                        time.sleep(0.1)
+                return f'http://127.0.0.1:{self.port}'
+
+            def __exit__(self, *exc_info):
+                self.process.terminate()
+                try:
+                    self.process.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+                command.stdout.flush()
+
+        return Server()
+
+    def run(self, url, pages, upload_path, options):
+        target = urlsplit(url)
+        # Look like HTTPS behind the proxy, so SECURE_SSL_REDIRECT doesn't turn every page into a redirect
+        headers = {'X-Forwarded-Proto': 'https'}
+        stop = threading.Event()
+        lock = threading.Lock()
+        page_results, upload_results = [], []
+
+        def connection():
+            return http.client.HTTPConnection(target.hostname, target.port, timeout=120)
+
+        def page_client(offset):
+            for path in itertools.islice(itertools.cycle(pages), offset, None):
+                if stop.is_set():
+                    return
+                started = time.perf_counter()
+                try:
+                    conn = connection()
+                    conn.request('GET', path, headers=headers)
+                    status = conn.getresponse().status
+                    conn.close()
+                except OSError:
+                    status = None
+                with lock:
+                    page_results.append((time.perf_counter() - started, status))
+
+        def upload_client():
+            boundary = 'loadtest-boundary'
+            head = (f'--{boundary}\r\nContent-Disposition: form-data; name="video"; filename="clip.mp4"\r\n'
+                    f'Content-Type: video/mp4\r\n\r\n').encode()
+            tail = f'\r\n--{boundary}--\r\n'.encode()
+            size = int(options['upload_mb'] * 2**20)
+            # Pass CSRF's cheap checks (referer, cookie present) so it reads the whole body looking for the
+            # form token, the way a real admin save does before the view; the upload then ends in a 403
+            upload_headers = {
+                **headers,
+                'Referer': f'https://{target.netloc}/',
+                'Cookie': f"{settings.CSRF_COOKIE_NAME}={'x' * 32}",
+                'Content-Type': f'multipart/form-data; boundary={boundary}',
+                'Content-Length': str(len(head) + size + len(tail)),
+            }
+            chunk = b'\0' * 16384
+            delay = len(chunk) / (options['upload_kbps'] * 1024)
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    conn = connection()
+                    conn.putrequest('POST', upload_path)
+                    for name, value in upload_headers.items():
+                        conn.putheader(name, value)
+                    conn.endheaders(head)
+                    sent = 0
+                    while sent < size:
+                        conn.send(chunk[:size - sent])
+                        sent += min(len(chunk), size - sent)
+                        time.sleep(delay)
+                    conn.send(tail)
+                    status = conn.getresponse().status
+                    conn.close()
+                except OSError:
+                    # A worker that rejected the upload early may close the socket mid-body
+                    status = None
+                with lock:
+                    upload_results.append((time.perf_counter() - started, status))
+
+        threads = [threading.Thread(target=upload_client) for _ in range(options['upload_clients'])]
+        threads += [threading.Thread(target=page_client, args=(i,)) for i in range(options['page_clients'])]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['duration'])
+        stop.set()
+        # Page clients finish their current request; uploads are left to complete in the background
+        for thread in threads[options['upload_clients']:]:
+            thread.join()
+        measured = options['duration']
+        for thread in threads[:options['upload_clients']]:
+            thread.join()
+        return {'pages': page_results, 'uploads': upload_results, 'seconds': measured}
+
+    def report(self, label, result):
+        latencies = [latency for latency, status in result['pages'] if status and status < 500]
+        failed = len(result['pages']) - len(latencies)
+        statuses = {}
+        for _, status in result['uploads']:
+            statuses[status] = statuses.get(status, 0) + 1
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        self.stdout.write(
+            f"  pages:   {len(latencies) / result['seconds']:6.1f} req/s, "
+            f"p50 {percentile(latencies, 50) * 1000:6.0f} ms, p95 {percentile(latencies, 95) * 1000:6.0f} ms, "
+            f"p99 {percentile(latencies, 99) * 1000:6.0f} ms, max {max(latencies, default=0) * 1000:6.0f} ms, "
+            f"{failed} failed"
+        )
+        durations = [duration for duration, _ in result['uploads']]
+        self.stdout.write(
+            f"  uploads: {len(durations)} finished, mean {statistics.mean(durations) if durations else 0:.1f}s; "
+            f"responses {', '.join(f'{status or 'dropped'}: {count}' for status, count in sorted(statuses.items(), key=str))}"
+        )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from projects import image_assets
+
+
+class Command(BaseCommand):
+    help = 'Losslessly optimize the static images and write responsive WebP/AVIF variants into static/dist/images/.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-encode every image, even unchanged ones')
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per core)')
+
+    def handle(self, *args, **options):
+        result = image_assets.optimize(force=options['force'], workers=options['workers'])
+        if options['verbosity'] < 1:
+            return
+
+        manifest = result['manifest']
+        # What a browser supporting each format downloads at full size (the PNG where a format was dropped)
+        formats = sorted({format for entry in manifest.values() for format in entry['formats']})
+        source = sum(entry['bytes'] for entry in manifest.values())
+        totals = dict.fromkeys(['optimized', *formats], 0)
+        for entry in manifest.values():
+            totals['optimized'] += image_assets.output_size(entry)
+            for format in formats:
+                totals[format] += image_assets.output_size(entry, format if format in entry['formats'] else None)
+
+        self.stdout.write(
+            f"Images: {len(result['processed'])} encoded, {len(result['skipped'])} unchanged, "
+            f"{len(result['removed'])} removed"
+        )
+        self.stdout.write(f"{'source':>16}  {source / 1024:8.1f}K")
+        for key, size in totals.items():
+            saved = 1 - size / source if source else 0
+            self.stdout.write(f"{key:>16}  {size / 1024:8.1f}K  {saved:6.1%} smaller")
+        if not image_assets.avif_supported():
+            self.stdout.write(self.style.WARNING('AVIF skipped: install pillow-avif-plugin (or Pillow >= 11.3)'))
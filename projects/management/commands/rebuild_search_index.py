@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from projects import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for all projects.'
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stdout.write(self.style.WARNING(
+                'This database has no native search index; search falls back to icontains.'
+            ))
+            return
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} projects.'))
@@ -0,0 +1,11 @@
+from django.contrib.staticfiles.management.commands.runserver import Command as StaticRunserverCommand
+from django.urls import reverse
+
+
+class Command(StaticRunserverCommand):
+    """runserver that also prints where the admin lives (ADMIN_URL), instead of projects.urls printing it on import."""
+
+    def on_bind(self, server_port):
+        super().on_bind(server_port)
+        addr = f'[{self.addr}]' if self._raw_ipv6 else '127.0.0.1' if self.addr == '0' else self.addr
+        self.stdout.write(f"Admin page available at: {self.protocol}://{addr}:{server_port}{reverse('admin:index')}\n")
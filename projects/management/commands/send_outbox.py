@@ -0,0 +1,33 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from projects.outbox import OutboxSender
+
+
+class Command(BaseCommand):
+    help = ('Send queued outbox email. Runs until stopped (for a worker process, with OUTBOX_SENDER_THREAD=False '
+            'on the web processes), or with --once sends everything due and exits.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Send everything that is due, then exit')
+
+    def handle(self, *args, **options):
+        sender = OutboxSender()
+        if options['once']:
+            sent = sender.drain()
+            self.stdout.write(f'Sent {sent} message(s), {sender.failed} failed')
+            return
+
+        stop, wake = threading.Event(), threading.Event()
+
+        def shutdown(signum, frame):
+            stop.set()
+            wake.set()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        self.stdout.write('Sending outbox email (Ctrl+C to stop)')
+        sender.run(stop, wake)
+        self.stdout.write(f'Stopped after sending {sender.sent} message(s), {sender.failed} failed')
@@ -0,0 +1,257 @@
+"""
+Stage admin media uploads before the save transaction opens.
+
+MediaField.pre_save used to compress and upload inside the admin's
+`transaction.atomic` block, so the database write lock was held for the
+whole moviepy encode and Cloudinary round-trip. The admin now calls
+`stage_uploads()` first: every uploaded file bound for a MediaField is
+compressed (videos) and uploaded up front, concurrently, and swapped in
+request.FILES for a StagedUpload carrying the resulting resource.
+pre_save then only writes the stored value, so the transaction covers the
+row writes alone.
+
+Assets whose rows never commit (validation errors, rollbacks, crashes) are
+destroyed again by `discard_uncommitted()`, so nothing is orphaned on the CDN.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import ExitStack
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.forms.models import _get_foreign_key
+
+from .media_storage import get_backend
+
+logger = logging.getLogger(__name__)
+
+# Uploads in flight while staging one admin save (shares the pooled client)
+UPLOAD_CONCURRENCY = 4
+
+
+class StagedUpload(UploadedFile):
+    """
+    An uploaded file that has already been stored by the media backend.
+
+    Behaves like the original upload for form validation; MediaField.pre_save
+    uses `resource` instead of uploading again.
+    """
+
+    def __init__(self, original, field, resource=None, metadata=None):
+        super().__init__(
+            file=original.file, name=original.name, content_type=original.content_type,
+            size=original.size, charset=original.charset
+        )
+        self.field = field
+        self.resource = resource
+        self.metadata = metadata or {}
+        self.dependents = []
+        self.committed = False
+
+    def mark_saved(self):
+        """Called from pre_save: the asset is committed once the row is."""
+        transaction.on_commit(self._mark_committed)
+
+    def _mark_committed(self):
+        self.committed = True
+        # e.g. the segments and rendition playlists behind an HLS master playlist
+        for dependent in self.dependents:
+            dependent.committed = True
+
+
+def _inline_prefixes(model_admin):
+    """Map inline formset prefixes (e.g. 'photos') to their models."""
+    prefixes = {}
+    for inline in model_admin.inlines:
+        try:
+            fk = _get_foreign_key(model_admin.model, inline.model, fk_name=inline.fk_name)
+        except ValueError:
+            continue
+        prefixes[fk.remote_field.get_accessor_name(model=inline.model).replace('+', '')] = inline.model
+    return prefixes
+
+
+def _target_field(model_admin, key, prefixes):
+    """
+    Resolve a request.FILES key to (media field, POST key prefix).
+
+    Keys are either a field name ('thumbnail_image') or an inline form key
+    ('videos-0-video').
+    """
+    from .fields import MediaField
+
+    model, field_name, prefix = model_admin.model, key, ''
+    parts = key.rsplit('-', 2)
+    if len(parts) == 3 and parts[0] in prefixes:
+        model, field_name, prefix = prefixes[parts[0]], parts[2], f'{parts[0]}-{parts[1]}-'
+    try:
+        field = model._meta.get_field(field_name)
+    except FieldDoesNotExist:
+        return None, prefix
+    if not isinstance(field, MediaField):
+        return None, prefix
+    return field, prefix
+
+
+def _compress(file, quality, previews=None):
+    """
+    Compress a video upload if it needs it; returns (file, metadata).
+
+    `previews` (a VideoPreviewCollector) is filled either way: from the
+    encoder's frames when compressing, otherwise by sampling the upload.
+    """
+    from .models import VideoProcessingRun
+    from .progress_tracker import CompressionProgressTracker
+    from .video_utils import extract_previews, needs_compression, process_video_upload
+
+    if not needs_compression(file.size):
+        if previews is not None:
+            try:
+                extract_previews(file, previews)
+            except Exception as e:
+                logger.warning(f"[MEDIA STAGING] Could not extract previews from {file.name}: {e}")
+        return file, {}
+
+    progress_tracker = CompressionProgressTracker()
+    logger.info(f"[MEDIA STAGING] Compressing {file.name} [Task: {progress_tracker.task_id}]...")
+    run = VideoProcessingRun()
+    compressed_file, was_compressed, orig_mb, final_mb, _ = process_video_upload(
+        file, progress_tracker=progress_tracker, quality=quality, previews=previews, run=run
+    )
+    if not was_compressed:
+        return file, {}
+    return compressed_file, {
+        'was_compressed': True,
+        'original_size_mb': orig_mb,
+        'compressed_size_mb': final_mb,
+        # Linked to the video once it is saved (see signals.py)
+        '_processing_run': run,
+    }
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def stage_uploads(request, model_admin):
+    """
+    Compress and upload every media file in request.FILES before saving.
+
+    Videos are compressed one at a time (CPU bound); the uploads then run
+    concurrently over the pooled upload client.
+
+    Args:
+        request: The admin POST request (request.FILES is updated in place)
+        model_admin: The ModelAdmin handling the request
+
+    Returns:
+        List of StagedUpload objects, to be passed to discard_uncommitted()
+
+    Raises:
+        Exception: Whatever compression or upload raised; anything already
+            uploaded has been destroyed.
+    """
+    from .fields import CompressedVideoField
+    from .video_utils import hls_ladder_for, hls_upload_items
+
+    prefixes = _inline_prefixes(model_admin)
+    staged, items = [], []
+    # Ladder temp dirs and their open files live until the batch is uploaded
+    cleanup = ExitStack()
+    try:
+        for key, files in request.FILES.lists():
+            field, prefix = _target_field(model_admin, key, prefixes)
+            if field is None:
+                continue
+            for index, file in enumerate(files):
+                upload, metadata = file, {}
+                instance = field.model()
+                derived = {}
+                hls_items = []
+                if isinstance(field, CompressedVideoField):
+                    if field.hls_field and request.POST.get(f'{prefix}hls_enabled') in ('on', 'true', '1'):
+                        output_dir, ladder = cleanup.enter_context(hls_ladder_for(file))
+                        hls_items = hls_upload_items(output_dir, ladder, field.hls_prefix())
+                        for hls_file, _ in hls_items:
+                            cleanup.callback(hls_file.close)
+                    instance.compression_quality = request.POST.get(f'{prefix}compression_quality', 'high')
+                    previews = field.preview_collector(_float(request.POST.get(f'{prefix}poster_time')))
+                    upload, metadata = _compress(file, instance.compression_quality, previews)
+                    derived, preview_metadata = field.preview_files(previews)
+                    metadata.update(preview_metadata)
+                staged_upload = StagedUpload(file, field, metadata=metadata)
+                staged.append((key, index, staged_upload))
+                items.append((upload, field.upload_options(instance)))
+
+                # Posters/sprites upload in the same batch; the video's pre_save assigns them
+                for name, derived_file in derived.items():
+                    derived_field = field.model._meta.get_field(name)
+                    derived_upload = StagedUpload(derived_file, derived_field)
+                    staged_upload.metadata[name] = derived_upload
+                    staged.append((None, None, derived_upload))
+                    items.append((derived_file, derived_field.upload_options(instance)))
+
+                if hls_items:
+                    # The master playlist goes in the hls field; the rest commit along with it
+                    ladder_uploads = [StagedUpload(hls_file, field) for hls_file, _ in hls_items]
+                    master = ladder_uploads[-1]
+                    master.dependents = ladder_uploads[:-1]
+                    staged_upload.metadata[field.hls_field] = master
+                    staged += [(None, None, ladder_upload) for ladder_upload in ladder_uploads]
+                    items += hls_items
+    except BaseException:
+        cleanup.close()
+        raise
+
+    if not items:
+        cleanup.close()
+        return []
+
+    backend = get_backend()
+    logger.info(f"[MEDIA STAGING] Uploading {len(items)} file(s) before the save transaction")
+    with cleanup, ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY) as executor:
+        futures = [executor.submit(backend.upload, upload, **options) for upload, options in items]
+        wait(futures)
+
+    errors = [future.exception() for future in futures if future.exception()]
+    if errors:
+        # Don't leave the successful half of a failed batch on the CDN
+        for (_, _, staged_upload), future in zip(staged, futures):
+            if not future.exception():
+                staged_upload.resource = future.result()
+        discard_uncommitted([staged_upload for _, _, staged_upload in staged])
+        raise errors[0]
+
+    resources = [future.result() for future in futures]
+    for (key, index, staged_upload), resource in zip(staged, resources):
+        staged_upload.resource = resource
+        if key is None:
+            continue
+        files = request.FILES.getlist(key)
+        files[index] = staged_upload
+        request.FILES.setlist(key, files)
+    return [staged_upload for _, _, staged_upload in staged]
+
+
+def discard_uncommitted(staged):
+    """Destroy staged assets whose rows were never committed."""
+    if transaction.get_connection().in_atomic_block:
+        # Still inside an outer transaction (e.g. ATOMIC_REQUESTS): decide once it commits
+        transaction.on_commit(lambda: discard_uncommitted(staged))
+        return
+    backend = get_backend()
+    for staged_upload in staged:
+        if staged_upload.committed or staged_upload.resource is None:
+            continue
+        resource = staged_upload.resource
+        if resource.metadata and resource.metadata.get('existing'):
+            continue
+        try:
+            backend.destroy(resource.public_id, resource_type=resource.resource_type)
+            logger.info(f"[MEDIA STAGING] Discarded unsaved upload {resource.public_id}")
+        except Exception as e:
+            logger.error(f"[MEDIA STAGING] Could not discard {resource.public_id}: {e}")
@@ -0,0 +1,379 @@
+"""
+Media storage backends used by MediaField and CompressedVideoField.
+
+- CloudinaryBackend uploads to Cloudinary through the pooled upload client (production).
+- LocalBackend is an offline Cloudinary stand-in: uploads are stored on disk
+  under a content-addressed public_id, and delivery URLs keep Cloudinary's
+  `<resource_type>/upload/<transformation>/v<version>/<public_id>.<format>`
+  scheme so the rest of the app (and media_urls) works unchanged. Transformed
+  image derivatives are generated lazily by `serve_local_media`.
+
+The backend is picked with the MEDIA_BACKEND setting ('cloudinary' or 'local').
+"""
+import glob
+import hashlib
+import io
+import logging
+import mimetypes
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+from cloudinary import CloudinaryResource
+from django.conf import settings
+from django.http import FileResponse, Http404
+
+from . import perf
+
+logger = logging.getLogger(__name__)
+
+# Long-form transformation keys and their URL abbreviations
+TRANSFORMATION_KEYS = {
+    'width': 'w',
+    'height': 'h',
+    'crop': 'c',
+    'quality': 'q',
+    'fetch_format': 'f',
+}
+
+# URL segments served by the local backend; anything else is a 404, never a path
+RESOURCE_TYPES = ('image', 'video', 'raw')
+DELIVERY_TYPES = ('upload', 'private', 'authenticated')
+
+_TRANSFORMATION_SEGMENT_RE = re.compile(r'^[a-z]{1,3}_[^,/]+(,[a-z]{1,3}_[^,/]+)*$')
+_VERSION_SEGMENT_RE = re.compile(r'^v\d+$')
+_INTEGER_PARAM_RE = re.compile(r'[0-9]{1,9}')
+
+# Crop modes the local backend emulates (anything else is a 404)
+_CROP_MODES = ('scale', 'fill', 'limit', 'fit')
+
+# Pillow save formats for the image extensions we can derive
+_IMAGE_FORMATS = {
+    'jpg': 'JPEG',
+    'jpeg': 'JPEG',
+    'png': 'PNG',
+    'webp': 'WEBP',
+    'gif': 'GIF',
+}
+
+
+class CloudinaryBackend:
+    """Uploads straight to Cloudinary."""
+
+    name = 'cloudinary'
+
+    def upload(self, file, **options):
+        """
+        Upload a file and return a CloudinaryResource.
+
+        Args:
+            file: Django UploadedFile or other file-like object
+            **options: Cloudinary upload options (folder, resource_type, transformation, ...)
+        """
+        from .upload_client import get_upload_client, to_resource
+
+        with perf.media_call():
+            return to_resource(get_upload_client().upload(file, **options))
+
+    def upload_many(self, items, concurrency=4):
+        """Upload (file, options) pairs concurrently; returns resources in order."""
+        from .upload_client import get_upload_client, to_resource
+
+        with perf.media_call():
+            results = get_upload_client().upload_many(items, concurrency=concurrency)
+        return [to_resource(result) for result in results]
+
+    def destroy(self, public_id, resource_type='image'):
+        """Delete an uploaded asset."""
+        from cloudinary import uploader
+
+        with perf.media_call():
+            return uploader.destroy(public_id, resource_type=resource_type, invalidate=True)
+
+
+class LocalBackend:
+    """
+    Content-addressed disk storage that mimics Cloudinary.
+
+    Originals live in `<root>/<resource_type>/<type>/<public_id>.<format>` and
+    derivatives in `<root>/_derived/`.
+    """
+
+    name = 'local'
+
+    def __init__(self, root=None):
+        self.root = Path(root or getattr(settings, 'LOCAL_MEDIA_ROOT', Path(settings.MEDIA_ROOT) / 'local_cdn'))
+        self._derive_lock = threading.Lock()
+
+    def original_path(self, public_id, format, resource_type='image', delivery_type='upload'):
+        name = f'{public_id}.{format}' if format else public_id
+        return self.root / resource_type / delivery_type / name
+
+    def upload(self, file, folder=None, resource_type='image', type='upload', transformation=None,
+               public_id=None, **options):
+        """Store a file under a content hash (or the given public_id) and return a CloudinaryResource."""
+        if hasattr(file, 'seek'):
+            file.seek(0)
+        if hasattr(file, 'chunks'):
+            content = b''.join(file.chunks())
+        else:
+            content = file.read()
+
+        name = getattr(file, 'name', '') or ''
+        format = os.path.splitext(name)[1].lstrip('.').lower() or None
+        if format == 'jpeg':
+            format = 'jpg'
+        if not public_id:
+            digest = hashlib.sha256(content).hexdigest()[:20]
+            public_id = f'{folder}/{digest}' if folder else digest
+            if resource_type == 'raw' and format:
+                public_id = f'{public_id}.{format}'
+        if resource_type == 'raw':
+            # Like Cloudinary, raw public_ids carry their extension and have no format
+            format = None
+
+        metadata = {'bytes': len(content)}
+        if resource_type == 'image' and format in _IMAGE_FORMATS:
+            # Cloudinary applies upload-time ("incoming") transformations before storing
+            if transformation:
+                content = self._transform_image(content, _image_params(normalize_transformation(transformation)), format)
+            metadata.update(zip(('width', 'height'), _image_size(content)))
+
+        path = self.original_path(public_id, format, resource_type, type)
+        # Identical content shares one file; callers must not destroy it on behalf of one upload
+        metadata['existing'] = path.exists()
+        if not metadata['existing']:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+            tmp_path.write_bytes(content)
+            os.replace(tmp_path, path)
+
+        version = str(int(time.time()))
+        metadata.update({
+            'public_id': public_id,
+            'version': version,
+            'format': format,
+            'type': type,
+            'resource_type': resource_type,
+        })
+        logger.info(f"[LOCAL MEDIA] Stored {name or public_id} as {public_id} ({len(content) / 1024:.1f}KB)")
+        return CloudinaryResource(
+            public_id, format=format, version=version, type=type,
+            resource_type=resource_type, metadata=metadata
+        )
+
+    def upload_many(self, items, concurrency=4):
+        """Store (file, options) pairs; local writes gain nothing from overlapping."""
+        return [self.upload(file, **options) for file, options in items]
+
+    def destroy(self, public_id, resource_type='image'):
+        """Delete every stored original for a public_id."""
+        directory = self.root / resource_type
+        if resource_type not in RESOURCE_TYPES:
+            return {'result': 'not found'}
+        public_id = glob.escape(public_id)
+        pattern = f'*/{public_id}' if resource_type == 'raw' else f'*/{public_id}.*'
+        for path in directory.glob(pattern):
+            path.unlink(missing_ok=True)
+        return {'result': 'ok'}
+
+    def derived_path(self, public_id, format, resource_type, delivery_type, transformation):
+        """Return the path of a (lazily generated) derivative."""
+        key = hashlib.sha1(f'{resource_type}/{delivery_type}/{transformation}/{public_id}.{format}'.encode()).hexdigest()
+        return self.root / '_derived' / key[:2] / f'{key}.{format}'
+
+    def resolve(self, resource_type, delivery_type, path, accept=''):
+        """
+        Map a Cloudinary-style delivery path to a file on disk, deriving it if needed.
+
+        Args:
+            resource_type: 'image', 'video' or 'raw'
+            delivery_type: 'upload', 'private', ...
+            path: Remainder of the URL: [transformations/][v<version>/]<public_id>.<format>
+            accept: The request's Accept header (used for f_auto)
+
+        Returns:
+            Path to the file to serve
+        """
+        if resource_type not in RESOURCE_TYPES or delivery_type not in DELIVERY_TYPES:
+            raise FileNotFoundError(path)
+        segments = path.split('/')
+        transformations = []
+        while segments and _TRANSFORMATION_SEGMENT_RE.match(segments[0]):
+            transformations.append(segments.pop(0))
+        if segments and _VERSION_SEGMENT_RE.match(segments[0]):
+            segments.pop(0)
+
+        if '..' in segments or '' in segments:
+            raise FileNotFoundError(path)
+
+        public_id, _, requested_format = '/'.join(segments).rpartition('.')
+        if not public_id:
+            public_id, requested_format = requested_format, ''
+
+        matches = sorted((self.root / resource_type / delivery_type).glob(f'{glob.escape(public_id)}.*'))
+        if not matches or not matches[0].resolve().is_relative_to(self.root.resolve()):
+            raise FileNotFoundError(path)
+        original = matches[0]
+        original_format = original.suffix.lstrip('.')
+
+        if resource_type != 'image' or original_format not in _IMAGE_FORMATS:
+            # Video/raw derivatives are not emulated; serve the stored file
+            return original
+
+        params = _image_params(parse_transformation(transformations))
+        fetch_format = params.pop('f', None)
+        format = requested_format or original_format
+        if fetch_format == 'auto':
+            format = 'webp' if 'image/webp' in accept else format
+        elif fetch_format:
+            format = fetch_format
+        if format not in _IMAGE_FORMATS:
+            format = original_format
+
+        if not params and format == original_format:
+            return original
+
+        transformation_key = ','.join(f'{key}_{value}' for key, value in sorted(params.items()))
+        derived = self.derived_path(public_id, format, resource_type, delivery_type, transformation_key)
+        if not derived.exists():
+            with self._derive_lock:
+                if not derived.exists():
+                    derived.parent.mkdir(parents=True, exist_ok=True)
+                    content = self._transform_image(original.read_bytes(), params, format)
+                    tmp_path = derived.with_name(f'{derived.name}.{os.getpid()}.tmp')
+                    tmp_path.write_bytes(content)
+                    os.replace(tmp_path, derived)
+        return derived
+
+    def _transform_image(self, content, params, format):
+        """Apply w/h/c/q params (validated by _image_params) with Pillow and encode as `format`."""
+        from PIL import Image
+
+        image = Image.open(io.BytesIO(content))
+        width, height = params.get('w'), params.get('h')
+        crop = params.get('c', 'scale')
+
+        if width or height:
+            original_width, original_height = image.size
+            if crop == 'fill' and width and height:
+                from PIL import ImageOps
+                image = ImageOps.fit(image, (width, height))
+            elif crop in ('limit', 'fit'):
+                # Keep aspect ratio inside the box; 'limit' only ever shrinks
+                ratio = min((width or original_width) / original_width, (height or original_height) / original_height)
+                if crop == 'fit' or ratio < 1:
+                    image = image.resize((max(1, round(original_width * ratio)), max(1, round(original_height * ratio))))
+            else:
+                if width and not height:
+                    height = max(1, round(original_height * width / original_width))
+                elif height and not width:
+                    width = max(1, round(original_width * height / original_height))
+                image = image.resize((width, height))
+
+        pil_format = _IMAGE_FORMATS.get(format, 'PNG')
+        save_options = {}
+        quality = params.get('q')
+        if pil_format in ('JPEG', 'WEBP'):
+            save_options['quality'] = quality if isinstance(quality, int) else 85
+            if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+
+        output = io.BytesIO()
+        image.save(output, format=pil_format, **save_options)
+        return output.getvalue()
+
+
+def _image_params(params):
+    """
+    Validate URL transformation params for deriving an image.
+
+    w and h must be positive integers and are clamped to MEDIA_LOCAL_MAX_DIMENSION,
+    q is 1-100 or 'auto', c one of _CROP_MODES. Unknown params are dropped, so
+    they can't multiply the derivatives stored for one image.
+
+    Raises:
+        FileNotFoundError: For a malformed value (served as a 404)
+    """
+    limit = settings.MEDIA_LOCAL_MAX_DIMENSION
+    cleaned = {}
+    for key in ('w', 'h'):
+        if key in params:
+            if not _INTEGER_PARAM_RE.fullmatch(params[key]) or int(params[key]) == 0:
+                raise FileNotFoundError(f'{key}_{params[key]}')
+            cleaned[key] = min(int(params[key]), limit)
+    if 'q' in params:
+        quality = params['q']
+        if quality != 'auto' and not (_INTEGER_PARAM_RE.fullmatch(quality) and 1 <= int(quality) <= 100):
+            raise FileNotFoundError(f'q_{quality}')
+        cleaned['q'] = quality if quality == 'auto' else int(quality)
+    if 'c' in params:
+        if params['c'] not in _CROP_MODES:
+            raise FileNotFoundError(f"c_{params['c']}")
+        cleaned['c'] = params['c']
+    if 'f' in params:
+        cleaned['f'] = params['f']
+    return cleaned
+
+
+def _image_size(content):
+    from PIL import Image
+
+    try:
+        return Image.open(io.BytesIO(content)).size
+    except Exception:
+        return (None, None)
+
+
+def normalize_transformation(transformation):
+    """Flatten upload-style transformation dicts into abbreviated URL params."""
+    if isinstance(transformation, dict):
+        transformation = [transformation]
+    params = {}
+    for step in transformation or []:
+        for key, value in step.items():
+            params[TRANSFORMATION_KEYS.get(key, key)] = str(value)
+    return params
+
+
+def parse_transformation(segments):
+    """Parse URL transformation segments like 'c_fill,h_338,w_600' into a dict."""
+    params = {}
+    for segment in segments:
+        for component in segment.split(','):
+            key, _, value = component.partition('_')
+            params[key] = value
+    return params
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the configured media backend (process-wide singleton)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = getattr(settings, 'MEDIA_BACKEND', 'cloudinary')
+                _backend = LocalBackend() if name == 'local' else CloudinaryBackend()
+    return _backend
+
+
+def serve_local_media(request, resource_type, delivery_type, path):
+    """Serve an original or lazily derived file from the local backend."""
+    backend = get_backend()
+    if not isinstance(backend, LocalBackend):
+        raise Http404('Local media backend is not enabled')
+    try:
+        file_path = backend.resolve(resource_type, delivery_type, path, request.headers.get('Accept', ''))
+    except FileNotFoundError:
+        raise Http404('Media not found')
+
+    content_type = mimetypes.guess_type(file_path.name)[0] or 'application/octet-stream'
+    response = FileResponse(open(file_path, 'rb'), content_type=content_type)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
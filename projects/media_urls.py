@@ -0,0 +1,140 @@
+"""
+Memoized URL resolution for Cloudinary resources.
+
+Every `.url` access on a CloudinaryField value rebuilds the delivery URL
+through the cloudinary SDK. The URL only depends on the resource's identity
+and the requested transformation, so results are kept in a bounded LRU keyed
+on (public_id, transformation, format) plus the resource/delivery type and
+version.
+"""
+import re
+from functools import lru_cache
+
+from cloudinary import CloudinaryResource, utils
+from cloudinary.models import CLOUDINARY_FIELD_DB_RE
+from django.conf import settings
+
+# Maximum number of distinct URLs kept per process
+URL_CACHE_SIZE = getattr(settings, 'MEDIA_URL_CACHE_SIZE', 4096)
+
+_FIELD_RE = re.compile(CLOUDINARY_FIELD_DB_RE)
+
+
+def _freeze(value):
+    """Convert transformation options into a hashable cache key."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(val)) for key, val in value.items()))
+    if isinstance(value, (list, tuple)):
+        return ('__list__',) + tuple(_freeze(val) for val in value)
+    return value
+
+
+def _thaw(value):
+    """Inverse of _freeze()."""
+    if isinstance(value, tuple):
+        if value and value[0] == '__list__':
+            return [_thaw(val) for val in value[1:]]
+        return {key: _thaw(val) for key, val in value}
+    return value
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def _build_url(public_id, transformation, format, resource_type, delivery_type, version):
+    options = _thaw(transformation) if transformation else {}
+    return utils.cloudinary_url(
+        public_id,
+        format=format,
+        version=version,
+        type=delivery_type,
+        resource_type=resource_type,
+        **options
+    )[0]
+
+
+def parse_resource(value, resource_type='image'):
+    """
+    Turn a stored CloudinaryField value into a CloudinaryResource.
+
+    Accepts CloudinaryResource instances as-is, so callers can pass either
+    model attributes or raw strings from `.values()` queries.
+    """
+    if not value:
+        return None
+    if isinstance(value, CloudinaryResource):
+        return value
+    if not isinstance(value, str):
+        return None
+    match = _FIELD_RE.match(value)
+    return CloudinaryResource(
+        type=match.group('type') or 'upload',
+        resource_type=match.group('resource_type') or resource_type,
+        version=match.group('version'),
+        public_id=match.group('public_id'),
+        format=match.group('format'),
+    )
+
+
+def resource_url(value, resource_type='image', **options):
+    """
+    Return the delivery URL for a Cloudinary resource, memoized.
+
+    Args:
+        value: CloudinaryResource or stored field string (e.g. 'image/upload/v1/x.jpg')
+        resource_type: Fallback resource type for strings without a prefix
+        **options: Cloudinary URL options (width, crop, format, transformation, ...)
+
+    Returns:
+        URL string, or None if there is no resource
+    """
+    resource = parse_resource(value, resource_type)
+    if resource is None or not resource.public_id:
+        return None
+
+    options = {**resource.url_options, **options}
+    format = options.pop('format', resource.format)
+    return _build_url(
+        resource.public_id,
+        _freeze(options),
+        format,
+        resource.resource_type or resource_type,
+        resource.type,
+        resource.version,
+    )
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def stored_url(value, resource_type='image'):
+    """
+    resource_url() for a stored field string (e.g. from `.values()`), memoized
+    on the string itself so repeat calls skip parsing it into a resource.
+    """
+    return resource_url(value, resource_type)
+
+
+def resolve_urls(objects, field_name, **options):
+    """
+    Resolve one media field for a whole queryset/list in a single pass.
+
+    Returns:
+        Dict mapping object pk to URL (None when the field is empty)
+    """
+    return {obj.pk: resource_url(getattr(obj, field_name), **options) for obj in objects}
+
+
+def clear_cache():
+    """Drop all memoized URLs (e.g. after changing the Cloudinary config)."""
+    _build_url.cache_clear()
+    stored_url.cache_clear()
+
+
+def cache_stats():
+    """Return LRU counters for the URL cache."""
+    info = _build_url.cache_info()
+    total = info.hits + info.misses
+    return {
+        'hits': info.hits,
+        'misses': info.misses,
+        'hit_ratio': info.hits / total if total else 0.0,
+        'entries': info.currsize,
+        'max_entries': info.maxsize,
+    }
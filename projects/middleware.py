@@ -0,0 +1,221 @@
+"""
+Request middleware.
+
+UploadSlotsMiddleware keeps media uploads from starving page views: each
+worker process lets at most settings.UPLOAD_REQUEST_SLOTS multipart POSTs
+(admin media saves, CKEditor uploads) run at once. A request beyond that
+waits up to UPLOAD_SLOT_WAIT seconds for a slot, then gets a 503 with
+Retry-After. It is installed before the CSRF middleware, so the body is not
+read until the request has a slot (under ASGI the server has already read it,
+and the slots only bound concurrent upload handling).
+
+PerfMiddleware records each request's wall time, queries, template time,
+cache lookups and Cloudinary calls per route for the /perf page (see perf.py).
+It sits after WhiteNoise, so static files are not counted.
+
+ProfilingMiddleware (opt-in, PROFILE_ENABLED) samples the stacks of slow
+requests, and of staff requests that ask for it with PROFILE_HEADER, for the
+/perf/profiles/ flame graphs (see profiling.py). It sits after the
+authentication middleware, which the header check needs.
+
+WhiteNoise and django-otp ship sync-only middleware. Under ASGI one sync
+middleware makes Django run the rest of the chain, async views included, in a
+thread per request, so AsyncWhiteNoiseMiddleware and AsyncOTPMiddleware add
+the async path (same behaviour) and every middleware in settings.MIDDLEWARE
+can stay on the event loop.
+"""
+import asyncio
+import functools
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.utils.functional import SimpleLazyObject
+from django_otp.middleware import OTPMiddleware
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import perf, profiling
+
+logger = logging.getLogger(__name__)
+
+
+def is_upload(request):
+    return request.method == 'POST' and request.content_type == 'multipart/form-data'
+
+
+def slots_busy_response(request):
+    logger.warning(f"[UPLOAD SLOTS] All {settings.UPLOAD_REQUEST_SLOTS} upload slots busy; rejecting {request.path}")
+    response = HttpResponse('The server is busy with other uploads. Please retry shortly.',
+                            status=503, content_type='text/plain')
+    response['Retry-After'] = '30'
+    return response
+
+
+class AsyncCapableMixin:
+    """Dispatch __call__ to __acall__ when the next handler is async (as Django's MiddlewareMixin does)."""
+    sync_capable = True
+    async_capable = True
+
+    def _check_async(self, get_response):
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    return f'/{match.route}' if match is not None else '(unresolved)'
+
+
+class PerfMiddleware(AsyncCapableMixin):
+    def __init__(self, get_response):
+        if not settings.PERF_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self._check_async(get_response)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token, started, status = perf.start(), time.perf_counter(), 500
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            perf.finish(token, _route(request), request.method, request.path, status,
+                        time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        token, started, status = perf.start(), time.perf_counter(), 500
+        try:
+            response = await self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            perf.finish(token, _route(request), request.method, request.path, status,
+                        time.perf_counter() - started)
+
+
+class ProfilingMiddleware(AsyncCapableMixin):
+    def __init__(self, get_response):
+        if not settings.PROFILE_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self._check_async(get_response)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        trigger = profiling.trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+        collector = profiling.start(threading.get_ident())
+        started, status, response = time.perf_counter(), 500, None
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            wall = time.perf_counter() - started
+            profiling.stop(collector)
+            if profiling.keep(trigger, wall):
+                name = profiling.save(collector, trigger, _route(request), request.method, request.path, status, wall)
+                if response is not None and name:
+                    response['X-Profile-Id'] = name
+
+    async def __acall__(self, request):
+        user = None
+        if settings.PROFILE_HEADER and request.headers.get(settings.PROFILE_HEADER):
+            user = await request.auser()
+        trigger = profiling.trigger(request, user)
+        if trigger is None:
+            return await self.get_response(request)
+        collector = profiling.start(None)  # the request's work moves between the loop and threads
+        started, status, response = time.perf_counter(), 500, None
+        try:
+            response = await self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            wall = time.perf_counter() - started
+            profiling.stop(collector)
+            if profiling.keep(trigger, wall):
+                name = await sync_to_async(profiling.save)(
+                    collector, trigger, _route(request), request.method, request.path, status, wall)
+                if response is not None and name:
+                    response['X-Profile-Id'] = name
+
+
+class UploadSlotsMiddleware(AsyncCapableMixin):
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._check_async(get_response)
+        if self.async_mode:
+            # One event loop per ASGI worker process
+            self.slots = asyncio.BoundedSemaphore(settings.UPLOAD_REQUEST_SLOTS)
+        else:
+            self.slots = threading.BoundedSemaphore(settings.UPLOAD_REQUEST_SLOTS)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not is_upload(request):
+            return self.get_response(request)
+
+        if not self.slots.acquire(timeout=settings.UPLOAD_SLOT_WAIT):
+            return slots_busy_response(request)
+        try:
+            return self.get_response(request)
+        finally:
+            self.slots.release()
+
+    async def __acall__(self, request):
+        if not is_upload(request):
+            return await self.get_response(request)
+
+        try:
+            await asyncio.wait_for(self.slots.acquire(), timeout=settings.UPLOAD_SLOT_WAIT)
+        except TimeoutError:
+            return slots_busy_response(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            self.slots.release()
+
+
+class AsyncWhiteNoiseMiddleware(AsyncCapableMixin, WhiteNoiseMiddleware):
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings=settings)
+        self._check_async(get_response)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            # Headers only; the ASGI handler streams the file body from a thread
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class AsyncOTPMiddleware(AsyncCapableMixin, OTPMiddleware):
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self._check_async(get_response)
+
+    async def __acall__(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None:
+            request.user = SimpleLazyObject(functools.partial(self._verify_user, request, user))
+        return await self.get_response(request)
@@ -0,0 +1,67 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS projects_search USING fts5("
+            "name, body, tokenize = 'porter unicode61 remove_diacritics 2')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE IF NOT EXISTS projects_search ("
+            "project_id bigint PRIMARY KEY REFERENCES projects_projects (id) ON DELETE CASCADE, "
+            "name text NOT NULL, "
+            "body text NOT NULL, "
+            "document tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', name), 'A') || "
+            "setweight(to_tsvector('english', body), 'B')) STORED)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS projects_search_document_gin "
+            "ON projects_search USING GIN (document)"
+        )
+
+
+def populate_search_index(apps, schema_editor):
+    from projects.search import strip_markdown
+
+    vendor = schema_editor.connection.vendor
+    if vendor not in ('sqlite', 'postgresql'):
+        return
+
+    Projects = apps.get_model('projects', 'Projects')
+    for project in Projects.objects.all():
+        parts = [strip_markdown(project.description)]
+        for card in project.cards.all():
+            parts.extend([card.title, card.teaser, strip_markdown(card.body)])
+        parts.extend(caption for caption in project.photos.values_list('caption', flat=True) if caption)
+        body = ' '.join(part for part in parts if part)
+        if vendor == 'sqlite':
+            schema_editor.execute(
+                'INSERT INTO projects_search (rowid, name, body) VALUES (%s, %s, %s)',
+                [project.pk, project.name, body]
+            )
+        else:
+            schema_editor.execute(
+                'INSERT INTO projects_search (project_id, name, body) VALUES (%s, %s, %s)',
+                [project.pk, project.name, body]
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('DROP TABLE IF EXISTS projects_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0040_alter_projects_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(populate_search_index, migrations.RunPython.noop),
+    ]
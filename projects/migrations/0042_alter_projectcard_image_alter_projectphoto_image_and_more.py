@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-19 12:09
+
+import projects.fields
+import projects.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0041_projects_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='projectcard',
+            name='image',
+            field=projects.fields.MediaField(blank=True, max_length=255, null=True, verbose_name='image'),
+        ),
+        migrations.AlterField(
+            model_name='projectphoto',
+            name='image',
+            field=projects.fields.MediaField(max_length=255, validators=[projects.models.ProjectPhoto.validate_image_file], verbose_name='image'),
+        ),
+        migrations.AlterField(
+            model_name='projects',
+            name='thumbnail_image',
+            field=projects.fields.MediaField(blank=True, max_length=255, null=True, verbose_name='image'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2 on 2026-10-19 12:19
+
+import projects.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0042_alter_projectcard_image_alter_projectphoto_image_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectvideo',
+            name='poster',
+            field=projects.fields.MediaField(blank=True, editable=False, max_length=255, null=True, verbose_name='image'),
+        ),
+        migrations.AddField(
+            model_name='projectvideo',
+            name='poster_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectvideo',
+            name='poster_time',
+            field=models.FloatField(default=1.0, help_text='Second of the video to use as the poster image (applied when a video is uploaded)'),
+        ),
+        migrations.AddField(
+            model_name='projectvideo',
+            name='poster_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectvideo',
+            name='sprite',
+            field=projects.fields.MediaField(blank=True, editable=False, max_length=255, null=True, verbose_name='image'),
+        ),
+        migrations.AddField(
+            model_name='projectvideo',
+            name='sprite_columns',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectvideo',
+            name='sprite_frame_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectvideo',
+            name='sprite_frame_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectvideo',
+            name='sprite_frames',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectvideo',
+            name='sprite_interval',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='projectvideo',
+            name='video',
+            field=projects.fields.CompressedVideoField(max_length=255, poster_field='poster', sprite_field='sprite', verbose_name='video'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-19 12:23
+
+import projects.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0043_projectvideo_poster_projectvideo_poster_height_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectvideo',
+            name='hls_enabled',
+            field=models.BooleanField(default=False, help_text='Also build 1080p/720p/480p HLS renditions so slow connections get a smaller stream (slower upload)', verbose_name='Adaptive streaming'),
+        ),
+        migrations.AddField(
+            model_name='projectvideo',
+            name='hls_playlist',
+            field=projects.fields.MediaField(blank=True, editable=False, max_length=255, null=True, verbose_name='raw'),
+        ),
+        migrations.AlterField(
+            model_name='projectvideo',
+            name='video',
+            field=projects.fields.CompressedVideoField(hls_field='hls_playlist', max_length=255, poster_field='poster', sprite_field='sprite', verbose_name='video'),
+        ),
+    ]
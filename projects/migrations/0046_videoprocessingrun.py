@@ -0,0 +1,48 @@
+# Generated by Django 5.2 on 2026-10-19 13:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0045_outboxemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoProcessingRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(blank=True, max_length=255)),
+                ('quality', models.CharField(help_text='QUALITY_PRESETS entry requested', max_length=10)),
+                ('status', models.CharField(choices=[('succeeded', 'Succeeded'), ('failed', 'Failed')], default='succeeded', max_length=10)),
+                ('failure_reason', models.TextField(blank=True)),
+                ('used_aggressive', models.BooleanField(default=False, help_text="The preset's output was still too large and compress_video_aggressive re-encoded it")),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('duration_seconds', models.FloatField(blank=True, null=True)),
+                ('input_width', models.PositiveIntegerField(blank=True, null=True)),
+                ('input_height', models.PositiveIntegerField(blank=True, null=True)),
+                ('input_size_mb', models.FloatField(blank=True, null=True)),
+                ('input_bitrate_kbps', models.FloatField(blank=True, null=True)),
+                ('output_width', models.PositiveIntegerField(blank=True, null=True)),
+                ('output_height', models.PositiveIntegerField(blank=True, null=True)),
+                ('output_size_mb', models.FloatField(blank=True, null=True)),
+                ('output_bitrate_kbps', models.FloatField(blank=True, null=True)),
+                ('frames', models.PositiveIntegerField(blank=True, help_text='Frames encoded, across all passes', null=True)),
+                ('probe_seconds', models.FloatField(blank=True, help_text='Opening the input and reading its metadata', null=True)),
+                ('decode_seconds', models.FloatField(blank=True, help_text='Producing frames for the encoder: decoding, resizing, preview capture', null=True)),
+                ('encode_seconds', models.FloatField(blank=True, help_text='The rest of the encode: ffmpeg compressing and muxing, audio', null=True)),
+                ('total_seconds', models.FloatField(blank=True, null=True)),
+                ('cpu_seconds', models.FloatField(blank=True, help_text='User + system CPU of the worker and its finished ffmpeg processes', null=True)),
+                ('peak_rss_mb', models.FloatField(blank=True, help_text='Peak resident memory of the worker process', null=True)),
+                ('video', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='processing_runs', to='projects.projectvideo')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['quality', 'started_at'], name='videorun_quality_idx')],
+            },
+        ),
+    ]
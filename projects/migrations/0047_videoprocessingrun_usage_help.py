@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-19 14:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0046_videoprocessingrun'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='videoprocessingrun',
+            name='cpu_seconds',
+            field=models.FloatField(blank=True, help_text='User + system CPU of the compressing thread, plus its ffmpeg processes unless another run overlapped it', null=True),
+        ),
+        migrations.AlterField(
+            model_name='videoprocessingrun',
+            name='peak_rss_mb',
+            field=models.FloatField(blank=True, help_text='Peak resident memory of the worker process since it started; empty if another run overlapped', null=True),
+        ),
+    ]
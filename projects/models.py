@@ -1,9 +1,10 @@
 import os
 from django.db import models
 from django.core.exceptions import ValidationError
-from cloudinary.models import CloudinaryField
+from django.utils import timezone
 from multiselectfield import MultiSelectField
-from .fields import CompressedVideoField
+from .fields import MediaField, CompressedVideoField
+from .media_urls import resource_url
 
 TECH_STACK_CHOICES = [
     ('Languages', [
@@ -59,6 +60,9 @@ TECH_STACK_CHOICES = [
     ]),
 ]
 
+# value -> display name across all groups, for the tech_display filter
+TECH_DISPLAY = {value: label for _, group in TECH_STACK_CHOICES for value, label in group}
+
 class Category(models.Model):
     name = models.CharField(max_length=50, unique=True)
     
@@ -82,7 +86,7 @@ class Projects(models.Model):
         help_text="Select a category or add a new one in the Category section."
     )
     # Removed main_image for clarity. Only using one image field now.
-    thumbnail_image = CloudinaryField('image', folder='thumbnails', blank=True, null=True,
+    thumbnail_image = MediaField('image', folder='thumbnails', blank=True, null=True,
         transformation=[
             {'width': 600, 'height': 338, 'crop': 'fill'},
             {'quality': 'auto', 'fetch_format': 'auto'}
@@ -115,7 +119,7 @@ class ProjectPhoto(models.Model):
         if value.size > 50 * 1024 * 1024:
             raise ValidationError('Image file too large (max 50MB).')
 
-    image = CloudinaryField('image', folder='project_photos',
+    image = MediaField('image', folder='project_photos',
         transformation=[
             {'width': 1920, 'height': 1080, 'crop': 'limit'},
             {'quality': 'auto', 'fetch_format': 'auto'}
@@ -139,6 +143,9 @@ class ProjectVideo(models.Model):
         resource_type='video',
         # Don't apply transformations during upload - we already compressed the video
         # transformation=[]  # Removed - we handle compression ourselves
+        poster_field='poster',
+        sprite_field='sprite',
+        hls_field='hls_playlist',
     )
     caption = models.CharField(max_length=200, blank=True, 
         help_text="Optional description for the video")
@@ -154,12 +161,49 @@ class ProjectVideo(models.Model):
         choices=[('high', 'High Quality (1080p)'), ('medium', 'Balanced (720p)'), ('low', 'Fast Upload (480p)')],
         help_text="Quality preset for automatic compression (only used if file > 100MB)")
 
+    # Poster frame and scrubbing sprite sheet, extracted while the video is processed
+    # (declared after `video`, whose pre_save fills them in)
+    poster_time = models.FloatField(default=1.0,
+        help_text="Second of the video to use as the poster image (applied when a video is uploaded)")
+    poster = MediaField('image', folder='video_posters', blank=True, null=True, editable=False)
+    poster_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    poster_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    sprite = MediaField('image', folder='video_sprites', blank=True, null=True, editable=False)
+    sprite_frame_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    sprite_frame_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    sprite_columns = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    sprite_frames = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    sprite_interval = models.FloatField(null=True, blank=True, editable=False)
+
+    # Optional adaptive-streaming ladder (HLS renditions from the compression presets)
+    hls_enabled = models.BooleanField(default=False, verbose_name='Adaptive streaming',
+        help_text="Also build 1080p/720p/480p HLS renditions so slow connections get a smaller stream (slower upload)")
+    hls_playlist = MediaField('raw', resource_type='raw', blank=True, null=True, editable=False)
+
     class Meta:
         ordering = ['order', 'created_at']
 
     def __str__(self):
         return f"{self.project.name} - Video {self.order}"
 
+    def get_poster_url(self, **options):
+        """Extracted poster (WebP/AVIF via f_auto), or Cloudinary's first-frame JPEG for older videos."""
+        if self.poster:
+            return resource_url(self.poster, quality='auto', fetch_format='auto', **options)
+        return resource_url(self.video, 'video', format='jpg', **options)
+
+    @property
+    def poster_url(self):
+        return self.get_poster_url()
+
+    @property
+    def sprite_url(self):
+        return resource_url(self.sprite) if self.sprite else None
+
+    @property
+    def hls_url(self):
+        return resource_url(self.hls_playlist, 'raw') if self.hls_playlist else None
+
     def clean(self):
         from django.core.exceptions import ValidationError
         # Basic validation only - compression happens in save()
@@ -170,6 +214,65 @@ class ProjectVideo(models.Model):
                 })
         super().clean()
 
+class VideoProcessingRun(models.Model):
+    """
+    One compression attempt by process_video_upload (see video_utils.py):
+    what went in, what came out and where the time went. Aggregated by preset
+    in the admin to tune QUALITY_PRESETS. Failed attempts have no video.
+    """
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(SUCCEEDED, 'Succeeded'), (FAILED, 'Failed')]
+
+    video = models.ForeignKey(ProjectVideo, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='processing_runs')
+    file_name = models.CharField(max_length=255, blank=True)
+    quality = models.CharField(max_length=10, help_text="QUALITY_PRESETS entry requested")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=SUCCEEDED)
+    failure_reason = models.TextField(blank=True)
+    used_aggressive = models.BooleanField(default=False,
+        help_text="The preset's output was still too large and compress_video_aggressive re-encoded it")
+    started_at = models.DateTimeField(default=timezone.now)
+
+    # Input and output
+    duration_seconds = models.FloatField(null=True, blank=True)
+    input_width = models.PositiveIntegerField(null=True, blank=True)
+    input_height = models.PositiveIntegerField(null=True, blank=True)
+    input_size_mb = models.FloatField(null=True, blank=True)
+    input_bitrate_kbps = models.FloatField(null=True, blank=True)
+    output_width = models.PositiveIntegerField(null=True, blank=True)
+    output_height = models.PositiveIntegerField(null=True, blank=True)
+    output_size_mb = models.FloatField(null=True, blank=True)
+    output_bitrate_kbps = models.FloatField(null=True, blank=True)
+    frames = models.PositiveIntegerField(null=True, blank=True, help_text="Frames encoded, across all passes")
+
+    # Where the time went (seconds)
+    probe_seconds = models.FloatField(null=True, blank=True, help_text="Opening the input and reading its metadata")
+    decode_seconds = models.FloatField(null=True, blank=True,
+        help_text="Producing frames for the encoder: decoding, resizing, preview capture")
+    encode_seconds = models.FloatField(null=True, blank=True,
+        help_text="The rest of the encode: ffmpeg compressing and muxing, audio")
+    total_seconds = models.FloatField(null=True, blank=True)
+    cpu_seconds = models.FloatField(null=True, blank=True,
+        help_text="User + system CPU of the compressing thread, plus its ffmpeg processes unless another run "
+                  "overlapped it")
+    peak_rss_mb = models.FloatField(null=True, blank=True,
+        help_text="Peak resident memory of the worker process since it started; empty if another run overlapped")
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [models.Index(fields=['quality', 'started_at'], name='videorun_quality_idx')]
+
+    def __str__(self):
+        return f"{self.file_name or 'Video'} ({self.quality}, {self.get_status_display().lower()})"
+
+    @property
+    def realtime_factor(self):
+        """Seconds of video compressed per second of wall time."""
+        if self.duration_seconds and self.total_seconds:
+            return self.duration_seconds / self.total_seconds
+        return None
+
 class ProjectCard(models.Model):
     project = models.ForeignKey(Projects, on_delete=models.CASCADE, related_name='cards')
     title = models.CharField(max_length=100)
@@ -180,7 +283,7 @@ class ProjectCard(models.Model):
         verbose_name='Takeaways',
         help_text="Key takeaway bullet points, one per line. Leave blank to omit."
     )
-    image = CloudinaryField('image', folder='card_images', blank=True, null=True,
+    image = MediaField('image', folder='card_images', blank=True, null=True,
         transformation=[
             {'width': 600, 'height': 338, 'crop': 'fill'},
             {'quality': 'auto', 'fetch_format': 'auto'}
@@ -205,7 +308,7 @@ class ProjectCard(models.Model):
 
     @property
     def image_url(self):
-        return self.image.url if self.image else None
+        return resource_url(self.image)
 
 class ProjectEmbed(models.Model):
     project = models.ForeignKey(Projects, on_delete=models.CASCADE, related_name='embeds')
@@ -234,4 +337,39 @@ class ProjectEmbed(models.Model):
         if not has_allowed:
             self.is_safe = False
             raise ValidationError(f'Only embeds from {", ".join(allowed_sources)} are allowed.')
-        self.is_safe = True
\ No newline at end of file
+        self.is_safe = True
+
+
+class OutboxEmail(models.Model):
+    """
+    An email waiting to be sent (or already sent) by the outbox sender; see
+    outbox.py. Contact submissions are saved here and the request returns as
+    soon as the row is committed.
+    """
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (SENT, 'Sent'), (FAILED, 'Failed')]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField(default=list)
+    # Hash of the content and the dedupe window; a repeated submission hits the unique constraint
+    dedupe_key = models.CharField(max_length=64, unique=True, editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # Set while a sender holds the row; a sender that dies releases it when the lease runs out
+    locked_until = models.DateTimeField(null=True, blank=True, editable=False)
+    claim_token = models.CharField(max_length=32, blank=True, editable=False)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx')]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
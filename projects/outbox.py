@@ -0,0 +1,246 @@
+"""
+Outbound email queue.
+
+enqueue() / aenqueue() save a message as an OutboxEmail row and return as
+soon as it is committed, so a visitor never waits on SMTP. A sender delivers
+the queue:
+
+- due rows are claimed in batches of OUTBOX_BATCH_SIZE under a short lease,
+  so senders in several processes never send a row twice, and rows held by a
+  sender that died come back when the lease runs out
+- messages go out over one SMTP connection, kept open while there is work
+- a failed message is retried with exponential backoff (with jitter) up to
+  OUTBOX_MAX_ATTEMPTS times; permanent (5xx) rejections fail at once
+- each message's Message-ID is derived from its row, so a resend after an
+  ambiguous failure (delivered, but the reply was lost) can be recognised
+
+The same message submitted again within OUTBOX_DEDUPE_WINDOW seconds gets
+the same dedupe key and is stored once.
+
+With OUTBOX_SENDER_THREAD on (the default), each web worker runs the sender
+in a daemon thread, started when the worker boots (gunicorn's post_worker_init
+hook, or asgi.py under other servers) so rows left pending or waiting on a
+retry by an earlier worker are sent without waiting for new mail, and woken
+at once by every enqueue.
+Otherwise run `python manage.py send_outbox` as its own process.
+"""
+import hashlib
+import logging
+import random
+import smtplib
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.utils import DNS_NAME
+from django.db import IntegrityError, close_old_connections, connection as db_connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+def dedupe_key(subject, body, from_email, recipients, now=None):
+    """Hash identifying a message within its OUTBOX_DEDUPE_WINDOW time bucket."""
+    window = int((now or timezone.now()).timestamp() // settings.OUTBOX_DEDUPE_WINDOW)
+    parts = [str(window), from_email.lower(), ','.join(sorted(address.lower() for address in recipients)), subject, body]
+    return hashlib.sha256('\0'.join(parts).encode()).hexdigest()
+
+
+def _build(subject, message, from_email, recipient_list):
+    recipients = [address for address in recipient_list if address]
+    return OutboxEmail(subject=subject, body=message, from_email=from_email, recipients=recipients,
+                       dedupe_key=dedupe_key(subject, message, from_email, recipients))
+
+
+def enqueue(subject, message, from_email, recipient_list):
+    """
+    Queue a message (send_mail's arguments) for the sender.
+
+    Returns:
+        tuple: (OutboxEmail, created); (None, False) if there are no recipients
+    """
+    row = _build(subject, message, from_email, recipient_list)
+    if not row.recipients:
+        logger.warning(f"[OUTBOX] '{subject}' has no recipients (is EMAIL_HOST_USER set?); not queued")
+        return None, False
+    try:
+        with transaction.atomic():
+            row.save()
+    except IntegrityError:
+        return OutboxEmail.objects.get(dedupe_key=row.dedupe_key), False
+    transaction.on_commit(wake)
+    return row, True
+
+
+async def aenqueue(subject, message, from_email, recipient_list):
+    """enqueue() for async views (which always run in autocommit)."""
+    row = _build(subject, message, from_email, recipient_list)
+    if not row.recipients:
+        logger.warning(f"[OUTBOX] '{subject}' has no recipients (is EMAIL_HOST_USER set?); not queued")
+        return None, False
+    try:
+        await row.asave()
+    except IntegrityError:
+        return await OutboxEmail.objects.aget(dedupe_key=row.dedupe_key), False
+    wake()
+    return row, True
+
+
+def retry_delay(attempts):
+    """Seconds before retry number `attempts`: doubling from OUTBOX_RETRY_BASE, capped, +-25% jitter."""
+    delay = min(settings.OUTBOX_RETRY_BASE * 2 ** (attempts - 1), settings.OUTBOX_RETRY_MAX)
+    return delay * random.uniform(0.75, 1.25)
+
+
+def is_permanent(error):
+    """Whether the server rejected the message for good (5xx), as opposed to a retryable failure."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        # A settings problem; retry so mail goes out once the credentials are fixed
+        return False
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+class OutboxSender:
+    """Delivers due OutboxEmail rows over a single, reused SMTP connection."""
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        self.connection = None
+        self.sent = 0
+        self.failed = 0
+
+    def claim(self):
+        """Lease the next batch of due rows to this sender."""
+        now = timezone.now()
+        due = Q(status=OutboxEmail.PENDING, next_attempt_at__lte=now) & (
+            Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+        ids = list(OutboxEmail.objects.filter(due).order_by('next_attempt_at', 'pk')
+                   .values_list('pk', flat=True)[:self.batch_size])
+        if not ids:
+            return []
+        token = uuid.uuid4().hex
+        # Re-checks `due`, so of two senders racing for a row only one gets it
+        OutboxEmail.objects.filter(due, pk__in=ids).update(
+            claim_token=token, locked_until=now + timedelta(seconds=settings.OUTBOX_LEASE))
+        return list(OutboxEmail.objects.filter(claim_token=token).order_by('pk'))
+
+    def drain(self):
+        """Send batches until nothing is due; returns the number of messages sent."""
+        sent_before = self.sent
+        try:
+            while rows := self.claim():
+                self.send_batch(rows)
+        finally:
+            self.close()
+        return self.sent - sent_before
+
+    def send_batch(self, rows):
+        sent = []
+        for index, row in enumerate(rows):
+            try:
+                self.send(row)
+            except (smtplib.SMTPException, OSError) as e:
+                if self.connection is None:
+                    # No usable connection to the server: back off the rest of the batch too
+                    for unsent in rows[index:]:
+                        self.record_failure(unsent, e)
+                    break
+                self.record_failure(row, e)
+            else:
+                sent.append(row.pk)
+        if sent:
+            OutboxEmail.objects.filter(pk__in=sent).update(
+                status=OutboxEmail.SENT, sent_at=timezone.now(), attempts=F('attempts') + 1,
+                locked_until=None, last_error='')
+            self.sent += len(sent)
+
+    def send(self, row):
+        message = EmailMessage(row.subject, row.body, row.from_email, row.recipients, headers={
+            'Message-ID': f'<outbox-{row.pk}-{row.dedupe_key[:12]}@{DNS_NAME}>',
+        })
+        for retry in (False, True):
+            try:
+                if self.connection is None:
+                    self.connection = get_connection(fail_silently=False)
+                    self.connection.open()
+                message.connection = self.connection
+                message.send()
+                return
+            except smtplib.SMTPServerDisconnected:
+                # The server dropped the idle connection; reconnect once
+                self.close()
+                if retry:
+                    raise
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                # The server answered; the connection is still usable
+                raise
+            except (smtplib.SMTPException, OSError):
+                self.close()
+                raise
+
+    def record_failure(self, row, error):
+        attempts = row.attempts + 1
+        permanent = is_permanent(error)
+        if permanent or attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            logger.error(f"[OUTBOX] Giving up on message {row.pk} after {attempts} attempt(s): {error}")
+            status, next_attempt_at = OutboxEmail.FAILED, row.next_attempt_at
+        else:
+            delay = retry_delay(attempts)
+            logger.warning(f"[OUTBOX] Message {row.pk} failed (attempt {attempts}), retrying in {delay:.0f}s: {error}")
+            status, next_attempt_at = OutboxEmail.PENDING, timezone.now() + timedelta(seconds=delay)
+        OutboxEmail.objects.filter(pk=row.pk).update(
+            status=status, attempts=attempts, next_attempt_at=next_attempt_at, locked_until=None,
+            last_error=str(error)[:1000])
+        self.failed += 1
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def run(self, stop, wake_event):
+        """Drain the queue, then sleep until woken or OUTBOX_POLL_INTERVAL passes (retries come due)."""
+        while not stop.is_set():
+            wake_event.clear()
+            close_old_connections()
+            try:
+                self.drain()
+            except Exception as e:
+                logger.error(f"[OUTBOX] Sender error: {e}", exc_info=True)
+            wake_event.wait(settings.OUTBOX_POLL_INTERVAL)
+
+
+_wake = threading.Event()
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def _run_thread():
+    try:
+        OutboxSender().run(threading.Event(), _wake)
+    finally:
+        db_connection.close()
+
+
+def start():
+    """Start this process's sender thread at worker boot, to send whatever is already due."""
+    wake()
+
+
+def wake():
+    """Tell this process's sender thread there is mail, starting the thread if it isn't running."""
+    global _thread
+    if not settings.OUTBOX_SENDER_THREAD:
+        return
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_run_thread, name='outbox-sender', daemon=True)
+            _thread.start()
+    _wake.set()
@@ -0,0 +1,303 @@
+"""
+Request performance instrumentation.
+
+PerfMiddleware (see middleware.py) opens a RequestRecord for each request and
+the hooks below add to it as the request runs:
+
+- database queries: an execute wrapper installed on every connection
+- template rendering: InstrumentedDjangoTemplates, the template backend
+- cache lookups: TieredCache (see cache_backends.py)
+- Cloudinary API calls: CloudinaryBackend (see media_storage.py)
+
+The record lives in a context variable, so it follows the request from an
+async view into sync_to_async threads. When the request ends it is folded
+into its route's RouteStats: a ring of PERF_WINDOWS histograms, each covering
+PERF_WINDOW_SECONDS, so percentiles describe the last few minutes and memory
+stays fixed. The histograms are log-linear (HDR-style): 16 buckets per power
+of two, so a percentile is within about 3% of the true value at any scale.
+
+Everything is per process; /perf shows the worker that answers.
+"""
+import contextvars
+import heapq
+import threading
+import time
+from array import array
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+# Histogram resolution: values below 2**SUB_BITS microseconds are exact, above that 2**(SUB_BITS-1) buckets
+# per power of two. Values are clamped to MAX_VALUE (about 71 minutes)
+SUB_BITS = 5
+SUB_COUNT = 1 << SUB_BITS
+HALF_COUNT = SUB_COUNT >> 1
+MAX_VALUE = (1 << 32) - 1
+BUCKETS = (32 - SUB_BITS + 1) * HALF_COUNT + HALF_COUNT
+
+# Metrics kept as histograms, in microseconds (queries: a count)
+METRICS = ('wall', 'db', 'template', 'queries')
+
+_current = contextvars.ContextVar('perf_request', default=None)
+_lock = threading.Lock()
+
+
+def _index(value):
+    if value < SUB_COUNT:
+        return value
+    shift = value.bit_length() - SUB_BITS
+    return shift * HALF_COUNT + (value >> shift)
+
+
+def _bucket_value(index):
+    """Midpoint of a bucket's range."""
+    if index < SUB_COUNT:
+        return index
+    shift = index // HALF_COUNT - 1
+    low = (index - shift * HALF_COUNT) << shift
+    return low + (1 << shift) // 2
+
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'max')
+
+    def __init__(self):
+        self.counts = array('I', bytes(4 * BUCKETS))
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        value = min(int(value), MAX_VALUE)
+        self.counts[_index(value)] += 1
+        self.total += 1
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p):
+        if not self.total:
+            return 0
+        rank = p / 100 * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(_bucket_value(index), self.max)
+        return self.max
+
+
+class RequestRecord:
+    __slots__ = ('queries', 'db_time', 'template_time', 'cache_hits', 'cache_misses', 'media_calls', 'media_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.media_calls = 0
+        self.media_time = 0.0
+
+
+class _Window:
+    __slots__ = ('id', 'histograms', 'requests', 'errors', 'cache_hits', 'cache_misses', 'media_calls',
+                 'media_time')
+
+    def __init__(self, window_id):
+        self.id = window_id
+        self.histograms = {metric: Histogram() for metric in METRICS}
+        self.requests = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.media_calls = 0
+        self.media_time = 0.0
+
+
+class RouteStats:
+    """The last PERF_WINDOWS windows of one route's requests."""
+
+    def __init__(self):
+        self.windows = [None] * settings.PERF_WINDOWS
+
+    def window(self, window_id):
+        slot = window_id % len(self.windows)
+        window = self.windows[slot]
+        if window is None or window.id != window_id:
+            window = self.windows[slot] = _Window(window_id)
+        return window
+
+    def summary(self, current_id):
+        merged = _Window(current_id)
+        for window in self.windows:
+            if window is not None and window.id > current_id - len(self.windows):
+                for metric in METRICS:
+                    merged.histograms[metric].merge(window.histograms[metric])
+                for name in ('requests', 'errors', 'cache_hits', 'cache_misses', 'media_calls', 'media_time'):
+                    setattr(merged, name, getattr(merged, name) + getattr(window, name))
+        return merged
+
+
+_routes = {}
+_recent = deque()
+
+
+def _window_id(now):
+    return int(now // settings.PERF_WINDOW_SECONDS)
+
+
+def start():
+    """Open a record for the current request; returns the token for finish()."""
+    return _current.set(RequestRecord())
+
+
+def finish(token, route, method, path, status, wall):
+    """Close the request's record and fold it into its route's stats."""
+    record = _current.get()
+    _current.reset(token)
+    now = time.time()
+    with _lock:
+        stats = _routes.get(route)
+        if stats is None:
+            stats = _routes[route] = RouteStats()
+        window = stats.window(_window_id(now))
+        histograms = window.histograms
+        histograms['wall'].record(wall * 1e6)
+        histograms['db'].record(record.db_time * 1e6)
+        histograms['template'].record(record.template_time * 1e6)
+        histograms['queries'].record(record.queries)
+        window.requests += 1
+        window.errors += status >= 500
+        window.cache_hits += record.cache_hits
+        window.cache_misses += record.cache_misses
+        window.media_calls += record.media_calls
+        window.media_time += record.media_time
+        _recent.append((now, wall, route, method, path, status, record))
+        if len(_recent) > settings.PERF_RECENT_REQUESTS:
+            _recent.popleft()
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper (connection.execute_wrappers)."""
+    record = _current.get()
+    if record is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record.db_time += time.perf_counter() - started
+        record.queries += 1
+
+
+def install_query_hook(sender, connection, **kwargs):
+    """connection_created handler: time every query on the new connection."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def record_cache(hits, misses):
+    record = _current.get()
+    if record is not None:
+        record.cache_hits += hits
+        record.cache_misses += misses
+
+
+@contextmanager
+def media_call():
+    """Time one Cloudinary API call."""
+    record = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if record is not None:
+            record.media_calls += 1
+            record.media_time += time.perf_counter() - started
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        record = _current.get()
+        if record is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            record.template_time += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates that times each top-level render (includes are part of their page)."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+def report(slowest=20):
+    """Per-route percentiles over the last PERF_WINDOWS windows, plus the slowest recent requests."""
+    now = time.time()
+    current_id = _window_id(now)
+    horizon = now - settings.PERF_WINDOWS * settings.PERF_WINDOW_SECONDS
+    with _lock:
+        summaries = {route: stats.summary(current_id) for route, stats in _routes.items()}
+        recent = [entry for entry in _recent if entry[0] >= horizon]
+
+    routes = []
+    for route, window in summaries.items():
+        if not window.requests:
+            continue
+        wall, db, template, queries = (window.histograms[metric] for metric in METRICS)
+        lookups = window.cache_hits + window.cache_misses
+        routes.append({
+            'route': route,
+            'requests': window.requests,
+            'errors': window.errors,
+            'p50_ms': wall.percentile(50) / 1000,
+            'p95_ms': wall.percentile(95) / 1000,
+            'p99_ms': wall.percentile(99) / 1000,
+            'max_ms': wall.max / 1000,
+            'db_p95_ms': db.percentile(95) / 1000,
+            'template_p95_ms': template.percentile(95) / 1000,
+            'queries_p95': queries.percentile(95),
+            'cache_hit_ratio': window.cache_hits / lookups if lookups else None,
+            'media_calls': window.media_calls,
+            'media_ms': window.media_time * 1000,
+        })
+    routes.sort(key=lambda route: route['p95_ms'], reverse=True)
+
+    slow = [{
+        'at': at,
+        'ms': wall * 1000,
+        'route': route,
+        'method': method,
+        'path': path,
+        'status': status,
+        'queries': record.queries,
+        'db_ms': record.db_time * 1000,
+        'template_ms': record.template_time * 1000,
+        'cache_hits': record.cache_hits,
+        'cache_misses': record.cache_misses,
+        'media_calls': record.media_calls,
+    } for at, wall, route, method, path, status, record in heapq.nlargest(slowest, recent, key=lambda e: e[1])]
+    return {'window_seconds': settings.PERF_WINDOWS * settings.PERF_WINDOW_SECONDS, 'routes': routes,
+            'slowest': slow}
+
+
+def reset():
+    """Forget everything recorded in this process."""
+    with _lock:
+        _routes.clear()
+        _recent.clear()
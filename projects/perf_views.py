@@ -0,0 +1,77 @@
+"""
+Staff pages for the request instrumentation in perf.py and the sampled
+profiles in profiling.py.
+"""
+import os
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import render
+
+from . import perf, profiling
+
+
+@staff_member_required
+def perf_dashboard(request):
+    """
+    Per-route p50/p95/p99 and the slowest recent requests for the worker
+    process that answers (`?format=json` for the raw report).
+    """
+    report = perf.report()
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'pid': os.getpid(), **report})
+    return render(request, 'admin/perf.html', {
+        **admin.site.each_context(request),
+        'title': 'Request performance',
+        'pid': os.getpid(),
+        'report': report,
+        'profiling': settings.PROFILE_ENABLED,
+    })
+
+
+@staff_member_required
+def profile_list(request):
+    """The saved profiles, newest first (`?format=json` for their metadata)."""
+    profiles = profiling.saved()
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'profiles': profiles})
+    for profile in profiles:
+        profile['when'] = datetime.fromtimestamp(profile['at'], timezone.utc)
+    return render(request, 'admin/profiles.html', {
+        **admin.site.each_context(request),
+        'title': 'Request profiles',
+        'profiles': profiles,
+        'enabled': settings.PROFILE_ENABLED,
+        'header': settings.PROFILE_HEADER,
+        'slow_ms': settings.PROFILE_SLOW_MS,
+        'keep': settings.PROFILE_KEEP,
+    })
+
+
+@staff_member_required
+def profile_detail(request, name):
+    """
+    One profile as a flame graph and a table of the hottest functions.
+    `?format=collapsed` downloads the stacks for flamegraph.pl or speedscope,
+    `?format=json` the whole profile.
+    """
+    profile = profiling.load(name)
+    if profile is None:
+        raise Http404('No such profile')
+    if request.GET.get('format') == 'json':
+        return JsonResponse(profile)
+    if request.GET.get('format') == 'collapsed':
+        response = HttpResponse(profiling.collapsed(profile), content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="profile-{name}.txt"'
+        return response
+    profile['when'] = datetime.fromtimestamp(profile['at'], timezone.utc)
+    return render(request, 'admin/profile.html', {
+        **admin.site.each_context(request),
+        'title': f"Profile of {profile['method']} {profile['path']}",
+        'profile': profile,
+        'flame': profiling.flame_graph(profile),
+        'hot': profiling.hot_functions(profile),
+    })
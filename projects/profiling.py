@@ -0,0 +1,269 @@
+"""
+Opt-in sampling profiler for slow requests.
+
+With PROFILE_ENABLED, ProfilingMiddleware (see middleware.py) profiles:
+
+- requests from staff that carry the PROFILE_HEADER header (e.g. `X-Profile: 1`)
+- any request, if it turns out to take PROFILE_SLOW_MS or longer
+
+A single sampler thread per process reads the stacks of each profiled
+request every PROFILE_INTERVAL_MS (sys._current_frames()), so a request pays
+for registering and unregistering rather than for tracing every call the way
+cProfile would. A sync request is sampled in its own thread and in threads
+started while it runs: async_to_sync's loop thread for an async view, and the
+upload pool of stage_uploads. A video save shows up as the admin view,
+stage_uploads or CompressedVideoField.pre_save, process_video_upload and the
+encoder below it. Async requests are sampled across all threads, since their
+work moves between the event loop and sync_to_async threads. Either way,
+threads started by concurrent requests can show up in each other's profiles.
+
+Kept profiles are JSON files under PROFILE_DIR, shared by the workers on a
+host; only the newest PROFILE_KEEP are kept. Stacks are stored collapsed
+("outer;inner;leaf" -> samples), the input format of flamegraph.pl and
+speedscope. Staff see them as flame graphs at /perf/profiles/.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import zlib
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'header'
+SLOW = 'slow'
+
+# Flame graph layout
+ROW_HEIGHT = 18
+MIN_SHARE = 0.002  # frames under 0.2% of the samples are left out of the graph
+
+
+class Collector:
+    """Stack samples for one request."""
+
+    def __init__(self, thread_id, existing):
+        self.thread_id = thread_id  # None: every thread
+        self.existing = existing  # threads already running when the request started, not sampled
+        self.counts = {}
+        self.samples = 0
+
+    def wants(self, thread_id):
+        return self.thread_id is None or thread_id == self.thread_id or thread_id not in self.existing
+
+    def add(self, stack):
+        self.counts[stack] = self.counts.get(stack, 0) + 1
+        self.samples += 1
+
+
+_condition = threading.Condition()
+_active = {}
+_sampler = None
+_labels = {}
+
+
+def _label(frame):
+    code = frame.f_code
+    label = _labels.get(code)
+    if label is None:
+        label = _labels[code] = f"{frame.f_globals.get('__name__', '?')}.{code.co_qualname}"
+    return label
+
+
+def _stack(frame):
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return ';'.join(labels)
+
+
+def _sample(collectors, own):
+    """One sampling pass: add the current stack of every wanted thread but `own` to each collector."""
+    frames = sys._current_frames()
+    for collector in collectors:
+        for thread_id, frame in frames.items():
+            if thread_id != own and collector.wants(thread_id):
+                collector.add(_stack(frame))
+
+
+def _sample_forever():
+    own = threading.get_ident()
+    while True:
+        with _condition:
+            while not _active:
+                _condition.wait()
+            _sample(_active.values(), own)
+        time.sleep(settings.PROFILE_INTERVAL_MS / 1000)
+
+
+def _ensure_sampler():
+    global _sampler
+    if _sampler is None or not _sampler.is_alive():
+        # Started lazily: a worker forked from a preloaded master has no sampler thread of its own
+        _sampler = threading.Thread(target=_sample_forever, name='profile-sampler', daemon=True)
+        _sampler.start()
+
+
+def trigger(request, user=None):
+    """Why this request should be profiled (HEADER or SLOW), or None. `user` defaults to request.user."""
+    if settings.PROFILE_HEADER and request.headers.get(settings.PROFILE_HEADER):
+        user = user if user is not None else getattr(request, 'user', None)
+        if user is not None and user.is_active and user.is_staff:
+            return HEADER
+    if settings.PROFILE_SLOW_MS:
+        return SLOW
+    return None
+
+
+def start(thread_id):
+    """
+    Start sampling a thread and the threads it starts (None: all threads);
+    returns the Collector to pass to stop().
+    """
+    collector = Collector(thread_id, set(sys._current_frames()) if thread_id is not None else None)
+    with _condition:
+        _ensure_sampler()
+        _active[id(collector)] = collector
+        _condition.notify()
+    return collector
+
+
+def stop(collector):
+    with _condition:
+        _active.pop(id(collector), None)
+
+
+def keep(trigger_reason, wall):
+    return trigger_reason == HEADER or wall * 1000 >= settings.PROFILE_SLOW_MS
+
+
+def save(collector, trigger_reason, route, method, path, status, wall):
+    """Write a stopped profile to PROFILE_DIR and drop the oldest past PROFILE_KEEP; returns its id."""
+    name = f'{time.time_ns()}-{os.getpid()}'
+    profile = {
+        'id': name,
+        'at': time.time(),
+        'pid': os.getpid(),
+        'trigger': trigger_reason,
+        'route': route,
+        'method': method,
+        'path': path,
+        'status': status,
+        'ms': wall * 1000,
+        'interval_ms': settings.PROFILE_INTERVAL_MS,
+        'scope': 'all threads' if collector.thread_id is None else 'request threads',
+        'samples': collector.samples,
+        'stacks': sorted(collector.counts.items(), key=lambda item: item[1], reverse=True),
+    }
+    directory = settings.PROFILE_DIR
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path_tmp = os.path.join(directory, f'.{name}.tmp')
+        with open(path_tmp, 'w') as f:
+            json.dump(profile, f)
+        os.replace(path_tmp, os.path.join(directory, f'{name}.json'))
+        for old in _names()[settings.PROFILE_KEEP:]:
+            try:
+                os.remove(os.path.join(directory, f'{old}.json'))
+            except FileNotFoundError:
+                pass  # Another worker pruned it first
+    except OSError as e:
+        logger.error(f"[PROFILE] Could not save profile of {method} {path}: {e}")
+        return None
+    logger.info(f"[PROFILE] Saved {name}: {method} {path} took {wall * 1000:.0f} ms ({collector.samples} samples)")
+    return name
+
+
+def _names():
+    """Saved profile ids, newest first."""
+    try:
+        files = os.listdir(settings.PROFILE_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted((f[:-5] for f in files if f.endswith('.json') and not f.startswith('.')), reverse=True)
+
+
+def load(name):
+    """A saved profile, or None."""
+    if name not in _names():
+        return None
+    try:
+        with open(os.path.join(settings.PROFILE_DIR, f'{name}.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def saved():
+    """Every saved profile without its stacks, newest first."""
+    profiles = []
+    for name in _names():
+        profile = load(name)
+        if profile is not None:
+            profile.pop('stacks')
+            profiles.append(profile)
+    return profiles
+
+
+def collapsed(profile):
+    """The profile in collapsed-stack text, one "outer;inner;leaf samples" line per stack."""
+    return ''.join(f'{stack} {count}\n' for stack, count in profile['stacks'])
+
+
+def hot_functions(profile, limit=25):
+    """Functions by samples on top of the stack (self) and anywhere in it (total)."""
+    own, total = {}, {}
+    for stack, count in profile['stacks']:
+        frames = stack.split(';')
+        own[frames[-1]] = own.get(frames[-1], 0) + count
+        for frame in set(frames):
+            total[frame] = total.get(frame, 0) + count
+    samples = profile['samples'] or 1
+    rows = [{'function': function, 'self': count, 'total': total[function],
+             'self_share': count / samples, 'total_share': total[function] / samples}
+            for function, count in own.items()]
+    rows.sort(key=lambda row: row['self'], reverse=True)
+    return rows[:limit]
+
+
+def flame_graph(profile, min_share=MIN_SHARE):
+    """
+    Positioned boxes for an icicle-style flame graph (callers above callees).
+
+    Returns:
+        Dict with 'boxes' (left/width in % of the samples, top in px) and 'height' in px
+    """
+    root = {'children': {}, 'count': 0}
+    for stack, count in profile['stacks']:
+        node = root
+        node['count'] += count
+        for frame in stack.split(';'):
+            node = node['children'].setdefault(frame, {'children': {}, 'count': 0})
+            node['count'] += count
+
+    samples = root['count'] or 1
+    boxes, depth_seen = [], 0
+    pending = [(root['children'], 0, 0.0)]
+    while pending:
+        children, depth, left = pending.pop()
+        for label, node in sorted(children.items()):
+            share = node['count'] / samples
+            if share >= min_share:
+                module = label.rsplit('.', 1)[0]
+                boxes.append({
+                    'label': label,
+                    'samples': node['count'],
+                    'left': left * 100,
+                    'width': share * 100,
+                    'top': depth * ROW_HEIGHT,
+                    'hue': zlib.crc32(module.encode()) % 50 + 5,
+                })
+                depth_seen = max(depth_seen, depth)
+                pending.append((node['children'], depth + 1, left))
+            left += share
+    return {'boxes': boxes, 'height': (depth_seen + 1) * ROW_HEIGHT}
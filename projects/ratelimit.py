@@ -0,0 +1,141 @@
+"""
+django-ratelimit's @ratelimit for both sync and async views, with a choice of
+counting algorithm.
+
+The library's decorator only wraps sync functions; on an async view it would
+return the coroutine unchecked. Here async views run the same check (which
+talks to the cache backend) in a worker thread, and only for the methods
+being limited, so a GET never leaves the event loop.
+
+Counters live in the RATELIMIT_USE_CACHE cache (a SQLiteCache file shared by
+every worker on the host, see projects/cache_backends.py). RATELIMIT_ALGORITHM
+picks how they are counted:
+
+- 'fixed' (the default): django-ratelimit's own fixed windows. One counter
+  per window; a client can spend a full limit at the end of one window and
+  another at the start of the next, so up to twice the rate in a burst
+- 'sliding': a sliding-window counter. The count for the current window is
+  added to the previous window's count, weighted by how much of the previous
+  window still overlaps the last `period` seconds. Two counters per key, so
+  still O(1) per check, and a burst across the boundary is held to the rate
+"""
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from django_ratelimit import ALL, UNSAFE, core
+from django_ratelimit.exceptions import Ratelimited
+
+__all__ = ['ratelimit', 'is_ratelimited']
+
+
+def _group(fn):
+    # Same group name django-ratelimit derives for a decorated view
+    return f'{fn.__module__}.{fn.__qualname__}'
+
+
+def _key_value(request, group, key):
+    if callable(key):
+        return key(group, request)
+    if key in core._SIMPLE_KEYS:
+        return core._SIMPLE_KEYS[key](request)
+    if ':' in key:
+        accessor, name = key.split(':', 1)
+        if accessor not in core._ACCESSOR_KEYS:
+            raise ImproperlyConfigured(f'Unknown ratelimit key: {key}')
+        return core._ACCESSOR_KEYS[accessor](request, name)
+    if '.' in key:
+        return import_string(key)(group, request)
+    raise ImproperlyConfigured(f'Could not understand ratelimit key: {key}')
+
+
+def _sliding_usage(request, group, key, rate, method, increment):
+    if callable(rate):
+        rate = rate(group, request)
+    elif isinstance(rate, str) and '.' in rate:
+        rate = import_string(rate)(group, request)
+    if rate is None:
+        return None
+    limit, period = core._split_rate(rate)
+    if not key:
+        raise ImproperlyConfigured('Ratelimit key must be specified')
+
+    now = time.time()
+    window, elapsed = divmod(now, period)
+    window = int(window)
+    base = core._make_cache_key(group, 'sliding', rate, _key_value(request, group, key), method)
+    cache = caches[getattr(settings, 'RATELIMIT_USE_CACHE', 'default')]
+
+    # Each counter lives through the next window too, where it is the previous one
+    current = None
+    if increment:
+        if cache.add(f'{base}:{window}', 1, 2 * period + core.EXPIRATION_FUDGE):
+            current = 1
+        else:
+            try:
+                current = cache.incr(f'{base}:{window}')
+            except ValueError:
+                pass
+    else:
+        current = cache.get(f'{base}:{window}', 0)
+    if current is None:
+        return None, limit
+    previous = cache.get(f'{base}:{window - 1}', 0)
+    return current + previous * (1 - elapsed / period), limit
+
+
+def is_ratelimited(request, group=None, fn=None, key=None, rate=None, method=ALL, increment=False):
+    """django_ratelimit.core.is_ratelimited, counted with RATELIMIT_ALGORITHM."""
+    if getattr(settings, 'RATELIMIT_ALGORITHM', 'fixed') != 'sliding':
+        return core.is_ratelimited(request=request, group=group, fn=fn, key=key, rate=rate, method=method,
+                                   increment=increment)
+    if not getattr(settings, 'RATELIMIT_ENABLE', True) or not core._method_match(request, method):
+        return False
+    if group is None:
+        if fn is None:
+            raise ImproperlyConfigured('is_ratelimited must be called with either `group` or `fn` arguments')
+        group = _group(fn)
+    usage = _sliding_usage(request, group, key, rate, method, increment)
+    if usage is None:
+        return False
+    estimate, limit = usage
+    if estimate is None:
+        # The cache could not count this request; fail closed as django-ratelimit does
+        return not getattr(settings, 'RATELIMIT_FAIL_OPEN', False)
+    return estimate > limit
+
+
+def _limited(request, ratelimited, block):
+    request.limited = ratelimited or getattr(request, 'limited', False)
+    if ratelimited and block:
+        cls = getattr(settings, 'RATELIMIT_EXCEPTION_CLASS', Ratelimited)
+        raise (import_string(cls) if isinstance(cls, str) else cls)()
+
+
+def ratelimit(group=None, key=None, rate=None, method=ALL, block=True):
+    def decorator(fn):
+        if not iscoroutinefunction(fn):
+            @wraps(fn)
+            def _wrapped(request, *args, **kw):
+                _limited(request, is_ratelimited(request=request, group=group, fn=fn, key=key, rate=rate,
+                                                 method=method, increment=True), block)
+                return fn(request, *args, **kw)
+            return _wrapped
+
+        @wraps(fn)
+        async def _wrapped(request, *args, **kw):
+            if core._method_match(request, method):
+                ratelimited = await sync_to_async(is_ratelimited)(
+                    request=request, group=group, fn=fn, key=key, rate=rate, method=method, increment=True)
+                _limited(request, ratelimited, block)
+            return await fn(request, *args, **kw)
+        return _wrapped
+    return decorator
+
+
+ratelimit.ALL = ALL
+ratelimit.UNSAFE = UNSAFE
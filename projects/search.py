@@ -0,0 +1,213 @@
+"""
+Full-text search over projects.
+
+Uses an FTS5 virtual table on SQLite and a tsvector column with a GIN index
+on PostgreSQL (both created by migration 0041). Each project gets one search
+document built from its name, markdown-stripped description, content cards
+and photo captions. Documents are kept up to date by the signal handlers in
+signals.py; `python manage.py rebuild_search_index` rebuilds everything.
+"""
+import html
+import logging
+import re
+import time
+
+import markdown
+from django.db import connection
+from django.utils.html import escape, strip_tags
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = 'projects_search'
+
+# Sentinels wrapped around matched terms by the database, swapped for <mark>
+# after the snippet has been HTML-escaped.
+_HIGHLIGHT_START = '\x02'
+_HIGHLIGHT_END = '\x03'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_supported():
+    """Return True if the current database has a native search index."""
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def strip_markdown(text):
+    """Render markdown to HTML and return only the visible text."""
+    if not text:
+        return ''
+    rendered = markdown.markdown(text, extensions=['tables'])
+    plain = html.unescape(strip_tags(rendered))
+    return re.sub(r'\s+', ' ', plain).strip()
+
+
+def build_document(project):
+    """
+    Build the (name, body) pair indexed for a project.
+
+    Args:
+        project: Projects instance
+
+    Returns:
+        Tuple of (name, body) strings
+    """
+    parts = [strip_markdown(project.description)]
+    for card in project.cards.all():
+        parts.extend([card.title, card.teaser, strip_markdown(card.body)])
+    parts.extend(caption for caption in project.photos.values_list('caption', flat=True) if caption)
+    return project.name, ' '.join(part for part in parts if part)
+
+
+def index_project(project_id):
+    """Insert or refresh the search document for one project."""
+    from .models import Projects
+
+    if not is_supported():
+        return
+
+    try:
+        project = Projects.objects.get(pk=project_id)
+    except Projects.DoesNotExist:
+        remove_project(project_id)
+        return
+
+    name, body = build_document(project)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [project_id])
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, name, body) VALUES (%s, %s, %s)',
+                [project_id, name, body]
+            )
+        else:
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (project_id, name, body) VALUES (%s, %s, %s) '
+                'ON CONFLICT (project_id) DO UPDATE SET name = EXCLUDED.name, body = EXCLUDED.body',
+                [project_id, name, body]
+            )
+
+
+def remove_project(project_id):
+    """Drop a project's search document."""
+    if not is_supported():
+        return
+
+    column = 'rowid' if connection.vendor == 'sqlite' else 'project_id'
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE {column} = %s', [project_id])
+
+
+def rebuild_index():
+    """
+    Rebuild the whole search index.
+
+    Returns:
+        Number of projects indexed
+    """
+    from .models import Projects
+
+    if not is_supported():
+        return 0
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+    count = 0
+    for project_id in Projects.objects.values_list('pk', flat=True):
+        index_project(project_id)
+        count += 1
+    return count
+
+
+def _fts5_query(query):
+    """Turn free text into a safe FTS5 MATCH expression (prefix match per term)."""
+    tokens = _TOKEN_RE.findall(query)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _highlight(snippet):
+    """Escape a raw snippet and turn the highlight sentinels into <mark> tags."""
+    return (
+        escape(snippet or '')
+        .replace(_HIGHLIGHT_START, '<mark>')
+        .replace(_HIGHLIGHT_END, '</mark>')
+    )
+
+
+def _search_sqlite(query, limit):
+    match = _fts5_query(query)
+    if not match:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, snippet({SEARCH_TABLE}, 1, %s, %s, '…', 16), "
+            f"bm25({SEARCH_TABLE}, 10.0, 1.0) AS rank "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s ORDER BY rank LIMIT %s",
+            [_HIGHLIGHT_START, _HIGHLIGHT_END, match, limit]
+        )
+        # bm25() is lower-is-better; flip it so callers always sort descending
+        return [(row[0], row[1], -row[2]) for row in cursor.fetchall()]
+
+
+def _search_postgresql(query, limit):
+    options = f'StartSel={_HIGHLIGHT_START}, StopSel={_HIGHLIGHT_END}, MaxFragments=2, MaxWords=24, MinWords=8'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT project_id, ts_headline('english', body, q, %s), ts_rank(document, q) AS rank "
+            f"FROM {SEARCH_TABLE}, websearch_to_tsquery('english', %s) q "
+            "WHERE document @@ q ORDER BY rank DESC LIMIT %s",
+            [options, query, limit]
+        )
+        return cursor.fetchall()
+
+
+def _search_fallback(query, limit):
+    from django.db.models import Q
+    from .models import Projects
+
+    projects = Projects.objects.filter(
+        Q(name__icontains=query) | Q(description__icontains=query)
+    ).values_list('pk', 'description')[:limit]
+    return [(pk, strip_markdown(description)[:160], 0.0) for pk, description in projects]
+
+
+def search(query, limit=20):
+    """
+    Search projects and return ranked results.
+
+    Args:
+        query: Free text entered by the user
+        limit: Maximum number of results
+
+    Returns:
+        List of dicts with 'id', 'name', 'snippet' (HTML with <mark> tags)
+        and 'rank' (higher is better), best match first
+    """
+    from .models import Projects
+
+    query = (query or '').strip()
+    if not query:
+        return []
+
+    started = time.perf_counter()
+    if connection.vendor == 'sqlite':
+        rows = _search_sqlite(query, limit)
+    elif connection.vendor == 'postgresql':
+        rows = _search_postgresql(query, limit)
+    else:
+        rows = _search_fallback(query, limit)
+
+    names = dict(Projects.objects.filter(pk__in=[row[0] for row in rows]).values_list('pk', 'name'))
+    results = [
+        {'id': pk, 'name': names[pk], 'snippet': _highlight(snippet), 'rank': rank}
+        for pk, snippet, rank in rows
+        if pk in names
+    ]
+    logger.debug(f"Search for {query!r} returned {len(results)} results in {(time.perf_counter() - started) * 1000:.1f}ms")
+    return results
+
+
+def search_ids(query, limit=500):
+    """Return matching project ids, best match first."""
+    return [result['id'] for result in search(query, limit=limit)]
@@ -1,28 +1,134 @@
+"""
+Project serializers for the JSON API.
+
+ProjectsSerializer is the DRF serializer, used for writes and as the
+reference output. Reads go through project_rows(), which builds the same
+dicts straight from `.values()` rows: media columns are read as their stored
+strings and resolved through media_urls.stored_url(), relative URLs are made
+absolute with a prefix computed once per request, and photos come from one
+extra query grouped by project. render_json() encodes with orjson when it is
+installed.
+"""
+import json
+
+from django.db.models import TextField
+from django.db.models.functions import Cast
+from django.utils import timezone
 from rest_framework import serializers
+
+from .media_urls import resource_url, stored_url
 from .models import Projects, ProjectPhoto
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PHOTO_FIELDS = ['id', 'image', 'caption', 'order']
+PROJECT_FIELDS = ['id', 'name', 'year', 'category', 'technologies', 'description', 'display_mode', 'featured',
+                  'created_at', 'updated_at', 'thumbnail_image', 'thumbnail_url', 'photos']
+
+
 class ProjectPhotoSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProjectPhoto
-        fields = ['id', 'image', 'caption', 'order']
+        fields = PHOTO_FIELDS
+
 
 class ProjectsSerializer(serializers.ModelSerializer):
-    image_url = serializers.SerializerMethodField()
     thumbnail_url = serializers.SerializerMethodField()
     photos = ProjectPhotoSerializer(many=True, read_only=True)
-    
+
     class Meta:
         model = Projects
-        fields = ['id', 'name', 'year', 'category', 'tags', 'description', 
-                 'created_at', 'updated_at', 'image', 'thumbnail',
-                 'image_url', 'thumbnail_url', 'photos']
-    
-    def get_image_url(self, obj):
-        if obj.image:
-            return self.context['request'].build_absolute_uri(obj.image.url)
-        return None
-        
+        fields = PROJECT_FIELDS
+
     def get_thumbnail_url(self, obj):
-        if obj.thumbnail:
-            return self.context['request'].build_absolute_uri(obj.thumbnail.url)
-        return None
\ No newline at end of file
+        url = resource_url(obj.thumbnail_image)
+        if url:
+            return self.context['request'].build_absolute_uri(url)
+        return None
+
+
+def _raw(field):
+    """The column as stored, skipping the field's from_db_value() (CloudinaryResource, MSFList)."""
+    return Cast(field, TextField())
+
+
+def _choices(value):
+    """A MultiSelectField column as the list DRF returns for it."""
+    if not value:
+        return value if value is None else []
+    return [choice.strip() for choice in value.replace('，', ',').split(',')]
+
+
+def _datetime(value, tz):
+    """DRF's ISO 8601 DateTimeField output."""
+    if value is None:
+        return None
+    value = value.astimezone(tz).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def _absolute(url, prefix):
+    """request.build_absolute_uri(url) for the URLs resource_url() returns, with the prefix computed once."""
+    if url and url.startswith('/') and not url.startswith('//'):
+        return prefix + url
+    return url
+
+
+def project_rows(queryset, request):
+    """
+    ProjectsSerializer(queryset, many=True).data as plain dicts, without model instances or DRF fields.
+
+    Args:
+        queryset: Projects queryset (filtered and ordered as the response should be)
+        request: The request, for absolute thumbnail URLs
+
+    Returns:
+        List of dicts with PROJECT_FIELDS keys, photos included
+    """
+    tz = timezone.get_current_timezone()
+    prefix = request.build_absolute_uri('/')[:-1]
+    thumbnail_default = Projects._meta.get_field('thumbnail_image').get_default()
+    image_default = ProjectPhoto._meta.get_field('image').get_default()
+
+    rows = list(queryset.values(
+        'id', 'name', 'year', 'category', 'description', 'display_mode', 'featured', 'created_at', 'updated_at',
+        raw_technologies=_raw('technologies'), raw_thumbnail=_raw('thumbnail_image'),
+    ))
+    photos = {row['id']: [] for row in rows}
+    if photos:
+        for project_id, photo_id, image, caption, order in ProjectPhoto.objects.filter(
+                project__in=list(photos)).values_list('project', 'id', _raw('image'), 'caption', 'order'):
+            photos[project_id].append({'id': photo_id, 'image': image or image_default,
+                                       'caption': caption, 'order': order})
+
+    projects = []
+    for row in rows:
+        thumbnail = row['raw_thumbnail']
+        projects.append({
+            'id': row['id'],
+            'name': row['name'],
+            'year': row['year'],
+            'category': row['category'],
+            'technologies': _choices(row['raw_technologies']),
+            'description': row['description'],
+            'display_mode': row['display_mode'],
+            'featured': row['featured'],
+            'created_at': _datetime(row['created_at'], tz),
+            'updated_at': _datetime(row['updated_at'], tz),
+            'thumbnail_image': thumbnail or thumbnail_default,
+            'thumbnail_url': _absolute(stored_url(thumbnail), prefix),
+            'photos': photos[row['id']],
+        })
+    return projects
+
+
+def render_json(data):
+    """Compact UTF-8 JSON bytes; orjson when installed, else the json module."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
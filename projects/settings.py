@@ -11,14 +11,11 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 import dj_database_url
 from dotenv import load_dotenv
 import cloudinary
-import cloudinary.uploader
-import cloudinary.api
-import sentry_sdk
-from sentry_sdk.integrations.django import DjangoIntegration
 
 # Load environment variables
 load_dotenv()
@@ -54,13 +51,14 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    # Before staticfiles so its collectstatic (which runs build_assets first) takes precedence
+    'projects',
     'django.contrib.staticfiles',
     'corsheaders',
     'ckeditor',
     'ckeditor_uploader',
     'cloudinary',
     'cloudinary_storage',
-    'projects',
     'markdownify',
     'django_otp',
     'django_otp.plugins.otp_totp',
@@ -69,13 +67,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'projects.middleware.AsyncWhiteNoiseMiddleware',
+    'projects.middleware.PerfMiddleware',
+    'projects.middleware.UploadSlotsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django_otp.middleware.OTPMiddleware',
+    'projects.middleware.AsyncOTPMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'projects.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -91,7 +92,9 @@ handler403 = 'projects.error_views.custom_403'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that times renders for the /perf page
+        'BACKEND': 'projects.perf.InstrumentedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -107,24 +110,51 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'projects.wsgi.application'
 
+# `manage.py test` gives tests scratch caches as well as a test database (see projects/test_runner.py)
+TEST_RUNNER = 'projects.test_runner.ScratchCacheRunner'
+ASGI_APPLICATION = 'projects.asgi.application'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Under ASGI each request's sync code runs in a thread of its own, so a
+# persistent connection would outlive its thread unclosed: close at request end
 DATABASES = {
     'default': dj_database_url.config(
         default=os.getenv('DATABASE_URL', 'sqlite:///db.sqlite3'),
-        conn_max_age=600
+        conn_max_age=int(os.getenv('CONN_MAX_AGE', '0'))
     )
 }
 
-# SQLite timeout configuration to prevent database locks
+# SQLite production profile (see docs/DATABASE_LOCK_PREVENTION.md)
+# - WAL lets readers run while a write is in progress
+# - BEGIN IMMEDIATE takes the write lock up front, so transactions wait on the
+#   busy timeout instead of failing with "database is locked" on lock upgrade
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 20000))
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),  # Safe with WAL; fsync only at checkpoints
+    'busy_timeout': SQLITE_BUSY_TIMEOUT_MS,
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),  # 256MB
+    'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -64000)),  # Negative = KiB, so 64MB
+    'temp_store': 'MEMORY',
+    'foreign_keys': 'ON',
+}
+
 if 'sqlite' in DATABASES['default']['ENGINE']:
     DATABASES['default']['OPTIONS'] = {
-        'timeout': 20,  # Wait up to 20 seconds for database lock
+        'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,  # Wait for the database lock
         'check_same_thread': False,  # Allow multi-threaded access
+        'init_command': '; '.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+        'transaction_mode': 'IMMEDIATE',
     }
 
+# Long admin saves (those that include uploads) are serialized through a
+# single-writer queue on SQLite; see projects/write_queue.py
+WRITE_QUEUE_LOCK_FILE = os.getenv('WRITE_QUEUE_LOCK_FILE', os.path.join(BASE_DIR, '.db-write.lock'))
+WRITE_QUEUE_TIMEOUT = int(os.getenv('WRITE_QUEUE_TIMEOUT', 600))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -166,6 +196,10 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
 
+# Link the build_assets bundles in static/dist/ (see projects/assets.py) instead of
+# the individual source files. Defaults to on in production, off while developing.
+ASSET_BUNDLES = os.getenv('ASSET_BUNDLES', str(not DEBUG)) == 'True'
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
@@ -222,14 +256,6 @@ CKEDITOR_CONFIGS = {
     }
 }
 
-# Imgur Settings
-IMGUR_CLIENT_ID = os.getenv('IMGUR_CLIENT_ID')
-IMGUR_CLIENT_SECRET = os.getenv('IMGUR_CLIENT_SECRET')
-
-# Use Imgur for media files in production
-if not DEBUG:
-    DEFAULT_FILE_STORAGE = 'projects.imgur_storage.ImgurStorage'
-
 # Cloudinary Settings
 cloudinary.config(
     cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
@@ -244,21 +270,132 @@ CLOUDINARY_STORAGE = {
     'API_SECRET': os.getenv('CLOUDINARY_API_SECRET'),
 }
 
+# Media backend used by MediaField/CompressedVideoField (see projects/media_storage.py)
+# 'cloudinary' uploads to Cloudinary; 'local' is an offline stand-in that stores
+# uploads under LOCAL_MEDIA_ROOT and serves Cloudinary-style URLs from /media/local_cdn/
+MEDIA_BACKEND = os.getenv('MEDIA_BACKEND', 'cloudinary')
+LOCAL_MEDIA_ROOT = os.path.join(MEDIA_ROOT, 'local_cdn')
+LOCAL_MEDIA_HOST = os.getenv('LOCAL_MEDIA_HOST', '127.0.0.1:8000')
+# Largest width or height the local backend derives; larger w_/h_ requests are clamped
+MEDIA_LOCAL_MAX_DIMENSION = int(os.getenv('MEDIA_LOCAL_MAX_DIMENSION', 4000))
+
+# Upload API endpoint override (e.g. a local stand-in server for benchmarks) and pool size
+MEDIA_UPLOAD_PREFIX = os.getenv('MEDIA_UPLOAD_PREFIX') or None
+MEDIA_UPLOAD_MAX_CONNECTIONS = int(os.getenv('MEDIA_UPLOAD_MAX_CONNECTIONS', 8))
+
+if MEDIA_BACKEND == 'local':
+    cloudinary.config(
+        cloud_name='local',
+        private_cdn=True,
+        cname=f"{LOCAL_MEDIA_HOST}/media/local_cdn",
+        secure=False
+    )
+
 # Email settings
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
 EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
-EMAIL_USE_TLS = True
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True') == 'True'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')  # Your Gmail address
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')  # Your Gmail app password
 
+# Caches: each alias is a small in-process L1 in front of a SQLite file under CACHE_DIR that every
+# worker on the host shares (see projects/cache_backends.py and projects/caching.py)
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'am_portfolio_cache'))
+CACHE_L1_MAX_ENTRIES = int(os.getenv('CACHE_L1_MAX_ENTRIES', 300))  # per alias and process; 0 turns L1 off
+CACHE_L1_TIMEOUT = int(os.getenv('CACHE_L1_TIMEOUT', 5))  # seconds a process may serve a changed entry
+CACHE_L2_MAX_ENTRIES = int(os.getenv('CACHE_L2_MAX_ENTRIES', 5000))
+# Version stamp of the homepage's featured-project payloads (see projects/featured_cache.py)
+FEATURED_VERSION_FILE = os.getenv('FEATURED_VERSION_FILE', os.path.join(CACHE_DIR, 'featured_version'))
+
+
+def _tiered_cache(name, timeout):
+    return {
+        'BACKEND': 'projects.cache_backends.TieredCache',
+        'LOCATION': name,
+        'TIMEOUT': timeout,
+        'OPTIONS': {
+            'L1_MAX_ENTRIES': CACHE_L1_MAX_ENTRIES,
+            'L1_TIMEOUT': CACHE_L1_TIMEOUT,
+            'L2': {
+                'BACKEND': 'projects.cache_backends.SQLiteCache',
+                'LOCATION': os.path.join(CACHE_DIR, f'{name}.sqlite3'),
+                'OPTIONS': {'MAX_ENTRIES': CACHE_L2_MAX_ENTRIES},
+            },
+        },
+    }
+
+
+CACHES = {
+    'default': _tiered_cache('default', 300),
+    # Public pages and JSON API responses by URL; cleared when project content changes. 0 turns them off
+    'pages': _tiered_cache('pages', int(os.getenv('CACHE_PAGES_TIMEOUT', 600))),
+    'urls': _tiered_cache('urls', int(os.getenv('CACHE_URLS_TIMEOUT', 600))),
+    # Template fragments. Their keys name what they render (e.g. a project's updated_at), so
+    # templates store them without expiry and CACHE_L2_MAX_ENTRIES bounds them
+    'fragments': _tiered_cache('fragments', int(os.getenv('CACHE_FRAGMENTS_TIMEOUT', 86400))),
+    # Rate-limit counters: shared tier only, so every worker counts against the same number
+    'ratelimit': {
+        'BACKEND': 'projects.cache_backends.SQLiteCache',
+        'LOCATION': os.getenv('RATELIMIT_CACHE_PATH', os.path.join(CACHE_DIR, 'ratelimit.sqlite3')),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+# django-ratelimit (contact form, uploads, API writes); benchmarks turn it off
+RATELIMIT_ENABLE = os.getenv('RATELIMIT_ENABLE', 'True') == 'True'
+RATELIMIT_USE_CACHE = 'ratelimit'
+# 'fixed' (django-ratelimit's windows) or 'sliding' (see projects/ratelimit.py)
+RATELIMIT_ALGORITHM = os.getenv('RATELIMIT_ALGORITHM', 'fixed')
+
+# Request instrumentation for the staff /perf page (see projects/perf.py): per-route histograms over
+# PERF_WINDOWS windows of PERF_WINDOW_SECONDS, plus the last PERF_RECENT_REQUESTS requests
+PERF_ENABLED = os.getenv('PERF_ENABLED', 'True') == 'True'
+PERF_WINDOWS = 10
+PERF_WINDOW_SECONDS = 60
+PERF_RECENT_REQUESTS = 1000
+
+# Sampling profiler (see projects/profiling.py), off unless PROFILE_ENABLED: profiles staff requests sent
+# with PROFILE_HEADER, and any request taking PROFILE_SLOW_MS or longer (0: header only). The newest
+# PROFILE_KEEP profiles are kept in PROFILE_DIR for /perf/profiles/
+PROFILE_ENABLED = os.getenv('PROFILE_ENABLED', 'False') == 'True'
+PROFILE_HEADER = 'X-Profile'
+PROFILE_SLOW_MS = int(os.getenv('PROFILE_SLOW_MS', '5000'))
+PROFILE_INTERVAL_MS = int(os.getenv('PROFILE_INTERVAL_MS', '10'))
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '20'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(CACHE_DIR, 'profiles'))
+
+# Outbound email queue (see projects/outbox.py). With the sender thread off, run `manage.py send_outbox`
+OUTBOX_SENDER_THREAD = os.getenv('OUTBOX_SENDER_THREAD', 'True') == 'True'
+OUTBOX_BATCH_SIZE = 50  # messages claimed and sent per connection round
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETRY_BASE = 30  # seconds before the first retry, doubling per attempt
+OUTBOX_RETRY_MAX = 3600
+OUTBOX_LEASE = 300  # seconds a sender holds claimed rows
+OUTBOX_POLL_INTERVAL = 30  # seconds between checks for retries that have come due
+OUTBOX_DEDUPE_WINDOW = 3600  # identical messages within this many seconds are stored once
+
 # File upload settings to handle large media uploads
 DATA_UPLOAD_MAX_MEMORY_SIZE = 104857600  # 100MB (from default 2.5MB)
 FILE_UPLOAD_MAX_MEMORY_SIZE = 104857600  # 100MB
 DATA_UPLOAD_MAX_NUMBER_FILES = 100  # Allow up to 100 files per request
+# Concurrent upload requests per worker process; gunicorn.conf.py sets it to half the threads
+UPLOAD_REQUEST_SLOTS = int(os.getenv('UPLOAD_REQUEST_SLOTS', '2'))
+# Seconds an upload waits for a slot before getting a 503
+UPLOAD_SLOT_WAIT = float(os.getenv('UPLOAD_SLOT_WAIT', '10'))
 
-# Use Cloudinary for media files
-DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+# File storage (Django 5.1+ reads STORAGES; DEFAULT_FILE_STORAGE/STATICFILES_STORAGE are ignored)
+STORAGES = {
+    'default': {
+        'BACKEND': (
+            'django.core.files.storage.FileSystemStorage' if MEDIA_BACKEND == 'local'
+            else 'cloudinary_storage.storage.MediaCloudinaryStorage'
+        ),
+    },
+    'staticfiles': {
+        'BACKEND': STATICFILES_STORAGE,
+    },
+}
 MEDIA_URL = '/media/'
 
 # Markdownify - allow images and standard formatting tags
@@ -315,10 +452,15 @@ LOGGING = {
 # Sentry configuration
 SENTRY_DSN = os.environ.get('SENTRY_DSN')
 if SENTRY_DSN:
+    # Imported only when enabled: the SDK and its HTTP transport add ~100ms to every process start
+    import sentry_sdk
+    from sentry_sdk.integrations.django import DjangoIntegration
+
     sentry_sdk.init(
         dsn=SENTRY_DSN,
         integrations=[DjangoIntegration()],
-        traces_sample_rate=0.5,  # Adjust for performance monitoring
+        # Tracing costs time on every sampled request; /perf covers local timings
+        traces_sample_rate=float(os.environ.get('SENTRY_TRACES_SAMPLE_RATE', '0.05')),
         send_default_pii=True,
         environment=os.environ.get('DJANGO_ENV', 'production'),
     )
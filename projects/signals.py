@@ -0,0 +1,74 @@
+"""
+Model signal handlers for the projects app.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import search
+from .caching import invalidate_content
+from .featured_cache import bump_version as bump_featured_version
+from .models import Category, Projects, ProjectCard, ProjectEmbed, ProjectPhoto, ProjectVideo, VideoProcessingRun
+
+
+def _reindex_on_commit(project_id):
+    """Refresh a project's search document once the current transaction commits."""
+    transaction.on_commit(lambda: search.index_project(project_id))
+
+
+@receiver(post_save, sender=Projects)
+def index_saved_project(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _reindex_on_commit(instance.pk)
+
+
+@receiver(post_delete, sender=Projects)
+def unindex_deleted_project(sender, instance, **kwargs):
+    project_id = instance.pk
+    transaction.on_commit(lambda: search.remove_project(project_id))
+
+
+@receiver(post_save, sender=Projects)
+@receiver(post_delete, sender=Projects)
+def invalidate_featured_projects(sender, **kwargs):
+    transaction.on_commit(bump_featured_version)
+
+
+@receiver(post_save, sender=ProjectCard)
+@receiver(post_save, sender=ProjectPhoto)
+def index_saved_child(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _reindex_on_commit(instance.project_id)
+
+
+@receiver(post_delete, sender=ProjectCard)
+@receiver(post_delete, sender=ProjectPhoto)
+def index_deleted_child(sender, instance, **kwargs):
+    _reindex_on_commit(instance.project_id)
+
+
+@receiver(post_save, sender=Projects)
+@receiver(post_delete, sender=Projects)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=ProjectPhoto)
+@receiver(post_delete, sender=ProjectPhoto)
+@receiver(post_save, sender=ProjectVideo)
+@receiver(post_delete, sender=ProjectVideo)
+@receiver(post_save, sender=ProjectCard)
+@receiver(post_delete, sender=ProjectCard)
+@receiver(post_save, sender=ProjectEmbed)
+@receiver(post_delete, sender=ProjectEmbed)
+def invalidate_cached_pages(sender, **kwargs):
+    transaction.on_commit(invalidate_content)
+
+
+@receiver(post_save, sender=ProjectVideo)
+def link_processing_run(sender, instance, raw=False, **kwargs):
+    """Attach the compression run recorded for a new upload to the saved video."""
+    run = instance.__dict__.pop('_processing_run', None)
+    if raw or run is None or run.pk is None:
+        return
+    VideoProcessingRun.objects.filter(pk=run.pk, video__isnull=True).update(video=instance)
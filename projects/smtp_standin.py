@@ -0,0 +1,122 @@
+"""
+A minimal local SMTP server for benchmarks and delivery checks.
+
+Speaks just enough SMTP (EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT) for
+Django's SMTP backend without TLS or auth. It can add a delay per connection
+and per message to stand in for a slow remote server (Gmail's TLS handshake
+and round trips), and reject the next few messages with a temporary error.
+Point the app at it with EMAIL_HOST=127.0.0.1, EMAIL_PORT=<port>,
+EMAIL_USE_TLS=False.
+
+    with LocalSMTPServer(delay=0.5) as server:
+        ...  # send mail to 127.0.0.1:server.port
+        server.messages  # [(sender, recipients, raw message bytes), ...]
+"""
+import asyncio
+import threading
+
+
+class LocalSMTPServer:
+    def __init__(self, host='127.0.0.1', port=0, delay=0.0, connect_delay=0.0):
+        """
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free one; see .port once started)
+            delay: Seconds to wait before acknowledging each message
+            connect_delay: Seconds to wait before greeting each new connection
+        """
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.connect_delay = connect_delay
+        # Messages still to be rejected with a 451 (set it to simulate an outage)
+        self.fail_next = 0
+        self.messages = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+            self.port = server.sockets[0].getsockname()[1]
+            started.set()
+            self._loop.run_forever()
+            server.close()
+            self._loop.run_until_complete(server.wait_closed())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name='smtp-standin', daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def stop(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+    async def _handle(self, reader, writer):
+        with self._lock:
+            self.connections += 1
+
+        def reply(line):
+            writer.write(f'{line}\r\n'.encode())
+
+        if self.connect_delay:
+            await asyncio.sleep(self.connect_delay)
+        reply('220 localhost SMTP stand-in')
+        sender, recipients = None, []
+        try:
+            while line := await reader.readline():
+                command = line.decode(errors='replace').strip()
+                verb = command[:4].upper()
+                if verb == 'EHLO':
+                    reply('250-localhost')
+                    reply('250 8BITMIME')
+                elif verb == 'HELO':
+                    reply('250 localhost')
+                elif verb == 'MAIL':
+                    sender, recipients = command.split(':', 1)[1].strip(), []
+                    reply('250 OK')
+                elif verb == 'RCPT':
+                    recipients.append(command.split(':', 1)[1].strip())
+                    reply('250 OK')
+                elif verb == 'DATA':
+                    reply('354 End data with <CR><LF>.<CR><LF>')
+                    await writer.drain()
+                    lines = []
+                    while (data := await reader.readline()) not in (b'.\r\n', b'.\n', b''):
+                        lines.append(data[1:] if data.startswith(b'..') else data)
+                    if self.delay:
+                        await asyncio.sleep(self.delay)
+                    with self._lock:
+                        rejected = self.fail_next > 0
+                        if rejected:
+                            self.fail_next -= 1
+                        else:
+                            self.messages.append((sender, recipients, b''.join(lines)))
+                    reply('451 Temporary failure, try again later' if rejected else '250 OK: queued')
+                elif verb in ('RSET', 'NOOP'):
+                    reply('250 OK')
+                elif verb == 'QUIT':
+                    reply('221 Bye')
+                    await writer.drain()
+                    break
+                else:
+                    reply('502 Command not implemented')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,87 @@
+"""
+Tech-stack icon sprite.
+
+project_detail.html shows one icon per technology, which used to be one
+image request each. build_assets packs every icon in
+static/assets/tech-stack-used/ that has a TECH_STACK_CHOICES entry into one
+sprite (AVIF and WebP, with a PNG fallback), each fitted into a CELL_SIZE square, and
+generates the CSS map that is appended to the site stylesheet:
+
+    .tech-sprite { background: <sprite> 0 0 / <columns>00% <rows>00% }
+    .tech-sprite[data-tech=python] { background-position: 0% 0% }
+
+Positions and sizes are percentages, so the icons scale with whatever size
+the stylesheet gives .tech-icon. {% tech_icon %} renders the sprite element,
+or the icon's own image when the sprite has not been built.
+"""
+import io
+from pathlib import Path
+
+from .models import TECH_DISPLAY
+
+ICON_DIR = 'assets/tech-stack-used'
+SPRITE_DIR = 'sprites'
+# Twice the largest CSS size (.tech-icon is 50px), so icons stay sharp on 2x screens
+CELL_SIZE = 100
+COLUMNS = 8
+
+
+def icon_names():
+    """Technologies with an icon, in TECH_STACK_CHOICES order."""
+    from django.contrib.staticfiles import finders
+
+    return [tech for tech in TECH_DISPLAY if finders.find(f'{ICON_DIR}/{tech}.png')]
+
+
+def build(output_dir):
+    """
+    Write sprites/tech.{avif,webp,png} into output_dir.
+
+    Returns:
+        tuple: (CSS map with url()s relative to dist/css/, list of technologies in the sprite)
+    """
+    from django.contrib.staticfiles import finders
+    from PIL import Image
+
+    from .image_assets import AVIF_QUALITY, WEBP_QUALITY, avif_supported, optimize_lossless
+
+    techs = icon_names()
+    if not techs:
+        return '', []
+    rows = -(-len(techs) // COLUMNS)
+    columns = min(COLUMNS, len(techs))
+    sprite = Image.new('RGBA', (columns * CELL_SIZE, rows * CELL_SIZE), (0, 0, 0, 0))
+    rules = []
+    for index, tech in enumerate(techs):
+        row, column = divmod(index, COLUMNS)
+        with Image.open(finders.find(f'{ICON_DIR}/{tech}.png')) as icon:
+            icon = icon.convert('RGBA')
+            # object-fit: contain within the cell
+            icon.thumbnail((CELL_SIZE, CELL_SIZE), Image.Resampling.LANCZOS)
+            sprite.paste(icon, (
+                column * CELL_SIZE + (CELL_SIZE - icon.width) // 2,
+                row * CELL_SIZE + (CELL_SIZE - icon.height) // 2,
+            ))
+        x = column * 100 / (columns - 1) if columns > 1 else 0
+        y = row * 100 / (rows - 1) if rows > 1 else 0
+        rules.append(f'.tech-sprite[data-tech={tech}]{{background-position:{x:g}% {y:g}%}}')
+
+    sprite_dir = Path(output_dir) / SPRITE_DIR
+    sprite_dir.mkdir(parents=True, exist_ok=True)
+    buffer = io.BytesIO()
+    sprite.save(buffer, 'PNG')
+    (sprite_dir / 'tech.png').write_bytes(optimize_lossless(sprite, buffer.getvalue()))
+    # Lossy, but indistinguishable at icon size and a fraction of the PNG
+    candidates = [('webp', {'quality': WEBP_QUALITY, 'method': 6})]
+    if avif_supported():
+        candidates.insert(0, ('avif', {'quality': AVIF_QUALITY, 'speed': 6}))
+    for format, options in candidates:
+        sprite.save(sprite_dir / f'tech.{format}', format.upper(), **options)
+
+    url = f'../{SPRITE_DIR}/tech'
+    image_set = ','.join(f'url("{url}.{format}") type("image/{format}")' for format in [*dict(candidates), 'png'])
+    base = (
+        f'.tech-sprite{{display:inline-block;background:url("{url}.png") 0 0/{columns * 100}% {rows * 100}% no-repeat;'
+        f'background-image:image-set({image_set})}}'
+    )
+    return base + ''.join(rules), techs
@@ -0,0 +1,154 @@
+import json
+import logging
+from functools import lru_cache
+from pathlib import Path
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+from django.forms.utils import flatatt
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from ..assets import CSS_BUNDLE, CSS_SOURCE, FONT_FAMILIES, MANIFEST_NAME, PAGE_SCRIPTS, google_fonts_url, rewrite_urls
+from ..image_assets import IMAGE_MANIFEST_NAME
+from ..models import TECH_DISPLAY
+from ..tech_sprite import ICON_DIR
+
+logger = logging.getLogger(__name__)
+
+register = template.Library()
+
+
+def _load_manifest(name, command):
+    if not getattr(settings, 'ASSET_BUNDLES', not settings.DEBUG):
+        return None
+    path = finders.find(name)
+    if not path:
+        logger.warning(f"[ASSETS] ASSET_BUNDLES is on but {name} has not been built (run {command}); linking sources")
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=1)
+def asset_manifest():
+    """The build_assets manifest, or None to link the source files (bundles off, or never built)."""
+    return _load_manifest(MANIFEST_NAME, 'build_assets')
+
+
+@lru_cache(maxsize=1)
+def image_manifest():
+    """The optimize_images manifest, or None to serve the original images."""
+    return _load_manifest(IMAGE_MANIFEST_NAME, 'optimize_images')
+
+
+@lru_cache(maxsize=None)
+def image_dimensions(name):
+    """(width, height) of a source static image, or None if it is missing or unreadable."""
+    from PIL import Image
+
+    path = finders.find(name)
+    if not path:
+        return None
+    try:
+        with Image.open(path) as image:
+            return image.size
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=None)
+def critical_styles(template_name):
+    """A page's built critical CSS with its url()s made absolute for inlining, or None."""
+    manifest = asset_manifest()
+    name = manifest and manifest.get('critical', {}).get(template_name)
+    path = name and finders.find(name)
+    if not path:
+        return None
+    return rewrite_urls(Path(path).read_text(encoding='utf-8'), CSS_BUNDLE, static)
+
+
+@register.simple_tag(takes_context=True)
+def asset_styles(context):
+    """
+    Stylesheet (and fonts) for a page. When the page has critical CSS, that is
+    inlined and the full stylesheet loads without blocking first paint.
+    Usage: {% asset_styles %} in <head>
+    """
+    manifest = asset_manifest()
+    if not manifest:
+        full_range = {family: range(low, high + 1, 100) for family, (low, high) in FONT_FAMILIES.items()}
+        links = [google_fonts_url(full_range), static(CSS_SOURCE)]
+        return format_html_join('\n    ', '<link rel="stylesheet" href="{}">', ((link,) for link in links))
+
+    font_link = '' if manifest['font_stylesheet'] is None else format_html(
+        '<link rel="stylesheet" href="{}">\n    ', manifest['font_stylesheet'])
+    stylesheet = static(manifest['css'])
+    critical = critical_styles(context.template.name if context.template else None)
+    if critical is None:
+        return format_html('{}<link rel="stylesheet" href="{}">', font_link, stylesheet)
+    return format_html(
+        '{}<style>{}</style>\n'
+        '    <link rel="preload" href="{}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+        '    <noscript><link rel="stylesheet" href="{}"></noscript>',
+        font_link, mark_safe(critical), stylesheet, stylesheet,
+    )
+
+
+@register.simple_tag
+def asset_scripts(page):
+    """
+    A page's scripts, deferred: one minified bundle when built, else the sources in order.
+    Usage: {% asset_scripts 'project_detail' %} in <head>
+    """
+    manifest = asset_manifest()
+    if manifest:
+        return format_html('<script src="{}" defer></script>', static(manifest['scripts'][page]))
+    return format_html_join('\n    ', '<script src="{}" defer></script>', ((static(name),) for name in PAGE_SCRIPTS[page]))
+
+
+@register.simple_tag
+def picture(name, alt='', sizes=None, loading='lazy', **attrs):
+    """
+    A static image as <picture> with AVIF/WebP sources at every built width and
+    the losslessly optimized original as the <img> fallback. Width and height
+    are always set so the layout does not shift while it loads.
+    Usage: {% picture 'assets/images/hero/desktop1-pfp.png' alt='Profile' loading='eager' fetchpriority='high' %}
+    Other keyword arguments (class, id, ...) go on the <img>; sizes defaults to
+    the image's intrinsic width.
+    """
+    manifest = image_manifest()
+    entry = manifest and manifest.get(name)
+    dimensions = (entry['width'], entry['height']) if entry else image_dimensions(name)
+    img_attrs = {'alt': alt, 'loading': loading, 'decoding': 'async', **attrs}
+    if dimensions:
+        img_attrs['width'], img_attrs['height'] = dimensions
+    if not entry:
+        return format_html('<img src="{}"{}>', static(name), flatatt(img_attrs))
+
+    sizes = sizes or f'(max-width: {entry["width"]}px) 100vw, {entry["width"]}px'
+    sources = format_html_join(
+        '', '<source type="image/{}" srcset="{}" sizes="{}">',
+        (
+            (format, ', '.join(f'{static(variant)} {width}w' for width, variant in sorted(
+                entry['formats'][format].items(), key=lambda item: int(item[0]))), sizes)
+            for format in ('avif', 'webp') if format in entry['formats']
+        ),
+    )
+    return format_html('<picture>{}<img src="{}"{}></picture>', sources, static(entry['fallback']), flatatt(img_attrs))
+
+
+@register.simple_tag
+def tech_icon(tech):
+    """
+    A technology's icon: a cell of the built tech sprite (one request for every
+    icon on the page), or its own image without a build.
+    Usage: {% tech_icon tech %}
+    """
+    label = TECH_DISPLAY.get(tech, tech)
+    manifest = asset_manifest()
+    if manifest and tech in manifest.get('tech_sprite', ()):
+        return format_html('<span class="tech-icon tech-sprite" data-tech="{}" role="img" aria-label="{}"></span>', tech, label)
+    return picture(f'{ICON_DIR}/{tech}.png', alt=label, loading='eager', **{'class': 'tech-icon'})
@@ -1,5 +1,6 @@
 from django import template
-from ..models import TECH_STACK_CHOICES
+from ..models import TECH_DISPLAY
+from ..media_urls import resource_url, resolve_urls
 
 register = template.Library()
 
@@ -9,8 +10,21 @@ def get_item(dictionary, key):
 
 @register.filter
 def tech_display(value):
-    # Flatten grouped choices
-    flat_choices = []
-    for group in TECH_STACK_CHOICES:
-        flat_choices.extend(group[1])
-    return dict(flat_choices).get(value, value)
\ No newline at end of file
+    return TECH_DISPLAY.get(value, value)
+
+@register.simple_tag
+def media_url(resource, **options):
+    """
+    Memoized Cloudinary URL for a single resource.
+    Usage: {% media_url project.thumbnail_image width=300 crop='scale' %}
+    """
+    return resource_url(resource, **options) or ''
+
+@register.simple_tag
+def media_urls(objects, field_name, **options):
+    """
+    Resolve a media field for every object in one pass.
+    Usage: {% media_urls project.photos.all 'image' as photo_urls %}
+           then {{ photo_urls|get_item:photo.pk }} inside the loop.
+    """
+    return resolve_urls(objects, field_name, **options)
@@ -0,0 +1,55 @@
+"""
+Test runner for `manage.py test` (settings.TEST_RUNNER).
+
+Django's runner gives the tests their own database, but not their own caches:
+the tiered caches' L2 files, the rate-limit counters and the featured-project
+version stamp live under CACHE_DIR, shared with the running site. This runner
+moves them into a temporary directory for the run (see
+benchmarking.scratch_settings), and keeps the outbox sender thread off so no
+test talks to a real SMTP server.
+
+Media goes through the local backend (see media_storage.py), stored in the
+same temporary directory, so the tests need no Cloudinary credentials and
+never upload anything.
+"""
+import os
+import tempfile
+
+import cloudinary
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from . import media_storage, media_urls
+from .benchmarking import scratch_settings
+
+
+def _reset_media():
+    """Forget the media backend and URLs built under the previous configuration."""
+    media_storage._backend = None
+    media_urls.clear_cache()
+
+
+class ScratchCacheRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._directory = tempfile.TemporaryDirectory()
+        self._settings = override_settings(
+            **scratch_settings(self._directory.name), OUTBOX_SENDER_THREAD=False,
+            MEDIA_BACKEND='local', LOCAL_MEDIA_ROOT=os.path.join(self._directory.name, 'local_cdn'),
+        )
+        self._settings.enable()
+        # The same Cloudinary URL configuration settings.py applies for MEDIA_BACKEND=local
+        self._cloudinary = dict(vars(cloudinary.config()))
+        cloudinary.config(cloud_name='local', private_cdn=True,
+                          cname=f'{settings.LOCAL_MEDIA_HOST}/media/local_cdn', secure=False)
+        _reset_media()
+
+    def teardown_test_environment(self, **kwargs):
+        config = vars(cloudinary.config())
+        config.clear()
+        config.update(self._cloudinary)
+        _reset_media()
+        self._settings.disable()
+        self._directory.cleanup()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from projects.models import Category, ProjectCard, ProjectEmbed, ProjectPhoto, Projects, ProjectVideo
+
+# Maximum queries per admin page. Budgets are independent of row counts:
+# each page is measured with a small and a large data set and must fit both.
+QUERY_BUDGETS = [
+    ('projects changelist', lambda project: reverse('admin:projects_projects_changelist'), 8),
+    ('photo changelist', lambda project: reverse('admin:projects_projectphoto_changelist'), 8),
+    ('video changelist', lambda project: reverse('admin:projects_projectvideo_changelist'), 8),
+    ('project change form', lambda project: reverse('admin:projects_projects_change', args=[project.pk]), 12),
+]
+SMALL, LARGE = 3, 40  # rows per model
+
+
+class AdminQueryBudgetTests(TestCase):
+    """Admin pages stay within their query budgets, and their query count doesn't grow with the rows (N+1)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser('query-budget', 'budget@example.com', 'unused')
+        cls.category = Category.objects.create(name='Query budget category')
+        cls.project = Projects.objects.create(name='Query budget project', description='x', category=cls.category)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def seed(self, start, stop):
+        """Add rows [start, stop) to every model the admin pages list."""
+        for n in range(start, stop):
+            other = Projects.objects.create(
+                name=f'Query budget project {n}', description='x', category=self.category,
+                thumbnail_image=f'image/upload/v1/budget/thumb{n}.jpg'
+            )
+            ProjectPhoto.objects.create(project=self.project, image=f'image/upload/v1/budget/photo{n}.jpg', order=n)
+            ProjectPhoto.objects.create(project=other, image=f'image/upload/v1/budget/other{n}.jpg')
+            ProjectVideo.objects.create(project=self.project, video=f'video/upload/v1/budget/video{n}.mp4', order=n)
+            ProjectEmbed.objects.create(
+                project=self.project, embed_code='<iframe src="https://www.youtube.com/embed/budget"></iframe>', order=n
+            )
+            ProjectCard.objects.create(project=self.project, title=f'Card {n}', teaser='x', body='x', order=n)
+
+    def query_counts(self):
+        counts = {}
+        for label, url, budget in QUERY_BUDGETS:
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url(self.project))
+            self.assertEqual(response.status_code, 200, label)
+            counts[label] = len(context)
+        return counts
+
+    def test_admin_pages_within_budget(self):
+        self.seed(0, SMALL)
+        small = self.query_counts()
+        self.seed(SMALL, LARGE)
+        large = self.query_counts()
+        for label, url, budget in QUERY_BUDGETS:
+            with self.subTest(label):
+                self.assertLessEqual(large[label], budget, f'{label}: {large[label]} queries at {LARGE} rows')
+                self.assertLessEqual(large[label], small[label],
+                                     f'{label}: {small[label]} queries at {SMALL} rows, {large[label]} at {LARGE}')
@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from projects import search
+from projects.models import Projects
+
+
+class AdminSearchTests(TestCase):
+    """The projects changelist search lists full-text matches best first."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser('admin-search', 'search@example.com', 'unused')
+        # Created best match first, so the default newest-first order and the rank disagree
+        cls.exact = Projects.objects.create(name='Lighthouse', description='A lighthouse, lighthouse at dusk.')
+        cls.mention = Projects.objects.create(name='Harbour mural', description='Also some lighthouse sketches.')
+        Projects.objects.create(name='Unrelated', description='Nothing to see.')
+        search.rebuild_index()  # the signals index on commit, which a TestCase never reaches
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def search(self, **params):
+        response = self.client.get(reverse('admin:projects_projects_changelist'), params, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return list(response.context['cl'].result_list)
+
+    def test_results_ranked_best_first(self):
+        self.assertEqual(self.search(q='lighthouse'), [self.exact, self.mention])
+
+    def test_column_sort_overrides_rank(self):
+        self.assertEqual(self.search(q='lighthouse', o='1'), [self.mention, self.exact])
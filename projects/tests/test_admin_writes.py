@@ -0,0 +1,64 @@
+from contextlib import contextmanager
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+
+from projects.models import Projects
+from projects.write_queue import WriteQueueTimeout
+
+
+@contextmanager
+def _queue_busy():
+    raise WriteQueueTimeout('Timed out after 60s waiting for the database write queue')
+    yield
+
+
+class SerializedWriteTests(TestCase):
+    """Admin saves with uploads go through the write queue; a full queue or a failed upload keeps the posted form."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser('write-queue', 'queue@example.com', 'unused')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        for name, value in (('stage_uploads', []), ('discard_uncommitted', None)):
+            patcher = mock.patch(f'projects.admin.{name}', return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def post(self, files):
+        data = {
+            'name': 'Queued project', 'description': 'Posted while another save was running', 'year': 2024,
+            'display_mode': 'portfolio', **files,
+        }
+        for prefix in ('photos', 'videos', 'embeds', 'cards'):
+            data.update({f'{prefix}-TOTAL_FORMS': 0, f'{prefix}-INITIAL_FORMS': 0})
+        return self.client.post(reverse('admin:projects_projects_add'), data, secure=True)
+
+    def test_timeout_rerenders_posted_form(self):
+        image = SimpleUploadedFile('thumb.png', b'not really a png', content_type='image/png')
+        with mock.patch('projects.admin.serialized_write', _queue_busy):
+            response = self.post({'thumbnail_image': image})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Another save is still running')
+        self.assertContains(response, 'Posted while another save was running')
+        self.assertFalse(Projects.objects.filter(name='Queued project').exists())
+
+    def test_save_without_files_skips_queue(self):
+        with mock.patch('projects.admin.serialized_write', _queue_busy):
+            response = self.post({})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Projects.objects.filter(name='Queued project').exists())
+
+    def test_failed_upload_rerenders_posted_form(self):
+        image = SimpleUploadedFile('thumb.png', b'not really a png', content_type='image/png')
+        with mock.patch('projects.admin.stage_uploads', side_effect=RuntimeError('upload refused')):
+            response = self.post({'thumbnail_image': image})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Media upload failed, nothing was saved: upload refused')
+        self.assertContains(response, 'Posted while another save was running')
+        self.assertFalse(Projects.objects.filter(name='Queued project').exists())
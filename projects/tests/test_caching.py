@@ -0,0 +1,191 @@
+import multiprocessing
+import os
+from importlib import import_module
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponsePermanentRedirect
+from django.middleware.csrf import get_token
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from projects.caching import cache_response, get_or_compute
+from projects.featured_cache import FeaturedProjectsCache
+from projects.models import Projects
+
+L1_MAX_ENTRIES = 100
+L1_TIMEOUT = 1
+
+
+def _caches_setting(directory):
+    def tiered(name, timeout):
+        return {
+            'BACKEND': 'projects.cache_backends.TieredCache', 'LOCATION': name, 'TIMEOUT': timeout,
+            'OPTIONS': {
+                'L1_MAX_ENTRIES': L1_MAX_ENTRIES, 'L1_TIMEOUT': L1_TIMEOUT,
+                'L2': {'BACKEND': 'projects.cache_backends.SQLiteCache',
+                       'LOCATION': os.path.join(directory, f'{name}.sqlite3')},
+            },
+        }
+    return {alias: tiered(alias, 600) for alias in ('default', 'pages', 'urls', 'fragments')}
+
+
+def _stampede_worker(args):
+    """Worker process: `threads` threads all fetch one cold key at once; computations are counted in the cache."""
+    key, threads, delay = args
+    cache = caches['default']
+
+    def compute():
+        if not cache.add(f'{key}:computed', 1):
+            cache.incr(f'{key}:computed')
+        time.sleep(delay)
+        return 'value'
+
+    workers = [threading.Thread(target=get_or_compute, args=(cache, key, compute), kwargs={'lock_timeout': 10})
+               for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def _read_worker(key):
+    return caches['default'].get(key)
+
+
+def _set_in_l2(key):
+    caches['default'].set(key, 2)
+
+
+class TieredCacheTestCase(TestCase):
+    """Runs against its own tiered caches, with a small and short-lived L1."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        overrides = override_settings(CACHES=_caches_setting(directory.name), RATELIMIT_ENABLE=False)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        for alias in ('default', 'pages', 'urls', 'fragments'):
+            caches[alias].clear()  # L1 is in-process memory, kept from the previous test
+
+
+class TieredCacheTests(TieredCacheTestCase):
+    def test_entries_shared_across_processes(self):
+        caches['default'].set('shared', 'from-parent')
+        with multiprocessing.get_context('fork').Pool(2) as pool:
+            self.assertEqual(pool.map(_read_worker, ['shared'] * 2), ['from-parent'] * 2)
+
+    def test_change_elsewhere_seen_after_l1_timeout(self):
+        cache = caches['default']
+        cache.set('changing', 1)
+        with multiprocessing.get_context('fork').Pool(1) as pool:
+            pool.apply(_set_in_l2, ('changing',))
+        time.sleep(L1_TIMEOUT + 0.1)
+        self.assertEqual(cache.get('changing'), 2)
+
+    def test_l1_stays_within_max_entries(self):
+        cache = caches['default']
+        for i in range(L1_MAX_ENTRIES * 5):
+            cache.set(f'bounded-{i}', i)
+        self.assertLessEqual(cache.stats()['l1_entries'], L1_MAX_ENTRIES)
+
+    def test_cold_key_computed_once_under_stampede(self):
+        with multiprocessing.get_context('fork').Pool(3) as pool:
+            pool.map(_stampede_worker, [('cold', 6, 0.2)] * 3)
+        self.assertEqual(caches['default'].get('cold:computed'), 1)
+
+
+
+class FeaturedProjectsCacheTests(TestCase):
+    def test_every_concurrent_read_counted(self):
+        Projects.objects.create(name='Featured project', description='Featured', featured=True)
+        featured = FeaturedProjectsCache()
+        featured.get()
+        readers = [threading.Thread(target=lambda: [featured.get() for _ in range(500)]) for _ in range(8)]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+        stats = featured.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (4000, 1, 1))
+
+class CachedPageTests(TieredCacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.project = Projects.objects.create(name='Cached project', description='Cached description')
+
+    def get(self, url):
+        response = self.client.get(url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_pages_served_from_cache(self):
+        url = reverse('projects_page')
+        first = self.get(url)
+        with self.assertNumQueries(0):
+            second = self.get(url)
+        self.assertEqual(second.content, first.content)
+
+    def test_edited_project_not_served_stale(self):
+        url = reverse('project_detail', args=[self.project.pk])
+        self.get(url)
+        self.project.name = 'Cached project (edited)'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.save()
+        self.assertContains(self.get(url), 'Cached project (edited)')
+
+    def test_stats_report_page_hits(self):
+        url = reverse('about')
+        self.get(url)
+        self.get(url)
+        self.client.force_login(get_user_model().objects.create_user('cache-check', is_staff=True))
+        stats = self.client.get(reverse('cache_stats'), secure=True).json()['caches']
+        self.assertGreater(stats['pages']['hit_ratio'], 0)
+
+
+class CacheResponseTests(TieredCacheTestCase):
+    def counted(self, view):
+        """`view` under @cache_response, with the number of times it actually ran."""
+        calls = []
+
+        @cache_response()
+        def wrapped(request):
+            calls.append(request)
+            return view(request)
+        return wrapped, calls
+
+    def request(self):
+        request = RequestFactory().get('/cached/')
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+        return request
+
+    def test_redirect_keeps_location(self):
+        view, calls = self.counted(lambda request: HttpResponsePermanentRedirect('/moved/'))
+        view(self.request())
+        response = view(self.request())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual((response.status_code, response['Location']), (301, '/moved/'))
+
+    def test_view_reading_csrf_token_not_stored(self):
+        view, calls = self.counted(lambda request: HttpResponse(get_token(request)))
+        view(self.request())
+        view(self.request())
+        self.assertEqual(len(calls), 2)
+
+    def test_view_reading_session_not_stored(self):
+        view, calls = self.counted(lambda request: HttpResponse(request.session.get('visits', 0)))
+        view(self.request())
+        view(self.request())
+        self.assertEqual(len(calls), 2)
+
+    def test_public_pages_still_stored(self):
+        for name in ('home', 'about', 'projects_page'):
+            with self.subTest(page=name):
+                self.client.get(reverse(name), secure=True)
+                with self.assertNumQueries(0):
+                    self.assertEqual(self.client.get(reverse(name), secure=True).status_code, 200)
@@ -0,0 +1,41 @@
+import io
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from projects.media_storage import get_backend
+
+
+@override_settings(MEDIA_LOCAL_MAX_DIMENSION=64)
+class LocalMediaTransformTests(SimpleTestCase):
+    """Image transformations in local media URLs are validated before Pillow sees them."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        content = io.BytesIO()
+        Image.new('RGB', (40, 20), 'teal').save(content, format='PNG')
+        cls.public_id = get_backend().upload(
+            SimpleUploadedFile('swatch.png', content.getvalue(), content_type='image/png'), folder='tests').public_id
+
+    def get(self, transformation):
+        return self.client.get(f'/media/local_cdn/image/upload/{transformation}/{self.public_id}.png', secure=True)
+
+    def size(self, response):
+        return Image.open(io.BytesIO(b''.join(response.streaming_content))).size
+
+    def test_resizes(self):
+        response = self.get('c_scale,w_20')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.size(response), (20, 10))
+
+    def test_dimensions_clamped_to_maximum(self):
+        response = self.get('c_fill,h_100000,w_100000')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.size(response), (64, 64))
+
+    def test_malformed_values_are_404(self):
+        for transformation in ('w_auto', 'w_0.5', 'w_0', 'h_-5', 'q_500', 'q_high', 'c_pad,w_20', 'w_²'):
+            with self.subTest(transformation=transformation):
+                self.assertEqual(self.get(transformation).status_code, 404)
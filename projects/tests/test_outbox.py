@@ -0,0 +1,99 @@
+import re
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from projects import outbox
+from projects.models import OutboxEmail
+from projects.smtp_standin import LocalSMTPServer
+
+_MESSAGE_ID_RE = re.compile(rb'^Message-ID: (.+?)\r?$', re.M | re.I)
+
+SMTP_SETTINGS = {
+    'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+    'EMAIL_HOST': '127.0.0.1', 'EMAIL_USE_TLS': False, 'EMAIL_USE_SSL': False,
+    'EMAIL_HOST_USER': '', 'EMAIL_HOST_PASSWORD': '',
+}
+
+
+class OutboxDeliveryTests(TestCase):
+    """Queued messages go to a local SMTP stand-in through OutboxSender.drain()."""
+
+    def setUp(self):
+        self.server = LocalSMTPServer()
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        settings = override_settings(**SMTP_SETTINGS, EMAIL_PORT=self.server.port)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def enqueue(self, n, subject='Check'):
+        return outbox.enqueue(f'{subject} {n}', f'Message {n}', f'visitor{n}@example.com', ['owner@example.com'])
+
+    def test_duplicate_submissions_stored_once(self):
+        first, created = self.enqueue(1)
+        again, created_again = self.enqueue(1)
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again.pk, first.pk)
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+
+    def test_queue_delivered_once_over_one_connection(self):
+        for n in range(60):  # more than one OUTBOX_BATCH_SIZE
+            self.enqueue(n)
+        sent = outbox.OutboxSender().drain()
+
+        delivered = [_MESSAGE_ID_RE.search(data).group(1) for _, _, data in self.server.messages]
+        self.assertEqual(sent, 60)
+        self.assertEqual(len(set(delivered)), 60)
+        self.assertEqual(len(delivered), 60)
+        self.assertEqual(self.server.connections, 1)
+        self.assertFalse(OutboxEmail.objects.exclude(status=OutboxEmail.SENT).exists())
+
+    def test_temporary_failure_retried_with_backoff(self):
+        self.server.fail_next = 3
+        for n in range(5):
+            self.enqueue(n, subject='Retry')
+        sender = outbox.OutboxSender()
+        sender.drain()
+
+        waiting = OutboxEmail.objects.filter(status=OutboxEmail.PENDING)
+        self.assertEqual(len(self.server.messages), 2)
+        self.assertEqual(waiting.count(), 3)
+        for row in waiting:
+            self.assertEqual(row.attempts, 1)
+            self.assertGreater(row.next_attempt_at, timezone.now())
+
+        waiting.update(next_attempt_at=timezone.now())  # fast-forward to the retry
+        sender.drain()
+        self.assertEqual(len(self.server.messages), 5)
+        self.assertFalse(OutboxEmail.objects.exclude(status=OutboxEmail.SENT).exists())
+
+
+@override_settings(RATELIMIT_ENABLE=False)
+class ContactOutboxTests(TestCase):
+    form = {'name': 'Visitor', 'email': 'visitor@example.com', 'subject': 'Hello', 'message': 'A message'}
+
+    @override_settings(EMAIL_HOST_USER='owner@example.com')
+    def test_contact_message_is_queued(self):
+        response = self.client.post(reverse('contact'), self.form, follow=True, secure=True)
+        self.assertContains(response, 'Thank you for your message!')
+        self.assertEqual(OutboxEmail.objects.get().recipients, ['owner@example.com'])
+
+    @override_settings(EMAIL_HOST_USER='')
+    def test_contact_without_recipient_shows_error(self):
+        response = self.client.post(reverse('contact'), self.form, secure=True)
+        self.assertContains(response, 'An error occurred while sending your message.')
+        self.assertNotContains(response, 'Thank you for your message!')
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    @override_settings(EMAIL_HOST_USER='owner@example.com')
+    def test_contact_outbox_failure_is_logged(self):
+        with mock.patch('projects.outbox.OutboxEmail.asave', side_effect=DatabaseError('database is locked')), \
+                self.assertLogs('projects.views', 'ERROR') as logs:
+            response = self.client.post(reverse('contact'), self.form, secure=True)
+        self.assertContains(response, 'An error occurred while sending your message.')
+        self.assertIn('database is locked', logs.output[0])
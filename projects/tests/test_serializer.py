@@ -0,0 +1,70 @@
+import json
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from projects.models import Category, ProjectPhoto, Projects
+from projects.serializer import ProjectsSerializer, project_rows, render_json
+
+PROJECTS = 30
+PHOTOS = 3
+
+
+@override_settings(RATELIMIT_ENABLE=False)
+class ProjectRowsTests(TestCase):
+    """project_rows() and the API views built on it return exactly what ProjectsSerializer does."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Serializer check')
+        # Every shape a column can take: blank and null media, no technologies, several, no category
+        Projects.objects.bulk_create(
+            Projects(name=f'Serializer project {n:05d}', description=f'Project {n}\n\nWith **markdown**, ünïcode.',
+                     year=2000 + n % 25, category=category if n % 7 else None, featured=n % 10 == 0,
+                     display_mode='blogpost' if n % 3 == 0 else 'portfolio',
+                     technologies=[[], ['python'], ['python', 'django', 'gsap']][n % 3],
+                     thumbnail_image=[f'image/upload/v1/check/thumb{n}.jpg', '', None][n % 3 if n % 5 == 0 else 0])
+            for n in range(PROJECTS)
+        )
+        ids = list(Projects.objects.values_list('pk', flat=True))
+        ProjectPhoto.objects.bulk_create(
+            ProjectPhoto(project_id=project_id, image=f'image/upload/v1/check/photo{project_id}-{i}.png',
+                         caption=f'Photo {i}' if i % 2 else '', order=PHOTOS - i)
+            for project_id in ids[::2] for i in range(PHOTOS)
+        )
+
+    def setUp(self):
+        request = RequestFactory().get('/api/projects/')
+        projects = list(Projects.objects.prefetch_related('photos'))
+        data = ProjectsSerializer(projects, many=True, context={'request': request}).data
+        self.expected = json.loads(JsonResponse({'projects': data}).content)['projects']
+
+    def get(self, url):
+        # Over HTTPS, so SECURE_SSL_REDIRECT doesn't turn the API into a redirect
+        return self.client.get(url, secure=True)
+
+    def test_project_rows_match_serializer(self):
+        request = RequestFactory().get('/api/projects/')
+        actual = json.loads(render_json({'projects': project_rows(Projects.objects.all(), request)}))['projects']
+        self.assertEqual(len(actual), PROJECTS)
+        # Thumbnails resolve offline, through the local media backend the test runner selects
+        thumbnails = [project['thumbnail_url'] for project in actual if project['thumbnail_url']]
+        self.assertTrue(thumbnails)
+        self.assertTrue(all(url.startswith(f'http://{settings.LOCAL_MEDIA_HOST}/media/local_cdn/')
+                            for url in thumbnails), thumbnails[:3])
+        for want, got in zip(self.expected, actual):
+            with self.subTest(project=want['id']):
+                self.assertEqual(got, want)
+
+    def test_list_view_matches_serializer(self):
+        self.assertEqual(json.loads(self.get('/api/projects/').content)['projects'], self.expected)
+
+    def test_detail_view_matches_serializer(self):
+        detail = next(project for project in self.expected if project['photos'])
+        response = self.get(f"/api/projects/{detail['id']}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), detail)
+
+    def test_missing_project_is_404(self):
+        self.assertEqual(self.get('/api/projects/0').status_code, 404)
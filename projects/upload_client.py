@@ -0,0 +1,271 @@
+"""
+Pooled HTTP client for uploads to the media CDN (Cloudinary's Upload API).
+
+Replaces per-file `cloudinary.uploader.upload` calls with:
+- a shared httpx connection pool (keep-alive instead of a new TLS handshake per file)
+- chunked uploads for large files (Cloudinary's Content-Range protocol)
+- retries with exponential backoff via tenacity for connection errors, 429 and 5xx
+- an asyncio interface so several photo/video uploads for one project overlap
+
+Request signing and parameter building reuse the cloudinary SDK helpers, so
+the results are identical to `uploader.upload`.
+"""
+import asyncio
+import logging
+import os
+import threading
+
+import httpx
+from cloudinary import CloudinaryResource, utils
+from tenacity import (
+    AsyncRetrying,
+    Retrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+
+logger = logging.getLogger(__name__)
+
+# Same threshold/chunk size the SDK uses for upload_large
+CHUNK_SIZE = 20 * 1000 * 1000
+
+# Pool and retry defaults
+MAX_CONNECTIONS = 8
+MAX_ATTEMPTS = 5
+TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class UploadError(Exception):
+    """Raised when the Upload API rejects a request or retries are exhausted."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _is_retryable(exc):
+    if isinstance(exc, httpx.TransportError):
+        return True
+    return isinstance(exc, UploadError) and exc.status_code in RETRYABLE_STATUS
+
+
+def _file_size(file):
+    size = getattr(file, 'size', None)
+    if size is not None:
+        return size
+    position = file.tell()
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(position)
+    return size
+
+
+def to_resource(result):
+    """Convert an Upload API result into a CloudinaryResource (like uploader.upload_resource)."""
+    return CloudinaryResource(
+        result['public_id'], version=str(result['version']),
+        format=result.get('format'), type=result['type'],
+        resource_type=result['resource_type'], metadata=result
+    )
+
+
+class MediaUploadClient:
+    """
+    Upload client with a sync and an async interface sharing the same settings.
+
+    Use `upload()` from sync code and `aupload()` / `aupload_many()` inside an
+    event loop (`async with MediaUploadClient() as client: ...`).
+    """
+
+    def __init__(self, upload_prefix=None, chunk_size=CHUNK_SIZE, max_connections=MAX_CONNECTIONS,
+                 max_attempts=MAX_ATTEMPTS, timeout=TIMEOUT):
+        self.upload_prefix = upload_prefix
+        self.chunk_size = chunk_size
+        self.max_attempts = max_attempts
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.timeout = timeout
+        self._client = None
+        self._async_client = None
+        self._lock = threading.Lock()
+
+    # -- request building -------------------------------------------------
+
+    def _api_url(self, options):
+        url_options = dict(options)
+        if self.upload_prefix:
+            url_options['upload_prefix'] = self.upload_prefix
+        return utils.cloudinary_api_url('upload', **url_options)
+
+    def _form_fields(self, options):
+        params = utils.sign_request(utils.cleanup_params(utils.build_upload_params(**options)), options)
+        fields = {}
+        for key, value in params.items():
+            if isinstance(value, list):
+                fields[f'{key}[]'] = [str(item) for item in value]
+            elif value:
+                fields[key] = str(value)
+        return fields
+
+    def _parts(self, file, options):
+        """
+        Yield (headers, filename, body) for each request needed to upload a file.
+
+        Small files are sent in one request; larger ones in CHUNK_SIZE pieces
+        sharing an X-Unique-Upload-Id.
+        """
+        if hasattr(file, 'seek'):
+            file.seek(0)
+        filename = options.get('filename') or os.path.basename(getattr(file, 'name', '') or 'file')
+        size = _file_size(file)
+
+        if size <= self.chunk_size:
+            yield {}, filename, file
+            return
+
+        upload_id = utils.random_public_id()
+        offset = 0
+        while offset < size:
+            chunk = file.read(self.chunk_size)
+            if not chunk:
+                break
+            headers = {
+                'Content-Range': f'bytes {offset}-{offset + len(chunk) - 1}/{size}',
+                'X-Unique-Upload-Id': upload_id,
+            }
+            offset += len(chunk)
+            yield headers, filename, chunk
+
+    def _handle_response(self, response):
+        try:
+            result = response.json()
+        except ValueError:
+            raise UploadError(f'Unexpected response ({response.status_code}): {response.text[:200]}', response.status_code)
+        if response.status_code >= 400 or 'error' in result:
+            message = result.get('error', {}).get('message', response.text[:200])
+            raise UploadError(f'Upload failed ({response.status_code}): {message}', response.status_code)
+        return result
+
+    def _retrying(self, retrying_class):
+        return retrying_class(
+            retry=retry_if_exception(_is_retryable),
+            wait=wait_exponential_jitter(initial=0.5, max=10),
+            stop=stop_after_attempt(self.max_attempts),
+            reraise=True,
+        )
+
+    # -- sync interface ---------------------------------------------------
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(limits=self.limits, timeout=self.timeout)
+        return self._client
+
+    def upload(self, file, **options):
+        """
+        Upload a file and return the Upload API result dict.
+
+        Args:
+            file: File-like object (Django UploadedFile, open file, BytesIO)
+            **options: Cloudinary upload options (folder, resource_type, transformation, ...)
+        """
+        options.setdefault('resource_type', 'image')
+        url = self._api_url(options)
+        result = None
+        for headers, filename, body in self._parts(file, options):
+            for attempt in self._retrying(Retrying):
+                with attempt:
+                    if hasattr(body, 'seek'):
+                        body.seek(0)
+                    response = self.client.post(
+                        url, data=self._form_fields(options), files={'file': (filename, body)}, headers=headers
+                    )
+                    result = self._handle_response(response)
+            # Later chunks must target the public_id assigned to the first one
+            options['public_id'] = result.get('public_id')
+        return result
+
+    def upload_many(self, items, concurrency=4):
+        """
+        Upload several files concurrently from sync code.
+
+        Args:
+            items: Iterable of (file, options) pairs
+            concurrency: Maximum uploads in flight
+
+        Returns:
+            List of results in the same order as `items`
+        """
+        async def run():
+            async with MediaUploadClient(
+                upload_prefix=self.upload_prefix, chunk_size=self.chunk_size,
+                max_connections=self.limits.max_connections, max_attempts=self.max_attempts,
+                timeout=self.timeout
+            ) as client:
+                return await client.aupload_many(items, concurrency=concurrency)
+
+        return asyncio.run(run())
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    # -- async interface --------------------------------------------------
+
+    async def __aenter__(self):
+        self._async_client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._async_client.aclose()
+        self._async_client = None
+
+    async def aupload(self, file, **options):
+        """Async version of upload(); must be used inside `async with`."""
+        options.setdefault('resource_type', 'image')
+        url = self._api_url(options)
+        result = None
+        for headers, filename, body in self._parts(file, options):
+            async for attempt in self._retrying(AsyncRetrying):
+                with attempt:
+                    if hasattr(body, 'seek'):
+                        body.seek(0)
+                    response = await self._async_client.post(
+                        url, data=self._form_fields(options), files={'file': (filename, body)}, headers=headers
+                    )
+                    result = self._handle_response(response)
+            options['public_id'] = result.get('public_id')
+        return result
+
+    async def aupload_many(self, items, concurrency=4):
+        """Upload (file, options) pairs with at most `concurrency` in flight."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def upload_one(file, options):
+            async with semaphore:
+                return await self.aupload(file, **dict(options))
+
+        return await asyncio.gather(*(upload_one(file, options) for file, options in items))
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_upload_client():
+    """Return the process-wide pooled upload client."""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                from django.conf import settings
+                _default_client = MediaUploadClient(
+                    upload_prefix=getattr(settings, 'MEDIA_UPLOAD_PREFIX', None),
+                    max_connections=getattr(settings, 'MEDIA_UPLOAD_MAX_CONNECTIONS', MAX_CONNECTIONS),
+                )
+    return _default_client
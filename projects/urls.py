@@ -20,13 +20,13 @@ from django.conf import settings
 from django.conf.urls.static import static
 from projects import views
 from projects import compression_views
+from projects import cache_views
+from projects import perf_views
+from projects import media_storage
 from rest_framework.urlpatterns import format_suffix_patterns
 
 import os
 random_admin_path = os.getenv('ADMIN_URL', 'admin-dev')
-import datetime
-print(f"\n{datetime.datetime.now().strftime('%B %d, %Y - %H:%M:%S')}")
-print(f"Admin page available at: http://127.0.0.1:8000/{random_admin_path}/\n")
 urlpatterns = [
     path(random_admin_path + '/', admin.site.urls),
     path('ckeditor/', include('ckeditor_uploader.urls')),
@@ -35,6 +35,13 @@ urlpatterns = [
     path('admin/compression-progress/<str:task_id>/', compression_views.compression_progress, name='compression_progress'),
     path('admin/cancel-compression/<str:task_id>/', compression_views.cancel_compression, name='cancel_compression'),
     path('admin/get-latest-task/', compression_views.get_latest_task, name='get_latest_task'),
+
+    # Cache hit ratios for the worker that answers
+    path('admin/cache-stats/', cache_views.cache_stats_view, name='cache_stats'),
+    # Request timings per route for the worker that answers
+    path('perf/', perf_views.perf_dashboard, name='perf_dashboard'),
+    path('perf/profiles/', perf_views.profile_list, name='profile_list'),
+    path('perf/profiles/<str:name>/', perf_views.profile_detail, name='profile_detail'),
     
     path('', views.home, name='home'),
     path('about/', views.about, name='about'),
@@ -42,10 +49,18 @@ urlpatterns = [
     path('projects/', views.projects_page, name='projects_page'),
     path('projects/<int:id>/', views.project_detail_page, name='project_detail'),
     # API endpoints
+    path('api/search/', views.search, name='search'),
     path('api/projects/', views.projects_list),
     path('api/projects/<int:id>', views.projects_detail),
 ]
 
+# Offline Cloudinary stand-in (MEDIA_BACKEND=local)
+if settings.MEDIA_BACKEND == 'local':
+    urlpatterns += [
+        path('media/local_cdn/<str:resource_type>/<str:delivery_type>/<path:path>',
+             media_storage.serve_local_media, name='local_media'),
+    ]
+
 # Serve static files during development
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,11 +1,21 @@
 """
 Video compression utilities for project videos.
 Automatically compresses videos before uploading to Cloudinary.
+
+moviepy (and with it numpy and imageio) is imported inside the functions that
+decode video, so importing this module stays cheap and only upload paths pay
+for the media stack.
 """
 import os
+import re
+import resource
+import shutil
+import subprocess
 import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from moviepy import VideoFileClip
 from django.core.files import File
 from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
 import logging
@@ -46,9 +56,27 @@ TARGET_RESOLUTION = QUALITY_PRESETS['high']['resolution']
 TARGET_BITRATE = QUALITY_PRESETS['high']['bitrate']
 TARGET_FPS = QUALITY_PRESETS['high']['fps']
 
+# Poster frame and scrubbing sprite sheet settings
+DEFAULT_POSTER_TIME = 1.0  # seconds
+POSTER_MAX_WIDTH = 1280
+POSTER_QUALITY = 82
+SPRITE_FRAME_WIDTH = 160
+SPRITE_COLUMNS = 10
+SPRITE_MAX_FRAMES = 60
+SPRITE_MIN_INTERVAL = 1.0  # seconds between sprite frames
+SPRITE_QUALITY = 70
+
+# Adaptive streaming (HLS) ladder, built from QUALITY_PRESETS in one decode pass
+HLS_LADDER = ('high', 'medium', 'low')
+HLS_SEGMENT_SECONDS = 4
+HLS_AUDIO_BITRATE = '128k'
+HLS_MASTER_PLAYLIST = 'master.m3u8'
+
 
 def get_video_info(video_path):
     """Get basic information about a video file."""
+    from moviepy import VideoFileClip
+
     try:
         clip = VideoFileClip(str(video_path))
         info = {
@@ -79,7 +107,126 @@ def needs_compression(file_size, video_info=None):
     return False
 
 
-def compress_video(input_file, output_path=None, target_size_mb=95, progress_tracker=None, quality='high'):
+class _FrameTimer:
+    """
+    Clip transform that adds up the time spent producing frames for the
+    encoder (decoding, resizing, preview capture). Whatever else
+    write_videofile spends is the encode itself.
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.frames = 0
+
+    def __call__(self, get_frame, t):
+        started = time.perf_counter()
+        frame = get_frame(t)
+        self.seconds += time.perf_counter() - started
+        self.frames += 1
+        return frame
+
+    def add_to(self, run, write_seconds):
+        """Add one write_videofile pass to a VideoProcessingRun."""
+        run.decode_seconds = (run.decode_seconds or 0) + self.seconds
+        run.encode_seconds = (run.encode_seconds or 0) + max(write_seconds - self.seconds, 0)
+        run.frames = (run.frames or 0) + self.frames
+
+
+def _bitrate_kbps(size_mb, duration):
+    """Average bitrate of a whole file (video and audio)."""
+    if not duration:
+        return None
+    return size_mb * 1024 * 1024 * 8 / duration / 1000
+
+
+# Compressions in flight in this process. RUSAGE_CHILDREN and the peak RSS are
+# process-wide, so a run only records them when no other run overlapped it.
+_runs_lock = threading.Lock()
+_runs_in_flight = 0
+_runs_started = 0
+
+
+def _begin_run():
+    """Register a compression run; returns a token for _end_run()."""
+    global _runs_in_flight, _runs_started
+    with _runs_lock:
+        _runs_in_flight += 1
+        _runs_started += 1
+        return _runs_started, _runs_in_flight == 1
+
+
+def _end_run(token):
+    """Unregister a run; returns whether it had the process to itself from start to end."""
+    global _runs_in_flight
+    started, alone = token
+    with _runs_lock:
+        _runs_in_flight -= 1
+        return alone and _runs_started == started
+
+
+def _thread_cpu_seconds():
+    """CPU used so far by the calling thread (the whole process where RUSAGE_THREAD is missing)."""
+    usage = resource.getrusage(getattr(resource, 'RUSAGE_THREAD', resource.RUSAGE_SELF))
+    return usage.ru_utime + usage.ru_stime
+
+
+def _children_cpu_seconds():
+    """CPU used so far by this process's finished child processes (ffmpeg), from any thread."""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _peak_rss_mb():
+    """Peak resident memory of this process since it started."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+
+def _write_run(run):
+    from django.db import transaction
+    from .write_queue import serialized_write
+
+    try:
+        with serialized_write(), transaction.atomic():
+            run.save()
+    except Exception as e:
+        logger.warning(f"Could not record video processing run: {e}")
+
+
+def _write_run_apart(run):
+    from django.db import connection
+
+    try:
+        _write_run(run)
+    finally:
+        connection.close()
+
+
+def _save_run(run):
+    """
+    Store a VideoProcessingRun; telemetry never fails an upload.
+
+    A failed run inside an outer transaction (CompressedVideoField.pre_save
+    runs in the admin's atomic block) would be rolled back with it, so it is
+    written from another thread, on that thread's own connection. On SQLite
+    that write waits for the outer transaction to end.
+    """
+    from django.db import connection
+
+    if run.status == run.FAILED and connection.in_atomic_block:
+        threading.Thread(target=_write_run_apart, args=(run,), name='video-run-telemetry', daemon=True).start()
+    else:
+        _write_run(run)
+
+
+def compress_video(input_file, output_path=None, target_size_mb=95, progress_tracker=None, quality='high',
+                   previews=None, run=None):
     """
     Compress video to meet size requirements.
     
@@ -89,10 +236,16 @@ def compress_video(input_file, output_path=None, target_size_mb=95, progress_tra
         target_size_mb: Target file size in MB (default 95MB to leave buffer)
         progress_tracker: Optional CompressionProgressTracker instance
         quality: Quality preset ('high', 'medium', 'low') - defaults to 'high'
+        previews: Optional VideoPreviewCollector; fed the frames as they are encoded
+        run: Optional VideoProcessingRun; its input, output and timing fields are filled in (not saved)
     
     Returns:
         Path to compressed video file
     """
+    if run is None:
+        from .models import VideoProcessingRun
+        run = VideoProcessingRun()
+    
     # Create temporary file for input if needed
     if hasattr(input_file, 'temporary_file_path'):
         input_path = input_file.temporary_file_path()
@@ -123,11 +276,18 @@ def compress_video(input_file, output_path=None, target_size_mb=95, progress_tra
         if progress_tracker:
             progress_tracker.update(10, "Loading video", "Reading video file into memory...")
         
+        from moviepy import VideoFileClip
+        probe_started = time.perf_counter()
         clip = VideoFileClip(input_path)
+        run.probe_seconds = time.perf_counter() - probe_started
         
         # Get original dimensions
         original_width, original_height = clip.size
         original_size_mb = os.path.getsize(input_path) / (1024 * 1024)
+        run.duration_seconds = clip.duration
+        run.input_width, run.input_height = original_width, original_height
+        run.input_size_mb = original_size_mb
+        run.input_bitrate_kbps = _bitrate_kbps(original_size_mb, clip.duration)
         
         # Get quality preset settings
         preset = QUALITY_PRESETS.get(quality, QUALITY_PRESETS['medium'])
@@ -156,6 +316,7 @@ def compress_video(input_file, output_path=None, target_size_mb=95, progress_tra
         new_height = new_height - (new_height % 2)
         
         logger.info(f"Compressing to: {new_width}x{new_height}")
+        run.output_width, run.output_height = new_width, new_height
         
         # Check for cancellation
         if progress_tracker and progress_tracker.is_cancelled():
@@ -168,6 +329,13 @@ def compress_video(input_file, output_path=None, target_size_mb=95, progress_tra
         # Resize video (moviepy 2.x uses .resized() not .resize())
         resized_clip = clip.resized((new_width, new_height))
         
+        if previews is not None:
+            # Grab the poster and sprite frames as the encoder pulls them (no second decode)
+            previews.start(clip.duration)
+            resized_clip = resized_clip.transform(previews)
+        frame_timer = _FrameTimer()
+        resized_clip = resized_clip.transform(frame_timer)
+        
         # Check for cancellation before encoding
         if progress_tracker and progress_tracker.is_cancelled():
             resized_clip.close()
@@ -178,6 +346,7 @@ def compress_video(input_file, output_path=None, target_size_mb=95, progress_tra
             progress_tracker.update(50, "Encoding video", f"Compressing with H.264 codec at {target_bitrate}...")
         
         # Write compressed video
+        encode_started = time.perf_counter()
         resized_clip.write_videofile(
             output_path,
             codec='libx264',
@@ -188,6 +357,7 @@ def compress_video(input_file, output_path=None, target_size_mb=95, progress_tra
             threads=4,
             logger=None  # Suppress moviepy's verbose output
         )
+        frame_timer.add_to(run, time.perf_counter() - encode_started)
         
         # Clean up
         resized_clip.close()
@@ -203,8 +373,10 @@ def compress_video(input_file, output_path=None, target_size_mb=95, progress_tra
         # If still too large, try more aggressive compression
         if final_size_mb > target_size_mb:
             logger.warning(f"File still too large ({final_size_mb:.2f}MB), applying aggressive compression")
-            return compress_video_aggressive(input_path, output_path, target_size_mb)
+            return compress_video_aggressive(input_path, output_path, target_size_mb, run=run)
         
+        run.output_size_mb = final_size_mb
+        run.output_bitrate_kbps = _bitrate_kbps(final_size_mb, run.duration_seconds)
         return output_path
         
     except Exception as e:
@@ -215,20 +387,33 @@ def compress_video(input_file, output_path=None, target_size_mb=95, progress_tra
         raise
 
 
-def compress_video_aggressive(input_path, output_path, target_size_mb=95):
+def compress_video_aggressive(input_path, output_path, target_size_mb=95, run=None):
     """
     More aggressive compression for very large files.
+    
+    `run` (a VideoProcessingRun) gets this pass's time added to the first one's.
     """
+    from moviepy import VideoFileClip
+    from .models import VideoProcessingRun
+
+    if run is None:
+        run = VideoProcessingRun()
+    run.used_aggressive = True
     try:
+        probe_started = time.perf_counter()
         clip = VideoFileClip(input_path)
+        run.probe_seconds = (run.probe_seconds or 0) + time.perf_counter() - probe_started
         
         # More aggressive settings
         new_width = 1024
         new_height = int(1024 / (clip.size[0] / clip.size[1]))
         new_height = new_height - (new_height % 2)
+        run.output_width, run.output_height = new_width, new_height
         
-        resized_clip = clip.resized((new_width, new_height))
+        frame_timer = _FrameTimer()
+        resized_clip = clip.resized((new_width, new_height)).transform(frame_timer)
         
+        encode_started = time.perf_counter()
         resized_clip.write_videofile(
             output_path,
             codec='libx264',
@@ -239,12 +424,15 @@ def compress_video_aggressive(input_path, output_path, target_size_mb=95):
             threads=4,
             logger=None
         )
+        frame_timer.add_to(run, time.perf_counter() - encode_started)
         
         resized_clip.close()
         clip.close()
         
         final_size_mb = os.path.getsize(output_path) / (1024 * 1024)
         logger.info(f"Aggressive compression complete: {final_size_mb:.2f}MB")
+        run.output_size_mb = final_size_mb
+        run.output_bitrate_kbps = _bitrate_kbps(final_size_mb, clip.duration)
         
         return output_path
         
@@ -253,15 +441,148 @@ def compress_video_aggressive(input_path, output_path, target_size_mb=95):
         raise
 
 
-def process_video_upload(uploaded_file, progress_tracker=None, quality='high'):
+class VideoPreviewCollector:
+    """
+    Collects a poster frame and a scrubbing sprite sheet from decoded frames.
+    
+    During compression the collector wraps the clip being encoded
+    (`clip.transform(collector)`), so it sees every frame the encoder decodes
+    and keeps the ones it needs. Videos that aren't re-encoded use
+    `capture_from()`, which decodes only the sampled frames.
+    """
+    
+    def __init__(self, poster_time=DEFAULT_POSTER_TIME):
+        self.requested_poster_time = poster_time
+        self.poster = None
+        self.frames = {}
+        self.duration = None
+    
+    def start(self, duration):
+        """Plan the poster timestamp and sprite sampling for a clip."""
+        self.duration = duration or 0
+        # Clamp the poster to the clip (a 0.5s clip can't have a poster at 1s)
+        self.poster_time = min(max(self.requested_poster_time or 0, 0), self.duration * 0.9)
+        self.interval = max(self.duration / SPRITE_MAX_FRAMES, SPRITE_MIN_INTERVAL)
+        self.frame_count = max(1, min(SPRITE_MAX_FRAMES, int(self.duration // self.interval)))
+    
+    def __call__(self, get_frame, t):
+        frame = get_frame(t)
+        self.capture(frame, t)
+        return frame
+    
+    def capture(self, frame, t):
+        """Keep a frame if it's the poster or the first frame of a sprite slot."""
+        from PIL import Image
+        
+        if self.poster is None and t >= self.poster_time:
+            poster = Image.fromarray(frame).convert('RGB')
+            if poster.width > POSTER_MAX_WIDTH:
+                poster = poster.resize((POSTER_MAX_WIDTH, round(poster.height * POSTER_MAX_WIDTH / poster.width)))
+            self.poster = poster
+        
+        index = int(t // self.interval)
+        if index < self.frame_count and index not in self.frames:
+            thumb = Image.fromarray(frame).convert('RGB')
+            height = max(2, round(thumb.height * SPRITE_FRAME_WIDTH / thumb.width))
+            self.frames[index] = thumb.resize((SPRITE_FRAME_WIDTH, height))
+    
+    def capture_from(self, clip):
+        """Decode just the sampled frames of a clip that isn't being re-encoded."""
+        self.start(clip.duration)
+        times = sorted({self.poster_time, *(index * self.interval for index in range(self.frame_count))})
+        for t in times:
+            self.capture(clip.get_frame(t), t)
+    
+    def build(self):
+        """
+        Encode the collected frames.
+        
+        Returns:
+            Dict with 'poster' and 'sprite' JPEG bytes plus their geometry
+            (keys match the ProjectVideo fields), or None if nothing was captured
+        """
+        import io
+        from PIL import Image
+        
+        if self.poster is None or not self.frames:
+            return None
+        
+        poster_io = io.BytesIO()
+        self.poster.save(poster_io, format='JPEG', quality=POSTER_QUALITY, optimize=True, progressive=True)
+        
+        frames = [self.frames[index] for index in sorted(self.frames)]
+        frame_width, frame_height = frames[0].size
+        columns = min(SPRITE_COLUMNS, len(frames))
+        rows = -(-len(frames) // columns)
+        sheet = Image.new('RGB', (columns * frame_width, rows * frame_height))
+        for index, frame in enumerate(frames):
+            sheet.paste(frame.resize((frame_width, frame_height)), ((index % columns) * frame_width, (index // columns) * frame_height))
+        sprite_io = io.BytesIO()
+        sheet.save(sprite_io, format='JPEG', quality=SPRITE_QUALITY, optimize=True)
+        
+        return {
+            'poster': poster_io.getvalue(),
+            'poster_width': self.poster.width,
+            'poster_height': self.poster.height,
+            'sprite': sprite_io.getvalue(),
+            'sprite_frame_width': frame_width,
+            'sprite_frame_height': frame_height,
+            'sprite_columns': columns,
+            'sprite_frames': len(frames),
+            'sprite_interval': round(self.interval, 3),
+        }
+
+
+def extract_previews(input_file, previews):
+    """
+    Capture previews from a video that doesn't need compression.
+    
+    Args:
+        input_file: Django uploaded file object or file path
+        previews: VideoPreviewCollector to fill
+    """
+    from moviepy import VideoFileClip
+
+    with local_video_path(input_file) as input_path:
+        clip = VideoFileClip(input_path, audio=False)
+        try:
+            previews.capture_from(clip)
+        finally:
+            clip.close()
+
+
+@contextmanager
+def local_video_path(input_file):
+    """Yield a filesystem path for an uploaded file, spooling in-memory uploads to a temp file."""
+    if hasattr(input_file, 'temporary_file_path'):
+        yield input_file.temporary_file_path()
+    elif hasattr(input_file, 'chunks'):
+        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(input_file.name or '').suffix or '.mp4') as tmp:
+            for chunk in input_file.chunks():
+                tmp.write(chunk)
+        try:
+            yield tmp.name
+        finally:
+            os.remove(tmp.name)
+    else:
+        yield str(input_file)
+
+
+def process_video_upload(uploaded_file, progress_tracker=None, quality='high', previews=None, run=None):
     """
     Main function to process uploaded video.
     Compresses if needed, returns file ready for Cloudinary upload.
     
+    Each compression attempt, successful or not, is saved as a
+    VideoProcessingRun. Pass `run` to keep hold of it (e.g. to link it to the
+    ProjectVideo once that is saved); otherwise one is created.
+    
     Args:
         uploaded_file: Django UploadedFile object
         progress_tracker: Optional CompressionProgressTracker instance
         quality: Quality preset ('high', 'medium', 'low') - defaults to 'high'
+        previews: Optional VideoPreviewCollector, filled whether or not the video is compressed
+        run: Optional unsaved VideoProcessingRun to record the attempt in
     
     Returns:
         Tuple of (file_object, was_compressed, original_size_mb, final_size_mb, task_id)
@@ -280,15 +601,34 @@ def process_video_upload(uploaded_file, progress_tracker=None, quality='high'):
     # Check if compression is needed
     if original_size <= MAX_FILE_SIZE:
         logger.info("Video is under size limit, no compression needed")
+        if previews is not None:
+            try:
+                extract_previews(uploaded_file, previews)
+            except Exception as e:
+                # A missing poster shouldn't block the upload
+                logger.warning(f"Could not extract video previews: {e}")
         if progress_tracker:
             progress_tracker.complete(True, "No compression needed", original_size_mb)
         return (uploaded_file, False, original_size_mb, original_size_mb, task_id)
     
+    if run is None:
+        from .models import VideoProcessingRun
+        run = VideoProcessingRun()
+    run.file_name = (uploaded_file.name or '')[:255]
+    run.quality = quality
+    run.input_size_mb = original_size_mb
+    
     # Compress the video
     compressed_path = None
+    started = time.perf_counter()
+    cpu_started, children_cpu_started = _thread_cpu_seconds(), _children_cpu_seconds()
+    token = _begin_run()
     try:
         logger.info(f"Starting compression for {original_size_mb:.2f}MB file...")
-        compressed_path = compress_video(uploaded_file, progress_tracker=progress_tracker, quality=quality)
+        compressed_path = compress_video(
+            uploaded_file, progress_tracker=progress_tracker, quality=quality, previews=previews, run=run
+        )
+        run.total_seconds = time.perf_counter() - started
         
         final_size_mb = os.path.getsize(compressed_path) / (1024 * 1024)
         logger.info(f"Compression successful: {original_size_mb:.2f}MB → {final_size_mb:.2f}MB")
@@ -319,10 +659,19 @@ def process_video_upload(uploaded_file, progress_tracker=None, quality='high'):
             
     except Exception as e:
         logger.error(f"Video compression failed: {e}", exc_info=True)
+        run.status = run.FAILED
+        run.failure_reason = f"{type(e).__name__}: {e}"
         if progress_tracker:
             progress_tracker.complete(False, f"Compression failed: {str(e)}")
         raise Exception(f"Failed to compress video: {str(e)}")
     finally:
+        if run.total_seconds is None:
+            run.total_seconds = time.perf_counter() - started
+        run.cpu_seconds = _thread_cpu_seconds() - cpu_started
+        if _end_run(token):
+            run.cpu_seconds += _children_cpu_seconds() - children_cpu_started
+            run.peak_rss_mb = _peak_rss_mb()
+        _save_run(run)
         # Clean up temp file
         if compressed_path and os.path.exists(compressed_path):
             try:
@@ -330,3 +679,225 @@ def process_video_upload(uploaded_file, progress_tracker=None, quality='high'):
                 logger.info("Cleaned up temporary compressed file")
             except:
                 pass
+
+
+def plan_hls_ladder(width, height, fps, ladder=HLS_LADDER):
+    """
+    Pick the renditions for a source video.
+    
+    Each rung uses a QUALITY_PRESETS entry fitted to the source aspect ratio.
+    Rungs are never upscaled, and rungs that would end up the same size as a
+    higher one are dropped, so a 480p source gets a single rendition.
+    
+    Returns:
+        List of dicts with quality, width, height, fps and bitrate
+    """
+    rungs = []
+    aspect_ratio = width / height
+    for quality in ladder:
+        preset = QUALITY_PRESETS[quality]
+        target_width, target_height = preset['resolution']
+        if aspect_ratio > (target_width / target_height):
+            new_width = min(target_width, width)
+            new_height = int(new_width / aspect_ratio)
+        else:
+            new_height = min(target_height, height)
+            new_width = int(new_height * aspect_ratio)
+        new_width -= new_width % 2
+        new_height -= new_height % 2
+        if any(rung['height'] == new_height for rung in rungs):
+            continue
+        rungs.append({
+            'quality': quality,
+            'width': new_width,
+            'height': new_height,
+            'fps': min(preset['fps'], fps or preset['fps']),
+            'bitrate': preset['bitrate'],
+        })
+    return rungs
+
+
+def build_hls_ladder(input_path, output_dir, ladder=HLS_LADDER, segment_seconds=HLS_SEGMENT_SECONDS,
+                     progress_tracker=None):
+    """
+    Encode an HLS ladder (segmented fMP4 + master playlist) in one ffmpeg run.
+    
+    The source is decoded once and split into one scaled encoder output per
+    rung. Keyframes are forced on segment boundaries so players can switch
+    renditions between any two segments.
+    
+    Args:
+        input_path: Path to the source video
+        output_dir: Directory to write master.m3u8 and v<N>/ renditions into
+        ladder: QUALITY_PRESETS keys, highest first
+        segment_seconds: Target segment duration
+        progress_tracker: Optional CompressionProgressTracker instance
+    
+    Returns:
+        The ladder description from inspect_hls_ladder()
+    """
+    from imageio_ffmpeg import get_ffmpeg_exe
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+    
+    infos = ffmpeg_parse_infos(input_path)
+    width, height = infos['video_size']
+    duration = infos.get('duration') or 0
+    has_audio = infos.get('audio_found', False)
+    rungs = plan_hls_ladder(width, height, infos.get('video_fps'), ladder)
+    
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    split = f"[0:v]split={len(rungs)}" + ''.join(f'[s{index}]' for index in range(len(rungs)))
+    scales = [
+        f"[s{index}]fps={rung['fps']},scale={rung['width']}:{rung['height']}[v{index}]"
+        for index, rung in enumerate(rungs)
+    ]
+    command = [
+        get_ffmpeg_exe(), '-hide_banner', '-loglevel', 'error', '-nostats', '-progress', 'pipe:1', '-y',
+        '-i', str(input_path),
+        '-filter_complex', ';'.join([split, *scales]),
+    ]
+    for index, rung in enumerate(rungs):
+        command += ['-map', f'[v{index}]']
+        if has_audio:
+            command += ['-map', '0:a:0']
+        maxrate = int(int(rung['bitrate'].rstrip('k')) * 1.07)
+        command += [
+            f'-b:v:{index}', rung['bitrate'],
+            f'-maxrate:v:{index}', f'{maxrate}k',
+            f'-bufsize:v:{index}', f'{maxrate * 2}k',
+        ]
+    command += [
+        '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'high', '-pix_fmt', 'yuv420p',
+        '-sc_threshold', '0', '-force_key_frames', f'expr:gte(t,n_forced*{segment_seconds})',
+    ]
+    if has_audio:
+        command += ['-c:a', 'aac', '-b:a', HLS_AUDIO_BITRATE, '-ac', '2']
+    stream_map = ' '.join(
+        f'v:{index},a:{index}' if has_audio else f'v:{index}' for index in range(len(rungs))
+    )
+    command += [
+        '-f', 'hls', '-hls_time', str(segment_seconds), '-hls_playlist_type', 'vod',
+        '-hls_segment_type', 'fmp4', '-hls_flags', 'independent_segments',
+        '-hls_fmp4_init_filename', 'init.mp4',
+        '-hls_segment_filename', str(output_dir / 'v%v' / 'seg_%03d.m4s'),
+        '-master_pl_name', HLS_MASTER_PLAYLIST,
+        '-var_stream_map', stream_map,
+        str(output_dir / 'v%v' / 'index.m3u8'),
+    ]
+    
+    heights = ', '.join(f"{rung['height']}p" for rung in rungs)
+    logger.info(f"Building HLS ladder: {heights} from {width}x{height}")
+    if progress_tracker:
+        progress_tracker.update(0, "Building streaming ladder", f"{len(rungs)} renditions")
+    
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    for line in process.stdout:
+        key, _, value = line.strip().partition('=')
+        if key == 'out_time_us' and value.isdigit() and duration and progress_tracker:
+            percentage = min(99, int(int(value) / 1_000_000 / duration * 100))
+            progress_tracker.update(percentage, "Building streaming ladder", f"{len(rungs)} renditions")
+    stderr = process.stderr.read()
+    if process.wait() != 0:
+        raise RuntimeError(f"ffmpeg failed building the HLS ladder: {stderr.strip()[-500:]}")
+    
+    return inspect_hls_ladder(output_dir)
+
+
+def _playlist_attributes(text):
+    return {key: value.strip('"') for key, value in re.findall(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)', text)}
+
+
+def inspect_hls_ladder(output_dir):
+    """
+    Read back and validate a ladder written by build_hls_ladder().
+    
+    Returns:
+        Dict with 'master' (relative path), 'files' (every relative path,
+        master last) and 'variants' (bandwidth, resolution, codecs, segment
+        count and duration per rendition)
+    
+    Raises:
+        ValueError: If a playlist is missing or references a missing file
+    """
+    output_dir = Path(output_dir)
+    master_path = output_dir / HLS_MASTER_PLAYLIST
+    if not master_path.exists():
+        raise ValueError(f"No {HLS_MASTER_PLAYLIST} in {output_dir}")
+    
+    variants = []
+    files = []
+    lines = [line.strip() for line in master_path.read_text().splitlines()]
+    for index, line in enumerate(lines):
+        if not line.startswith('#EXT-X-STREAM-INF:'):
+            continue
+        attributes = _playlist_attributes(line.split(':', 1)[1])
+        playlist = output_dir / lines[index + 1]
+        if not playlist.exists():
+            raise ValueError(f"Master playlist references missing {lines[index + 1]}")
+        
+        segments, duration, init = [], 0.0, None
+        for entry in (line.strip() for line in playlist.read_text().splitlines()):
+            if entry.startswith('#EXT-X-MAP:'):
+                init = _playlist_attributes(entry.split(':', 1)[1])['URI']
+            elif entry.startswith('#EXTINF:'):
+                duration += float(entry.split(':', 1)[1].rstrip(','))
+            elif entry and not entry.startswith('#'):
+                segments.append(entry)
+        for name in filter(None, [init, *segments]):
+            if not (playlist.parent / name).exists():
+                raise ValueError(f"{lines[index + 1]} references missing {name}")
+        
+        variant_dir = playlist.parent.relative_to(output_dir).as_posix()
+        files += [f'{variant_dir}/{name}' for name in filter(None, [init, *segments])]
+        files.append(lines[index + 1])
+        variants.append({
+            'playlist': lines[index + 1],
+            'bandwidth': int(attributes.get('BANDWIDTH', 0)),
+            'resolution': attributes.get('RESOLUTION'),
+            'codecs': attributes.get('CODECS'),
+            'segments': len(segments),
+            'duration': round(duration, 3),
+        })
+    
+    if not variants:
+        raise ValueError(f"{HLS_MASTER_PLAYLIST} lists no renditions")
+    files.append(HLS_MASTER_PLAYLIST)
+    return {'master': HLS_MASTER_PLAYLIST, 'files': files, 'variants': variants}
+
+
+@contextmanager
+def hls_ladder_for(input_file, progress_tracker=None):
+    """
+    Build a ladder for an uploaded file in a temp directory (removed on exit).
+    
+    Yields:
+        (output_dir, ladder description)
+    """
+    output_dir = tempfile.mkdtemp(prefix='hls_')
+    try:
+        with local_video_path(input_file) as input_path:
+            ladder = build_hls_ladder(input_path, output_dir, progress_tracker=progress_tracker)
+        yield output_dir, ladder
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def hls_upload_items(output_dir, ladder, prefix):
+    """
+    Build (file, options) upload pairs for a ladder, master playlist last.
+    
+    Files keep their relative layout under `prefix` as raw assets, so the
+    playlists' relative URIs resolve on the CDN exactly as they do on disk.
+    The caller closes the opened files once uploaded.
+    """
+    from django.core.files.uploadedfile import UploadedFile
+    
+    items = []
+    for name in ladder['files']:
+        path = Path(output_dir) / name
+        content_type = 'application/vnd.apple.mpegurl' if name.endswith('.m3u8') else 'video/mp4'
+        upload = UploadedFile(open(path, 'rb'), name=name, content_type=content_type, size=path.stat().st_size)
+        items.append((upload, {'resource_type': 'raw', 'public_id': f'{prefix}/{name}'}))
+    return items
@@ -1,28 +1,41 @@
-from django.http import JsonResponse
-from django.shortcuts import render, get_object_or_404, redirect
-from django.core.mail import send_mail
+import logging
+
+from asgiref.sync import sync_to_async
+from django.db import DatabaseError
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import render, aget_object_or_404, redirect
+from django.views.decorators.csrf import csrf_exempt
+from django.urls import reverse
 from django.contrib import messages
 from .models import Projects 
-from .serializer import ProjectsSerializer
+from .serializer import ProjectsSerializer, project_rows, render_json
 from .forms import ContactForm
+from . import outbox
+from . import search as project_search
+from .featured_cache import featured_projects_cache
+from .media_storage import get_backend
+from .media_urls import resource_url
 from rest_framework.decorators import api_view, parser_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.parsers import MultiPartParser, FormParser
-from cloudinary.uploader import upload
-from django_ratelimit.decorators import ratelimit
+from .caching import cache_response
+from .ratelimit import ratelimit
+
+logger = logging.getLogger(__name__)
 
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 
+@ratelimit(key='user_or_ip', rate='30/m', method='POST')
 def upload_image(request):
     if request.method == 'POST' and request.FILES.get('image'):
         try:
             image = request.FILES['image']
-            upload_result = upload(image, folder="uploads")
+            resource = get_backend().upload(image, folder="uploads")
             return JsonResponse({
                 'success': True,
-                'url': upload_result['secure_url'],
-                'public_id': upload_result['public_id']
+                'url': resource_url(resource),
+                'public_id': resource.public_id
             })
         except Exception as e:
             return JsonResponse({
@@ -34,16 +47,24 @@ def upload_image(request):
         'error': 'No image provided'
     }, status=400)
 
-def home(request):
-    # Get featured projects for the hero section
-    featured_projects = Projects.objects.filter(featured=True)
+# The public pages are async: under an ASGI server (see asgi.py) a slow client
+# or a slow query holds a coroutine instead of a worker thread. Each view reads
+# everything its template needs up front, so rendering never touches the
+# database from the event loop. They do not depend on who is asking, so whole
+# responses are cached (see caching.py); contact is left out for its form token.
+
+@cache_response()
+async def home(request):
+    # Featured project payloads come from an in-process cache (see featured_cache.py)
+    featured_projects = await featured_projects_cache.aget()
     return render(request, 'index.html', {"featured_projects": featured_projects})
 
-def about(request):
+@cache_response()
+async def about(request):
     return render(request, 'about.html')
 
 @ratelimit(key='ip', rate='5/h', method='POST', block=True)
-def contact(request):
+async def contact(request):
     if request.method == 'POST':
         form = ContactForm(request.POST)
         if form.is_valid():
@@ -51,28 +72,33 @@ def contact(request):
             email = form.cleaned_data['email']
             subject = form.cleaned_data['subject']
             message = form.cleaned_data['message']
-            # Send email
+            # Queue the email; the outbox sender delivers it (see outbox.py)
             email_message = f'From: {name}\nEmail: {email}\n\nMessage:\n{message}'
             from django.conf import settings
             recipient_email = getattr(settings, 'EMAIL_HOST_USER', None)
             try:
-                send_mail(
+                row, _ = await outbox.aenqueue(
                     subject,
                     email_message,
                     email,  # From email
                     [recipient_email],
-                    fail_silently=False,
                 )
+            except DatabaseError:
+                logger.exception(f"[CONTACT] Could not queue the message from {email}")
+                row = None
+            if row is not None:
                 messages.success(request, 'Thank you for your message! I will get back to you soon.')
                 return redirect('contact')
-            except Exception as e:
-                messages.error(request, 'An error occurred while sending your message. Please try again later.')
+            # Not queued: no EMAIL_HOST_USER to send it to, or the outbox could not be written
+            messages.error(request, 'An error occurred while sending your message. Please try again later.')
     else:
         form = ContactForm()
-    return render(request, 'contact.html', {'form': form})
+    # The template reads the message storage, which may load the session
+    return await sync_to_async(render)(request, 'contact.html', {'form': form})
 
-def projects_page(request):
-    projects = Projects.objects.all().order_by('-created_at')
+@cache_response()
+async def projects_page(request):
+    projects = [project async for project in Projects.objects.all().order_by('-created_at')]
     # Group projects by year
     projects_by_year = {}
     for project in projects:
@@ -89,40 +115,77 @@ def projects_page(request):
     }
     return render(request, 'projects.html', context)
 
-def project_detail_page(request, id):
-    project = get_object_or_404(Projects, id=id)
+@cache_response()
+async def project_detail_page(request, id):
+    project = await aget_object_or_404(
+        Projects.objects.select_related('category').prefetch_related('photos', 'videos', 'embeds', 'cards'),
+        id=id
+    )
     context = {
         'project': project
     }
     return render(request, 'project_detail.html', context)
 
-@api_view(['GET', 'POST'])
+@cache_response('urls')
+async def search(request):
+    """
+    Full-text search over project names, descriptions, cards and captions.
+    Returns ranked results with highlighted snippets.
+    """
+    query = request.GET.get('q', '')
+    try:
+        limit = min(int(request.GET.get('limit', 20)), 50)
+    except ValueError:
+        limit = 20
+    results = await sync_to_async(project_search.search)(query, limit=max(limit, 1))
+    for result in results:
+        result['url'] = reverse('project_detail', args=[result['id']])
+    return JsonResponse({'query': query, 'results': results})
+
+# The read-only API (GET/HEAD) is served natively async from project_rows(), which
+# matches ProjectsSerializer's output without its per-field cost; writes go to the DRF
+# views below in a worker thread (DRF's APIView is sync-only). CSRF is left to
+# DRF's SessionAuthentication, as @api_view would. Both write views share one
+# rate-limit budget per user or address.
+
+@csrf_exempt
+@cache_response('urls')
+async def projects_list(request, format=None):
+    if request.method not in ('GET', 'HEAD'):
+        return await sync_to_async(projects_list_write)(request, format=format)
+    data = await sync_to_async(project_rows)(Projects.objects.all(), request)
+    return HttpResponse(render_json({'projects': data}), content_type='application/json')
+
+@csrf_exempt
+@cache_response('urls')
+async def projects_detail(request, id, format=None):
+    if request.method not in ('GET', 'HEAD'):
+        return await sync_to_async(projects_detail_write)(request, id, format=format)
+    data = await sync_to_async(project_rows)(Projects.objects.filter(pk=id), request)
+    if not data:
+        return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+    return HttpResponse(render_json(data[0]), content_type='application/json')
+
+@ratelimit(group='api-write', key='user_or_ip', rate='60/m', method=ratelimit.UNSAFE)
+@api_view(['POST'])
 @parser_classes([MultiPartParser, FormParser])
-def projects_list(request, format=None):
-    if request.method == 'GET':
-        projects = Projects.objects.all()
-        serializer = ProjectsSerializer(projects, many=True, context={'request': request})
-        return JsonResponse({'projects': serializer.data})
-    
-    if request.method == 'POST':
-        serializer = ProjectsSerializer(data=request.data, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+def projects_list_write(request, format=None):
+    serializer = ProjectsSerializer(data=request.data, context={'request': request})
+    if serializer.is_valid():
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-@api_view(['GET', 'PUT', 'DELETE'])
+@ratelimit(group='api-write', key='user_or_ip', rate='60/m', method=ratelimit.UNSAFE)
+@api_view(['PUT', 'DELETE'])
 @parser_classes([MultiPartParser, FormParser])
-def projects_detail(request, id, format=None):
+def projects_detail_write(request, id, format=None):
     try:
         project = Projects.objects.get(pk=id)
     except Projects.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
 
-    if request.method == 'GET':
-        serializer = ProjectsSerializer(project, context={'request': request})
-        return Response(serializer.data)
-    elif request.method == 'PUT':
+    if request.method == 'PUT':
         serializer = ProjectsSerializer(project, data=request.data, context={'request': request})
         if serializer.is_valid():
             serializer.save()
@@ -131,44 +194,3 @@ def projects_detail(request, id, format=None):
     elif request.method == 'DELETE':
         project.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
-
-def project_list(request):
-    """
-    View for displaying all projects
-    """
-    projects = Projects.objects.all().order_by('-year', '-created_at')
-    context = {
-        'projects': projects,
-    }
-    return render(request, 'projects/list.html', context)
-
-def project_detail(request, project_id):
-    """
-    View for displaying a single project
-    """
-    project = get_object_or_404(Projects, id=project_id)
-    photos = project.photos.all().order_by('order')
-    
-    # Get optimized image URLs
-    if project.image:
-        project.image_url = get_optimized_url(
-            project.image.public_id,
-            width=1200,
-            height=800,
-            crop='fill'
-        )
-    
-    for photo in photos:
-        if photo.image:
-            photo.image_url = get_optimized_url(
-                photo.image.public_id,
-                width=1200,
-                height=800,
-                crop='fill'
-            )
-    
-    context = {
-        'project': project,
-        'photos': photos,
-    }
-    return render(request, 'projects/detail.html', context)
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""
+Single-writer queue for long admin saves on SQLite.
+
+SQLite allows one writer at a time. Admin saves that include uploads can run
+for a long time, and when several of them race, the losers either sit on the
+busy timeout or fail with "database is locked". Routing them through this
+queue makes them wait their turn in order instead: a FIFO ticket queue
+serializes threads in a process, and a file lock (filelock) serializes
+processes (gunicorn workers) on the same host.
+
+On other databases the queue is a no-op.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from filelock import FileLock, Timeout
+
+logger = logging.getLogger(__name__)
+
+
+class WriteQueueTimeout(Exception):
+    """Raised when a writer waited longer than WRITE_QUEUE_TIMEOUT for its turn."""
+
+
+class WriteQueue:
+    """FIFO queue admitting one writer at a time across threads and processes."""
+
+    def __init__(self, lock_file, timeout):
+        self.timeout = timeout
+        self._file_lock = FileLock(lock_file)
+        self._condition = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+        self._abandoned = set()
+        self._local = threading.local()
+
+    @contextmanager
+    def writer(self):
+        """Hold the single-writer slot for the duration of the block (re-entrant per thread)."""
+        depth = getattr(self._local, 'depth', 0)
+        if depth:
+            self._local.depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+            return
+
+        started = time.monotonic()
+        with self._condition:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            while ticket != self._serving:
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    if ticket != self._serving:
+                        self._skip(ticket)
+                        raise WriteQueueTimeout(f"Timed out after {self.timeout}s waiting for the write queue")
+
+        try:
+            remaining = max(self.timeout - (time.monotonic() - started), 0)
+            try:
+                self._file_lock.acquire(timeout=remaining)
+            except Timeout:
+                raise WriteQueueTimeout(f"Timed out after {self.timeout}s waiting for another process's write")
+
+            waited = time.monotonic() - started
+            if waited > 1:
+                logger.info(f"[WRITE QUEUE] Waited {waited:.1f}s for the write slot")
+
+            self._local.depth = 1
+            try:
+                yield
+            finally:
+                self._local.depth = 0
+                self._file_lock.release()
+        finally:
+            with self._condition:
+                self._serving += 1
+                self._advance()
+                self._condition.notify_all()
+
+    def _skip(self, ticket):
+        """Record an abandoned ticket so later writers are not stuck behind it."""
+        self._abandoned.add(ticket)
+        self._advance()
+        self._condition.notify_all()
+
+    def _advance(self):
+        while self._serving in self._abandoned:
+            self._abandoned.discard(self._serving)
+            self._serving += 1
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_write_queue():
+    """Return the process-wide write queue."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = WriteQueue(settings.WRITE_QUEUE_LOCK_FILE, settings.WRITE_QUEUE_TIMEOUT)
+    return _queue
+
+
+@contextmanager
+def serialized_write():
+    """Run a block as the only writer on SQLite; a no-op on other databases."""
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    with get_write_queue().writer():
+        yield
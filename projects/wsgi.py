@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'projects.settings')
 
 application = get_wsgi_application()
+
+# Load the URLconf, and with it every view module, now instead of on each
+# worker's first request. Under `gunicorn --preload` this runs once in the
+# master, so forked workers boot instantly and share these pages copy-on-write.
+from django.urls import get_resolver  # noqa: E402
+
+get_resolver().url_patterns
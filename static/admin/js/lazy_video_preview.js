@@ -0,0 +1,20 @@
+// Admin video previews render as a poster frame; the player (and its
+// network requests) is only created when the preview is clicked.
+document.addEventListener('click', function (event) {
+    const preview = event.target.closest('.lazy-video-preview');
+    if (!preview) return;
+    event.preventDefault();
+
+    const poster = preview.querySelector('img');
+    const video = document.createElement('video');
+    video.src = preview.dataset.src;
+    video.controls = true;
+    video.autoplay = true;
+    video.playsInline = true;
+    if (poster) {
+        video.poster = poster.src;
+        video.width = poster.width;
+    }
+    video.style.borderRadius = '4px';
+    preview.replaceWith(video);
+});
@@ -0,0 +1,165 @@
+// Adaptive streaming for project videos that have an HLS ladder (data-hls).
+// Safari/iOS play HLS natively and pick renditions themselves. Elsewhere a
+// small Media Source Extensions loader fetches the segmented fMP4 renditions
+// and picks one per segment from the measured throughput. Without MSE (or if
+// anything fails before playback starts) the progressive MP4 <source> is used.
+const HlsPlayer = {
+    SAFETY_FACTOR: 0.8, // use at most 80% of the estimated bandwidth
+    BUFFER_AHEAD_SECONDS: 30,
+
+    parseAttributes(text) {
+        const attributes = {};
+        text.replace(/([A-Z0-9-]+)=("[^"]*"|[^,]*)/g, (_, key, value) => {
+            attributes[key] = value.replace(/^"|"$/g, '');
+        });
+        return attributes;
+    },
+
+    async fetchText(url) {
+        const response = await fetch(url);
+        if (!response.ok) throw new Error(`${response.status} fetching ${url}`);
+        return response.text();
+    },
+
+    async fetchSegment(url) {
+        const started = performance.now();
+        const response = await fetch(url);
+        if (!response.ok) throw new Error(`${response.status} fetching ${url}`);
+        const data = await response.arrayBuffer();
+        const seconds = Math.max((performance.now() - started) / 1000, 0.001);
+        return { data, bitsPerSecond: (data.byteLength * 8) / seconds };
+    },
+
+    // Master playlist -> renditions (lowest bandwidth first) with their segment lists
+    async loadLadder(masterUrl) {
+        const lines = (await this.fetchText(masterUrl)).split('\n').map((line) => line.trim());
+        const variants = [];
+        lines.forEach((line, index) => {
+            if (!line.startsWith('#EXT-X-STREAM-INF:')) return;
+            const attributes = this.parseAttributes(line.slice(line.indexOf(':') + 1));
+            variants.push({
+                bandwidth: parseInt(attributes.BANDWIDTH, 10) || 0,
+                resolution: attributes.RESOLUTION || '',
+                codecs: attributes.CODECS,
+                url: new URL(lines[index + 1], masterUrl).href,
+            });
+        });
+        variants.sort((a, b) => a.bandwidth - b.bandwidth);
+
+        await Promise.all(variants.map(async (variant) => {
+            variant.segments = [];
+            (await this.fetchText(variant.url)).split('\n').map((line) => line.trim()).forEach((line) => {
+                if (line.startsWith('#EXT-X-MAP:')) {
+                    variant.init = new URL(this.parseAttributes(line.slice(11)).URI, variant.url).href;
+                } else if (line && !line.startsWith('#')) {
+                    variant.segments.push(new URL(line, variant.url).href);
+                }
+            });
+        }));
+        return variants;
+    },
+
+    pick(variants, bitsPerSecond) {
+        let choice = variants[0];
+        variants.forEach((variant) => {
+            if (variant.bandwidth <= bitsPerSecond * this.SAFETY_FACTOR) choice = variant;
+        });
+        return choice;
+    },
+
+    mimeType(variant) {
+        return `video/mp4; codecs="${variant.codecs}"`;
+    },
+
+    waitFor(target, eventName) {
+        return new Promise((resolve) => target.addEventListener(eventName, resolve, { once: true }));
+    },
+
+    async append(sourceBuffer, data) {
+        sourceBuffer.appendBuffer(data);
+        await this.waitFor(sourceBuffer, 'updateend');
+    },
+
+    bufferedAhead(video) {
+        for (let i = 0; i < video.buffered.length; i++) {
+            if (video.buffered.start(i) <= video.currentTime && video.currentTime <= video.buffered.end(i)) {
+                return video.buffered.end(i) - video.currentTime;
+            }
+        }
+        return 0;
+    },
+
+    async stream(video, variants, onReady) {
+        const mediaSource = new MediaSource();
+        video.src = URL.createObjectURL(mediaSource);
+        await this.waitFor(mediaSource, 'sourceopen');
+
+        const connection = navigator.connection;
+        let estimate = connection && connection.downlink ? connection.downlink * 1e6 : 0;
+        let current = this.pick(variants, estimate);
+        const sourceBuffer = mediaSource.addSourceBuffer(this.mimeType(current));
+        await this.append(sourceBuffer, (await this.fetchSegment(current.init)).data);
+
+        const count = Math.min(...variants.map((variant) => variant.segments.length));
+        for (let index = 0; index < count; index++) {
+            const variant = this.pick(variants, estimate);
+            if (variant !== current) {
+                // Segments are keyframe-aligned across renditions, so switch at the boundary
+                if (sourceBuffer.changeType) sourceBuffer.changeType(this.mimeType(variant));
+                await this.append(sourceBuffer, (await this.fetchSegment(variant.init)).data);
+                current = variant;
+            }
+            const { data, bitsPerSecond } = await this.fetchSegment(variant.segments[index]);
+            estimate = estimate ? estimate * 0.6 + bitsPerSecond * 0.4 : bitsPerSecond;
+            await this.append(sourceBuffer, data);
+            video.dataset.hlsRendition = variant.resolution;
+            if (index === 0) onReady();
+
+            while (this.bufferedAhead(video) > this.BUFFER_AHEAD_SECONDS) {
+                await this.waitFor(video, 'timeupdate');
+            }
+        }
+        if (mediaSource.readyState === 'open') mediaSource.endOfStream();
+    },
+
+    attach(video) {
+        const masterUrl = video.dataset.hls;
+        if (video.canPlayType('application/vnd.apple.mpegurl')) {
+            video.src = masterUrl;
+            return;
+        }
+        if (!window.MediaSource) return;
+
+        let started = false;
+        video.addEventListener('play', () => {
+            if (started) return;
+            started = true;
+            video.pause();
+
+            let ready = false;
+            const fallBack = (error) => {
+                console.warn('Adaptive streaming unavailable, using MP4:', error);
+                if (ready) return;
+                video.removeAttribute('src');
+                video.load();
+                video.play();
+            };
+
+            this.loadLadder(masterUrl).then((variants) => {
+                if (!variants.length || !variants.every((v) => v.init && MediaSource.isTypeSupported(this.mimeType(v)))) {
+                    throw new Error('unsupported ladder');
+                }
+                return this.stream(video, variants, () => {
+                    ready = true;
+                    video.play();
+                });
+            }).catch(fallBack);
+        });
+    },
+
+    init() {
+        document.querySelectorAll('video[data-hls]').forEach((video) => this.attach(video));
+    },
+};
+
+document.addEventListener('DOMContentLoaded', () => HlsPlayer.init());
@@ -0,0 +1,46 @@
+// Scrubbing previews for project videos: hovering across a video shows the
+// frame at that point from its sprite sheet, without loading any video data
+// (videos use preload="none" and a poster image).
+function initializeVideoScrub() {
+    document.querySelectorAll('video[data-sprite]').forEach((video) => {
+        const wrapper = video.parentElement;
+        const frameWidth = parseInt(video.dataset.spriteFrameWidth, 10);
+        const frameHeight = parseInt(video.dataset.spriteFrameHeight, 10);
+        const columns = parseInt(video.dataset.spriteColumns, 10);
+        const frames = parseInt(video.dataset.spriteFrames, 10);
+        if (!wrapper || !frameWidth || !frameHeight || !columns || !frames) return;
+
+        const preview = document.createElement('div');
+        preview.className = 'video-scrub-preview';
+        preview.style.width = `${frameWidth}px`;
+        preview.style.height = `${frameHeight}px`;
+        wrapper.appendChild(preview);
+
+        let spriteLoaded = false;
+
+        video.addEventListener('mousemove', (event) => {
+            if (!video.paused) return;
+            if (!spriteLoaded) {
+                // Fetch the sprite on first hover only
+                preview.style.backgroundImage = `url("${video.dataset.sprite}")`;
+                spriteLoaded = true;
+            }
+
+            const rect = video.getBoundingClientRect();
+            const fraction = Math.min(Math.max((event.clientX - rect.left) / rect.width, 0), 0.999);
+            const index = Math.floor(fraction * frames);
+            const x = (index % columns) * frameWidth;
+            const y = Math.floor(index / columns) * frameHeight;
+            preview.style.backgroundPosition = `-${x}px -${y}px`;
+
+            const left = Math.min(Math.max(event.clientX - rect.left - frameWidth / 2, 0), rect.width - frameWidth);
+            preview.style.left = `${left}px`;
+            preview.classList.add('is-visible');
+        });
+
+        video.addEventListener('mouseleave', () => preview.classList.remove('is-visible'));
+        video.addEventListener('play', () => preview.classList.remove('is-visible'));
+    });
+}
+
+document.addEventListener('DOMContentLoaded', initializeVideoScrub);